@@ -0,0 +1,119 @@
+#imports
+import time
+
+#----------------Constants-----------------------#
+
+#Control period (ms) the safety path was sized for, see controller.CONTROL_PERIOD
+CONTROL_PERIOD = 30
+
+#Status poll period (ms) per system state
+IDLE_PERIOD = 150
+HEATING_PERIOD = 100
+NEAR_SETPOINT_PERIOD = 30
+INCUBATING_PERIOD = 100
+#Poll period after button presses or while the temperature moves quickly
+BOOST_PERIOD = 30
+#How long a boost lasts after the last trigger (s)
+BOOST_TIME = 2.0
+
+#Distance from set temperature treated as near setpoint (C)
+NEAR_SETPOINT_BAND = 1.0
+#Temperature slope that triggers a boost (C/s)
+FAST_SLOPE = 0.1
+#Smoothing gain for the slope estimate
+SLOPE_GAIN = 0.2
+
+#System states, same values as controller.systemUpdate
+IDLE = 0
+HEATING = 1
+INCUBATING = 2
+COMPLETE = 3
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Chooses the status poll period from the system state.
+                    Idle polls slowly, heating and incubating moderately and the
+                    approach to setpoint at full rate.  Button presses and fast
+                    temperature changes boost the rate for BOOST_TIME.  While the
+                    door interlock is armed, the heater is on and the door switch
+                    is only seen in status frames, the period never exceeds
+                    CONTROL_PERIOD so the door open reaction path is not
+                    lengthened.  With the switch read by the AtMega only
+                    (DOOR_SWITCH_PIN None, as shipped) heating and incubating
+                    therefore run at CONTROL_PERIOD whenever the heater is
+                    driven, their own periods apply while it is off: at or
+                    above the set temp, on an overshoot hold or after a trip.
+                    Wiring the switch to a GPIO edge lifts the cap
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created state based periods, activity/slope boost and
+                    armed period cap
+            -1.0.1: Armed cap only while the heater is on
+----------------------------------------------------------------------------"""
+class adaptivePoller(object):
+
+    def __init__(self):
+        self._boostUntil = 0
+        self._slope = 0.0
+        self._lastTemp = None
+        self._lastTempTime = None
+        self._period = IDLE_PERIOD
+        #Statistics
+        self.periodChanges = 0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Boosts the poll rate after user input
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def activity(self):
+        self._boostUntil = time.time() + BOOST_TIME
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Updates the temperature slope estimate, boosts the poll rate if the temperature moves fast
+         Inputs: temp - average bag temperature (C)
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def addTemp(self, temp):
+        now = time.time()
+        if self._lastTemp is not None and now > self._lastTempTime:
+            slope = (temp - self._lastTemp)/(now - self._lastTempTime)
+            self._slope += SLOPE_GAIN*(slope - self._slope)
+            if abs(self._slope) >= FAST_SLOPE:
+                self._boostUntil = now + BOOST_TIME
+        self._lastTemp = temp
+        self._lastTempTime = now
+
+    @property
+    def slope(self):
+        return self._slope
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Poll period for the current state
+         Inputs: state - IDLE, HEATING, INCUBATING or COMPLETE, error - set temp minus bag temp (C),
+                 armed - door interlock armed, edgeWired - door switch wired to a GPIO edge callback,
+                 heaterOn - heater commanded or reported on
+        Outputs: Period (ms)
+    -------------------------------------------------------------------------------------------------------"""
+    def period(self, state, error, armed, edgeWired, heaterOn = True):
+        if state == IDLE:
+            period = IDLE_PERIOD
+        elif abs(error) <= NEAR_SETPOINT_BAND and state == HEATING:
+            period = NEAR_SETPOINT_PERIOD
+        elif state == HEATING:
+            period = HEATING_PERIOD
+        else:
+            period = INCUBATING_PERIOD
+        if time.time() < self._boostUntil:
+            period = min(period, BOOST_PERIOD)
+        #Door open only needs a reaction while the heater is on, and is only seen in status frames: keep the
+        #reaction path as short as before
+        if armed and heaterOn and not edgeWired:
+            period = min(period, CONTROL_PERIOD)
+        if period != self._period:
+            self.periodChanges += 1
+            self._period = period
+        return period
+
+#-----------------------------------------------------------------------#
@@ -0,0 +1,158 @@
+#imports
+import time
+from sessionStore import DOOR_FAULT, SENSOR_FAULT, THERMAL_FAULT, ALARM
+
+#----------------Constants-----------------------#
+
+#Inputs sampled by the controller every tick, in this order
+ALARM_INPUTS = ('overTemp',     #Bag temperature above the set temp (C)
+                'underTemp',    #Bag temperature below the set temp (C)
+                'doorOpen',     #1 while the door is open
+                'sensorState',  #sensorHealth overall grade
+                'linkState',    #linkSupervisor state
+                'running',      #1 while the system runs
+                'incubating',   #1 while incubating
+                'overrun')      #Time since incubation completed (s), 0 before
+
+#Actions taken by the controller when a rule raises
+LOG = 0       #Session log and telemetry only
+POPUP = 1     #Error popup
+STOP = 2      #Stop the system and show the error popup
+DOOR = 3      #Stop the system and show the door warning
+MESSAGE = 4   #Show the incubation finished message again
+
+#Rules: name, input and threshold ('above' or 'below'), optionally the value it clears at (hysteresis, defaults
+#to the threshold), the time the condition must hold before raising (s), an input gating the rule (off clears
+#it), whether it latches until acknowledged, the action and the session event kind
+ALARM_RULES = [
+    {'name': 'Door open', 'input': 'doorOpen', 'above': 0.5, 'gate': 'running', 'action': DOOR,
+     'event': DOOR_FAULT},
+    #Logged once the bag has reached the set temp: lowering the set temp or starting with warm bags is normal, and
+    #thermalProtection stops the heater on a real over temperature with its own popup
+    {'name': 'Over temperature', 'input': 'overTemp', 'above': 1.0, 'clear': 0.5, 'delay': 2.0, 'gate': 'incubating',
+     'action': LOG, 'event': THERMAL_FAULT},
+    {'name': 'Under temperature', 'input': 'underTemp', 'above': 1.0, 'clear': 0.5, 'delay': 1800.0,
+     'gate': 'running', 'action': POPUP, 'event': THERMAL_FAULT},
+    {'name': 'Sensor fault', 'input': 'sensorState', 'above': 1.5, 'latch': True, 'action': STOP,
+     'event': SENSOR_FAULT},
+    {'name': 'Sensor warning', 'input': 'sensorState', 'above': 0.5, 'delay': 10.0, 'action': LOG,
+     'event': SENSOR_FAULT},
+    {'name': 'Link lost', 'input': 'linkState', 'above': 1.5, 'delay': 1.0, 'action': POPUP, 'event': ALARM},
+    {'name': 'Incubation overrun', 'input': 'overrun', 'above': 900.0, 'gate': 'running', 'action': MESSAGE,
+     'event': ALARM},
+]
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Alarm rules compiled into one evaluation function.  At
+                    startup every rule is checked against the inputs and turned
+                    into straight line source with its input index, thresholds
+                    and timers written in as constants, the source is compiled
+                    once.  A tick is one call: no rule table walk, no lookups,
+                    each rule costs a compare or two, so dozens of rules add
+                    microseconds.  A rule raises once its condition has held
+                    for its delay, clears once its input is back past the clear
+                    value or its gate goes off, and a latched rule stays raised
+                    until acknowledged after its condition has cleared
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created rule compiler with hysteresis, delays, gates and
+                    latching
+            -1.0.1: Over temperature rule only logs while incubating, stopping
+                    is left to thermal protection
+----------------------------------------------------------------------------"""
+class alarmEngine(object):
+
+    def __init__(self, rules = ALARM_RULES, inputs = ALARM_INPUTS):
+        self.rules = list(rules)
+        self.inputs = tuple(inputs)
+        count = len(self.rules)
+        #Raised, condition holding since, latched rule free to clear
+        self.active = [False]*count
+        self._since = [None]*count
+        self._cleared = [False]*count
+        self.source = self.compile()
+        namespace = {}
+        exec(compile(self.source, '<alarm rules>', 'exec'), namespace)
+        self._evaluate = namespace['evaluate']
+        #Statistics
+        self.evaluations = 0
+        self.raised = 0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Evaluates every rule
+         Inputs: values - inputs in ALARM_INPUTS order, now - time (s), the current time if None
+        Outputs: List of changes: (rule index, raised)
+    -------------------------------------------------------------------------------------------------------"""
+    def evaluate(self, values, now = None):
+        changes = []
+        self._evaluate(values, time.time() if now is None else now, self.active, self._since, self._cleared,
+                       changes)
+        self.evaluations += 1
+        self.raised += sum(1 for index, raised in changes if raised)
+        return changes
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Acknowledges latched rules, those whose condition has cleared are cleared
+         Inputs: None
+        Outputs: List of changes: (rule index, False)
+    -------------------------------------------------------------------------------------------------------"""
+    def acknowledge(self):
+        changes = []
+        for index, rule in enumerate(self.rules):
+            if self.active[index] and self._cleared[index]:
+                self.active[index] = False
+                self._cleared[index] = False
+                changes.append((index, False))
+        return changes
+
+    def activeNames(self):
+        return [rule['name'] for rule, active in zip(self.rules, self.active) if active]
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Builds the evaluation function source, one block per rule
+         Inputs: None
+        Outputs: Source of evaluate(v, now, a, s, c, out): inputs, time, raised, holding since, latched rule
+                 cleared, list the changes are added to
+    -------------------------------------------------------------------------------------------------------"""
+    def compile(self):
+        lines = ['def evaluate(v, now, a, s, c, out):']
+        for i, rule in enumerate(self.rules):
+            if ('above' in rule) == ('below' in rule):
+                raise ValueError('alarm rule %r needs one of above or below' % rule.get('name'))
+            if rule['input'] not in self.inputs or rule.get('gate', self.inputs[0]) not in self.inputs:
+                raise ValueError('alarm rule %r uses an unknown input' % rule['name'])
+            if 'above' in rule:
+                raiseTest = 'x > %r' % float(rule['above'])
+                clearTest = 'x < %r' % float(rule.get('clear', rule['above']))
+            else:
+                raiseTest = 'x < %r' % float(rule['below'])
+                clearTest = 'x > %r' % float(rule.get('clear', rule['below']))
+            if rule.get('gate') is not None:
+                gate = 'v[%d]' % self.inputs.index(rule['gate'])
+                raiseTest = '%s and %s' % (gate, raiseTest)
+                clearTest = 'not %s or %s' % (gate, clearTest)
+            lines += ['    # %s' % rule['name'],
+                      '    x = v[%d]' % self.inputs.index(rule['input']),
+                      '    if %s:' % raiseTest,
+                      '        c[%d] = False' % i,
+                      '        if not a[%d]:' % i,
+                      '            if s[%d] is None:' % i,
+                      '                s[%d] = now' % i,
+                      '            if now - s[%d] >= %r:' % (i, float(rule.get('delay', 0.0))),
+                      '                a[%d] = True' % i,
+                      '                out.append((%d, True))' % i,
+                      '    else:',
+                      '        s[%d] = None' % i,
+                      '        if a[%d] and (%s):' % (i, clearTest)]
+            if rule.get('latch'):
+                lines.append('            c[%d] = True' % i)
+            else:
+                lines += ['            a[%d] = False' % i,
+                          '            out.append((%d, False))' % i]
+        return '\n'.join(lines) + '\n'
+
+#-----------------------------------------------------------------------#
@@ -1,24 +1,26 @@
 #imports
-import serial
 import math
 import time
 import struct
 import binascii
 import logging
-import RPi.GPIO as GPIO
+import threading
 from PyQt4 import QtCore
+from rttEstimator import rttEstimator
+from serialCapture import serialCapture, capturePort, CAPTURE_FILE, CAPTURE_SIZE
+import protocolV1
+from protocolV1 import BEGIN, END
+import protocolV2
+from protocolV2 import PROTOCOL_V1, PROTOCOL_V2, VERSION_REQUEST, DELIMITER, HEADER_BYTES
+import statusDelta
+from transport import openTransport, serialTransport
+from resetLine import gpioResetLine, noResetLine
 
 #----------------Constants-----------------------#
 
-#Pi GPIO pin to reset Atmega
-ATMEGA_RESET_PIN = 25
-
-#Communication control characters
-BEGIN = 0x02 #Start transmission
-END = 0x03 #End transmission
+#Communication control characters, BEGIN, END and ESC frame v1 packets (protocolV1)
 ACK = 0x06 #Acknowledge packet
 NACK = 0x15 #No acknowledge packet
-ESC = 0x1B #Escape character: indicates control characters within packet
 
 #--------------------Commands--------------------#
 STATUS_REQUEST = 0x07 #Returns status of all hardware
@@ -65,12 +67,72 @@ Command values correspond to the following frequencies:
 15 => 30.5Hz
 """
 FREQ_SET = 0x0C
+
+"""
+Starts or stops streaming status frames
+Accepted values: stream period in ms, 0 stops the stream
+Stream frames are status packets starting with STREAM_STATUS instead of ACK
+followed by a sequence number, sent between command responses
+"""
+SUBSCRIBE = 0x0E
+STREAM_STATUS = 0x11
+#Index of the sequence number in a stream frame, after the status fields
+STREAM_SEQ_INDEX = 29
+
+"""
+Selects the stream frame encoding
+Accepted values: keyframe interval in frames, 0 sends full frames only
+With an interval every stream keyframe (STREAM_STATUS frame) carries a key id after
+the sequence number, frames in between are STREAM_DELTA: sequence number, key id
+and the fields that differ from that keyframe (see statusDelta)
+"""
+STATUS_ENCODING = 0x0F
+STREAM_DELTA = 0x12
+STREAM_KEY_INDEX = 30
+#Bytes of a delta frame before the delta: STREAM_DELTA, sequence number, key id
+DELTA_HEADER = 3
 #------------------------------------------------#
 
 
 #-----------Serial port config values------------#
+#Device path, or tcp://host:port for a board behind a serial server (see transport)
 SERIALPORT = '/dev/serial0'
 BAUD_RATE = 19200
+#Polling granularity while waiting for response bytes (s), the response
+#timeout itself is adapted to the measured round trip time (see rttEstimator)
+READ_TIMEOUT = 0.005
+
+#-----------Retry policy-------------------------#
+#Attempts after the first for a NACKed, corrupt or timed out transaction
+MAX_RETRIES = 2
+#Backoff before the first retry, doubled on each retry up to BACKOFF_MAX (s)
+BACKOFF_BASE = 0.002
+BACKOFF_MAX = 0.02
+
+#Transaction errors
+TIMEOUT_ERROR = 1
+CORRUPT_ERROR = 2
+NACK_ERROR = 3
+
+#-----------Atmega reset timing------------------#
+#Reset pulse and boot time used at startup
+STARTUP_RESET_PULSE = 2
+STARTUP_BOOT_TIME = 2
+
+#Highest protocol version offered at link bring-up, PROTOCOL_V1 keeps the link on v1
+PREFERRED_PROTOCOL = PROTOCOL_V2
+
+#-----------Status streaming---------------------#
+#Time without a stream frame before subscribing again (s), at least STREAM_TIMEOUT_PERIODS stream periods
+STREAM_TIMEOUT = 0.2
+STREAM_TIMEOUT_PERIODS = 4
+#Stream frames kept between reads, older frames are dropped when the reader falls behind
+MAX_STREAM_BACKLOG = 32
+#Minimum time between keyframe requests after deltas arrived without their keyframe (s)
+KEYFRAME_RETRY = 0.2
+
+#Output commands replayed after link recovery, in order
+OUTPUT_CMDS = [FREQ_SET, MOTOR_DUTY_SET, FAN_POWER_SET, FAN_DUTY_SET, HEATER_DUTY_SET]
 
 
 #debug file
@@ -90,6 +152,32 @@ LOGFILE = '/home/pi/Downloads/comm.log'
             -1.0.1: Updated to include fan power control/status
 			-1.0.2: Added reset of atmega at startup, removed receive delay to tune 
 					comm time from 150ms to 26ms
+            -1.0.3: Serialized sendCmd with a lock so the safety path can send from
+                    the GPIO callback thread, allowed passing in a port (simulated device)
+            -1.0.4: Added read timeouts, fixed hang in readRsp and empty response handling
+                    in extractPacket, track heartbeat/consecutive failures and last commanded
+                    outputs, added reopen, resetDevice and replayOutputs for link recovery
+            -1.0.5: Response timeout adapted per command type from measured round trip
+                    time, NACKed/corrupt/timed out transactions retried with bounded
+                    exponential backoff, added retry and error counters
+            -1.0.6: Added cmdFilter hook so the safety interlock can veto commands
+            -1.0.7: Added raw serial capture (startCapture/stopCapture)
+            -1.0.8: Added protocol v2 framing chosen by a version handshake after
+                    reset, v1 kept as fallback, fixed decodeCtrlChar for an escaped
+                    ESC followed by another escape sequence
+            -1.0.9: Added status streaming (subscribe/readStream), stream frames
+                    are routed aside while waiting for a command response, stream
+                    sequence gaps counted, stalled stream subscribed again
+            -1.0.10: Added compact stream encoding, delta frames rebuilt against
+                     their keyframe, keyframe requested when it was lost
+            -1.0.11: Port opened through a transport (serial, TCP serial server or
+                     in process loopback), reset pin moved behind resetLine
+            -1.0.12: v1 escaping, checksum and framing moved to protocolV1
+            -1.0.13: Stream stall timeout scales with the stream period
+            -1.0.14: holdReset, releaseReset and booted for resets that do not block
+                     the caller
+            -1.0.15: A corrupt frame while streaming no longer answers the command
+                     in flight
 ----------------------------------------------------------------------------"""
 """
 Hardware state values:
@@ -126,17 +214,25 @@ class arduinoComm(QtCore.QObject):
     #To send hardware status to another thread
     hardwareStatusUpdate = QtCore.pyqtSignal(bytearray)
 
-    def __init__(self, parent = None, runCmd = 0, cmdType = STATUS_REQUEST, cmdValue = 0x00, checksum = 0x00):
+    def __init__(self, parent = None, runCmd = 0, cmdType = STATUS_REQUEST, cmdValue = 0x00, checksum = 0x00, ser = None,
+                 resetLine = None):
         
         super(self.__class__, self).__init__(parent)
-        #TODO Add code here to hold atmega reset pin high for 2s before attempting serial communication
-        #Initialize serial port
-        self.ser=serial.Serial(port=SERIALPORT, baudrate=BAUD_RATE, bytesize=8, parity = 'N', stopbits = 1)
+        #The Atmega is held in reset for STARTUP_RESET_PULSE through resetLine before the first transaction
+        #(stopOutput)
+        #Initialize serial port, any transport (see transport)
+        if ser is None:
+            ser = openTransport(SERIALPORT, BAUD_RATE)
+        self.ser = ser
+        self.ser.timeout = READ_TIMEOUT
         self.ser.close()
         self.ser.open()
-        #Configure Atmega reset pin
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(ATMEGA_RESET_PIN, GPIO.OUT)
+        #One transaction at a time, commands may come from the controller or the safety path
+        self._lock = threading.RLock()
+        #Atmega reset line, only a local UART has the reset pin wired to the Pi
+        if resetLine is None:
+            resetLine = gpioResetLine() if isinstance(ser, serialTransport) else noResetLine()
+        self.resetLine = resetLine
         
         #Initialize debug logger
         self.logger = logging.getLogger('arduinoComm')
@@ -153,6 +249,47 @@ class arduinoComm(QtCore.QObject):
         self._cmdValue = cmdValue
         self._checksum = checksum
 
+        #Link health: time of last valid frame and failed transactions in a row
+        self.lastRxTime = time.time()
+        self.consecutiveFailures = 0
+        #Last value sent for each output command, replayed after recovery
+        self._lastOutputs = {}
+        #Optional filter applied to every command inside the transaction lock (safety interlock)
+        self.cmdFilter = None
+        #Round trip time estimate and transaction counters
+        self.rtt = rttEstimator()
+        self._lastError = None
+        self.transactions = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.corruptFrames = 0
+        self.nacks = 0
+        self.failedTransactions = 0
+        #Raw traffic capture, None when off so the link runs on the bare port
+        self.capture = None
+        #Framing in use, negotiated after every Atmega reset
+        self.protocol = PROTOCOL_V1
+        self.preferredProtocol = PREFERRED_PROTOCOL
+        #Status streaming: period (ms, 0 when polling), received bytes not yet framed, frames not yet read
+        self.streamPeriod = 0
+        self._rxBuffer = bytearray()
+        self._streamFrames = []
+        self._expectedSeq = None
+        self.lastStreamTime = None
+        self.streamReceived = 0
+        self.streamLost = 0
+        self.streamDuplicates = 0
+        self.streamStale = 0
+        self.resubscriptions = 0
+        #Compact stream encoding: keyframe interval (0 for full frames), last keyframe and its key id
+        self.keyframeInterval = 0
+        self._keyframe = None
+        self._keyId = None
+        self._keyframeNeeded = False
+        self._lastKeyframeRequest = 0
+        self.deltaFrames = 0
+        self.deltaMisses = 0
+
         #Initialize outputs as zero
         self.stopOutput()
 
@@ -163,67 +300,423 @@ class arduinoComm(QtCore.QObject):
     Description: Sends command to arduino and receives response
          Inputs: cmd = [cmdType (byte), cmdValue (byte)] - must be from list of acceptable commands at top of file
         Outputs: emits status of all hardware to a slot in another thread
+          Notes: Safe to call from any thread, transactions are serialized
     ----------------------------------------------------------------------------------------------------"""
     def sendCmd(self, cmd):
-        self.logger.debug('sending command')
-        #Encode command for control characters
-        cmd = self.encodeCmd(cmd)
-        #Calculate checksum for packet
-        crc = self.CRC8(cmd)
-        #Clear serial buffers
-        self.ser.flushInput()
-        self.ser.flushOutput()
-        #Frame packet and send
-        cmd = bytearray([BEGIN]) + cmd + bytearray([crc]) + bytearray([END])
-        self.ser.write(cmd)
-		#Receive response
-        resp = self.readRsp()
-        return self.processRsp(resp)
+        with self._lock:
+            self.logger.debug('sending command')
+            self.transactions += 1
+            if self.cmdFilter is not None:
+                cmd = self.cmdFilter(cmd)
+            cmdType = cmd[0]
+            #Remember commanded outputs so they can be restored after a link failure
+            if cmdType in OUTPUT_CMDS:
+                self._lastOutputs[cmdType] = cmd[1]
+            if self.protocol == PROTOCOL_V2:
+                cmd = protocolV2.encodeFrame(cmd)
+            else:
+                cmd = protocolV1.encodeFrame(cmd)
+            for attempt in range(MAX_RETRIES + 1):
+                if attempt > 0:
+                    self.retries += 1
+                    time.sleep(min(BACKOFF_BASE*(2**(attempt - 1)), BACKOFF_MAX))
+                start = time.time()
+                resp = self.transact(cmd, self.rtt.timeout(cmdType))
+                if self._lastError is None:
+                    #Only first attempts give unambiguous round trip samples
+                    if attempt == 0:
+                        self.rtt.sample(cmdType, time.time() - start)
+                    return resp
+                if self._lastError == TIMEOUT_ERROR:
+                    self.rtt.backoff(cmdType)
+            self.failedTransactions += 1
+            if self._lastError != NACK_ERROR:
+                self.consecutiveFailures += 1
+            return resp
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Transaction counters and round trip estimates for reporting
+         Inputs: None
+        Outputs: dict of counters, rtt maps cmdType to (srtt, rttvar, timeout)
+    -------------------------------------------------------------------------------------------------------"""
+    def linkStats(self):
+        return {'transactions': self.transactions, 'retries': self.retries, 'timeouts': self.timeouts,
+                'corruptFrames': self.corruptFrames, 'nacks': self.nacks,
+                'failedTransactions': self.failedTransactions, 'rtt': self.rtt.snapshot(),
+                'streamReceived': self.streamReceived, 'streamLost': self.streamLost,
+                'streamDuplicates': self.streamDuplicates, 'streamStale': self.streamStale,
+                'resubscriptions': self.resubscriptions, 'deltaFrames': self.deltaFrames,
+                'deltaMisses': self.deltaMisses}
+
+    @property
+    def streaming(self):
+        return self.streamPeriod > 0
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Asks the Atmega to stream status frames, firmware without streaming NACKs and the link keeps
+                 polling
+         Inputs: period - stream period (ms), 0 stops the stream
+        Outputs: True if the Atmega acknowledged
+    -------------------------------------------------------------------------------------------------------"""
+    def subscribe(self, period):
+        with self._lock:
+            resp = self.sendCmd(bytearray([SUBSCRIBE, period]))
+            #A failed subscribe while streaming is tried again after STREAM_TIMEOUT
+            self.lastStreamTime = time.time()
+            if resp[0] == NACK:
+                if period == 0:
+                    self.streamPeriod = 0
+                return False
+            self.streamPeriod = period
+            self._expectedSeq = None
+            return True
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Selects compact stream frames, firmware without them NACKs and full frames are kept.  The
+                 Atmega starts over with a keyframe
+         Inputs: interval - keyframe interval in frames, 0 for full frames only
+        Outputs: True if the Atmega acknowledged
+    -------------------------------------------------------------------------------------------------------"""
+    def compactStatus(self, interval):
+        with self._lock:
+            self._lastKeyframeRequest = time.time()
+            resp = self.sendCmd(bytearray([STATUS_ENCODING, interval]))
+            if resp[0] == NACK:
+                if self._lastError == NACK_ERROR:
+                    self.keyframeInterval = 0
+                return False
+            self.keyframeInterval = interval
+            self._keyframeNeeded = False
+            return True
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Stream frames received since the last call.  Subscribes again if the stream has stalled
+                 (Atmega reset or subscribe lost)
+         Inputs: None
+        Outputs: List of (status packet, receive time), oldest first
+    -------------------------------------------------------------------------------------------------------"""
+    def readStream(self):
+        with self._lock:
+            if not self.streaming:
+                return []
+            try:
+                frame = self.nextFrame(0)
+                while frame:
+                    self.routeFrame(frame)
+                    frame = self.nextFrame(0)
+            except (IOError, OSError) as e:
+                self.logger.warning('Serial port error: %s' % e)
+            if self.capture is not None:
+                self.ser.flushCapture()
+            frames, self._streamFrames = self._streamFrames, []
+            timeout = max(STREAM_TIMEOUT, STREAM_TIMEOUT_PERIODS*self.streamPeriod/1000.0)
+            if time.time() - self.lastStreamTime > timeout:
+                self.logger.warning('Status stream stalled, subscribing again')
+                self.resubscriptions += 1
+                #The Atmega may have been reset, its key ids start over
+                self._keyframe = None
+                if self.subscribe(self.streamPeriod) and self.keyframeInterval:
+                    self.compactStatus(self.keyframeInterval)
+            elif self._keyframeNeeded and time.time() - self._lastKeyframeRequest > KEYFRAME_RETRY:
+                self.compactStatus(self.keyframeInterval)
+            return frames
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Closes and reopens the serial port after a link failure
+         Inputs: None
+        Outputs: True if the port was reopened
+    -------------------------------------------------------------------------------------------------------"""
+    def reopen(self):
+        with self._lock:
+            self.logger.warning('Reopening serial port')
+            try:
+                self.ser.close()
+                self.ser.open()
+                self.ser.flushInput()
+                self._rxBuffer = bytearray()
+                return True
+            except (IOError, OSError) as e:
+                self.logger.warning('Could not reopen serial port: %s' % e)
+                return False
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Resets the Atmega by pulsing its reset pin
+         Inputs: pulse - time to hold reset (s), boot - time to wait for the Atmega to boot (s)
+        Outputs: Atmega outputs return to their power on defaults
+    -------------------------------------------------------------------------------------------------------"""
+    def resetDevice(self, pulse, boot):
+        with self._lock:
+            self.logger.warning('Resetting Atmega')
+            self.resetLine.pulse(pulse)
+            self.resetLine.waitBoot(boot)
+            self.booted()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Holds and releases the Atmega reset pin, for callers that wait out the pulse and boot time
+                 themselves (link recovery from the control tick).  booted is called once the boot time has
+                 passed
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def holdReset(self):
+        with self._lock:
+            self.logger.warning('Resetting Atmega')
+            self.resetLine.hold()
+
+    def releaseReset(self):
+        with self._lock:
+            self.resetLine.release()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Brings the link up again on a freshly booted Atmega: version handshake, stream subscription
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def booted(self):
+        with self._lock:
+            #The Atmega boots speaking v1, not streaming
+            self.protocol = PROTOCOL_V1
+            self._rxBuffer = bytearray()
+            self._keyframe = None
+            self.negotiateProtocol()
+            if self.streaming and self.subscribe(self.streamPeriod) and self.keyframeInterval:
+                self.compactStatus(self.keyframeInterval)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Version handshake, asks the Atmega for the preferred protocol in v1 framing.  Firmware
+                 without v2 NACKs the request and the link stays on v1.  If the request gets no valid answer
+                 the Atmega may already be on v2 (answer to an earlier request lost), a v2 status request
+                 settles it
+         Inputs: None
+        Outputs: Protocol version in use
+    -------------------------------------------------------------------------------------------------------"""
+    def negotiateProtocol(self):
+        with self._lock:
+            if self.preferredProtocol == PROTOCOL_V1:
+                return self.protocol
+            resp = self.sendCmd(bytearray([VERSION_REQUEST, self.preferredProtocol]))
+            if resp[0] == ACK and len(resp) >= 2 and resp[1] == PROTOCOL_V2:
+                self.protocol = PROTOCOL_V2
+            elif self._lastError != NACK_ERROR:
+                self.protocol = PROTOCOL_V2
+                #A lone delimiter clears whatever v1 bytes the Atmega v2 receiver holds
+                self.ser.write(bytearray([DELIMITER]))
+                resp = self.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+                if self._lastError is not None:
+                    self.protocol = PROTOCOL_V1
+            self.logger.debug('Using protocol v%d' % self.protocol)
+            return self.protocol
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Resends the last commanded value of every output, used after the Atmega has been reset
+         Inputs: None
+        Outputs: True if every output command was acknowledged
+    -------------------------------------------------------------------------------------------------------"""
+    def replayOutputs(self):
+        with self._lock:
+            acked = True
+            for cmdType in OUTPUT_CMDS:
+                if cmdType in self._lastOutputs:
+                    resp = self.sendCmd(bytearray([cmdType, self._lastOutputs[cmdType]]))
+                    acked = acked and resp[0] != NACK
+            return acked
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Starts recording every byte sent and received to a capture ring file, see protocolAnalyzer
+         Inputs: path - capture file, size - ring size (bytes)
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def startCapture(self, path = CAPTURE_FILE, size = CAPTURE_SIZE):
+        with self._lock:
+            if self.capture is not None:
+                return
+            self.capture = serialCapture(path, size)
+            self.ser = capturePort(self.ser, self.capture)
+            self.logger.debug('Capturing serial traffic to %s' % path)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Stops capturing and puts the bare port back
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def stopCapture(self):
+        with self._lock:
+            if self.capture is None:
+                return
+            self.ser.flushCapture()
+            self.ser = self.ser.port
+            self.capture.close()
+            self.capture = None
 
     #--------------------Private Functions----------------------#
 
     """-------------------------------------------------------------------------------------------------------
-    Description: Encodes for control characters contained within packet
-         Inputs: cmd (bytearray) - Unencoded command with checksum and control characters
-        Outputs: Returns command encoded for control characters
+    Description: Sends one framed command and waits for its response
+         Inputs: cmd (bytearray) - framed command, timeout - time to wait for the response (s)
+        Outputs: Processed response, self._lastError set to None or the error type
     -------------------------------------------------------------------------------------------------------"""
-    def encodeCmd(self,cmd):
-        encodedCmd = bytearray([])
-        #Checks each byte for control character,
-        #If found, sets bit 7 high and inserts ESC before it
-        for i in cmd:
-            if (i == BEGIN) or (i == END) or (i == ESC):
-                encodedCmd = encodedCmd + bytearray([ESC]) + bytearray([(i | (1 << 7))])
+    def transact(self, cmd, timeout):
+        if self.streaming:
+            return self.streamTransact(cmd, timeout)
+        try:
+            #Clear serial buffers
+            self.ser.flushInput()
+            self.ser.flushOutput()
+            self.ser.write(cmd)
+            #Receive response
+            if self.protocol == PROTOCOL_V2:
+                resp = self.readFrame(timeout)
             else:
-                encodedCmd = encodedCmd + bytearray([i])
-        return encodedCmd
+                resp = self.readRsp(timeout)
+        except (IOError, OSError) as e:
+            self.logger.warning('Serial port error: %s' % e)
+            resp = bytearray()
+        return self.processRsp(resp)
 
     """-------------------------------------------------------------------------------------------------------
-    Description: Calculates 8-bit CRC Maxim/Dallas Checksum of data packet
-         Inputs: data (bytearray) - encoded command or encoded response with control characters removed
-        Outputs: Returns checksum for data
+    Description: Transaction while streaming: input is not flushed, stream frames arriving before the
+                 response are kept for readStream, other frames received before the command is sent dropped.
+                 A corrupt frame may have been a stream frame: it is counted and the response still waited
+                 for, the transaction only fails as corrupt if none arrives in time
+         Inputs: cmd (bytearray) - framed command, timeout - time to wait for the response (s)
+        Outputs: Processed response, self._lastError set to None or the error type
     -------------------------------------------------------------------------------------------------------"""
-    def CRC8(self, data):
-        crc = 0x00
-        for e in data:   
-            for i in range(8):
-                s = (crc^e) & 0x01
-                crc >>= 1
-                if (s):
-                    crc ^= 0x8C
-                e >>= 1
-        return crc
-    
+    def streamTransact(self, cmd, timeout):
+        deadline = time.time() + timeout
+        try:
+            #Frames already received can't answer this command, late responses are dropped
+            frame = self.nextFrame(0)
+            while frame:
+                self.routeFrame(frame)
+                frame = self.nextFrame(0)
+            self.ser.write(cmd)
+            corrupt = False
+            while True:
+                frame = self.nextFrame(deadline)
+                resp = self.routeFrame(frame)
+                if resp is None:
+                    continue
+                if frame and self._lastError == CORRUPT_ERROR:
+                    corrupt = True
+                    continue
+                if corrupt and self._lastError == TIMEOUT_ERROR:
+                    #The response itself may have been the corrupt frame, not a slow one
+                    self._lastError = CORRUPT_ERROR
+                return resp
+        except (IOError, OSError) as e:
+            self.logger.warning('Serial port error: %s' % e)
+            return self.processRsp(bytearray())
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Processes a received frame, stream frames are checked for sequence gaps and queued
+         Inputs: frame - as returned by nextFrame, empty on timeout
+        Outputs: Processed response, None if the frame was a stream frame
+    -------------------------------------------------------------------------------------------------------"""
+    def routeFrame(self, frame):
+        resp = self.processRsp(frame)
+        if resp[0] == STREAM_DELTA:
+            resp = self.expandDelta(resp)
+            if resp is None:
+                return None
+        elif resp[0] != STREAM_STATUS or len(resp) <= STREAM_SEQ_INDEX:
+            return resp
+        elif len(resp) > STREAM_KEY_INDEX:
+            self._keyframe = resp[:STREAM_SEQ_INDEX]
+            self._keyId = resp[STREAM_KEY_INDEX]
+            self._keyframeNeeded = False
+        now = time.time()
+        seq = resp[STREAM_SEQ_INDEX]
+        if self._expectedSeq is not None:
+            gap = (seq - self._expectedSeq) & 0xFF
+            #Far behind the expected number is an old or repeated frame
+            if gap >= 0x80:
+                self.streamDuplicates += 1
+                return None
+            self.streamLost += gap
+        self._expectedSeq = (seq + 1) & 0xFF
+        self.streamReceived += 1
+        self.lastStreamTime = now
+        self._streamFrames.append((resp, now))
+        if len(self._streamFrames) > MAX_STREAM_BACKLOG:
+            del self._streamFrames[0]
+            self.streamStale += 1
+        return None
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Rebuilds a full stream frame from a delta frame and its keyframe
+         Inputs: resp - delta frame payload
+        Outputs: Stream frame as the Atmega sends it without compact encoding, None if the keyframe it
+                 refers to was not received
+    -------------------------------------------------------------------------------------------------------"""
+    def expandDelta(self, resp):
+        status = None
+        if len(resp) >= DELTA_HEADER and self._keyframe is not None and resp[2] == self._keyId:
+            status = statusDelta.decodeDelta(self._keyframe, resp[DELTA_HEADER:])
+        if status is None:
+            self.deltaMisses += 1
+            self._keyframeNeeded = True
+            return None
+        self.deltaFrames += 1
+        status[0] = STREAM_STATUS
+        status.append(resp[1])
+        return status
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Next complete frame from the port, reading whatever has arrived in one go
+         Inputs: deadline - time to stop waiting, 0 returns only frames already received
+        Outputs: Frame in the form readRsp (v1) or readFrame (v2) returns, empty if none arrived in time
+    -------------------------------------------------------------------------------------------------------"""
+    def nextFrame(self, deadline):
+        while True:
+            frame = self.popFrame()
+            if frame is not None:
+                return frame
+            waiting = self.ser.inWaiting()
+            if waiting:
+                self._rxBuffer += self.ser.read(waiting)
+            elif time.time() >= deadline:
+                return bytearray()
+            else:
+                self._rxBuffer += self.ser.read(1)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Takes the first complete frame off the receive buffer, bytes before it are dropped
+         Inputs: None
+        Outputs: Frame, None if no complete frame has been received
+    -------------------------------------------------------------------------------------------------------"""
+    def popFrame(self):
+        buf = self._rxBuffer
+        if self.protocol == PROTOCOL_V2:
+            end = buf.find(bytearray([DELIMITER]))
+            while end == 0:
+                del buf[0]
+                end = buf.find(bytearray([DELIMITER]))
+            if end < 0:
+                return None
+            frame = buf[:end + 1]
+            del buf[:end + 1]
+            return frame
+        start = buf.find(bytearray([BEGIN]))
+        if start < 0:
+            del buf[:]
+            return None
+        end = buf.find(bytearray([END]), start)
+        if end < 0:
+            del buf[:start]
+            return None
+        #A BEGIN inside the frame restarts it, as readRsp does
+        start = buf.rfind(bytearray([BEGIN]), start, end)
+        frame = buf[start + 1:end]
+        del buf[:end + 1]
+        return frame
+
     """-------------------------------------------------------------------------------------------------------
     Description: Sets all output hardware to defaults
          Inputs: Nothing
         Outputs: Motor, fan, and heater duty cycles set to 0. Pwm frequency set to 30Hz
     -------------------------------------------------------------------------------------------------------"""
     def stopOutput(self):
-        GPIO.output(ATMEGA_RESET_PIN,GPIO.HIGH)
-        time.sleep(2)
-        GPIO.output(ATMEGA_RESET_PIN,GPIO.LOW)
-        time.sleep(2)
+        self.resetDevice(STARTUP_RESET_PULSE, STARTUP_BOOT_TIME)
         self.sendCmd(bytearray([MOTOR_DUTY_SET, 0x00]))
         self.sendCmd(bytearray([FAN_DUTY_SET, 0x00]))
         self.sendCmd(bytearray([FAN_POWER_SET, 0x00]))
@@ -232,25 +725,56 @@ class arduinoComm(QtCore.QObject):
 
     """-------------------------------------------------------------------------------------------------------
     Description: Reads response from arduino
-         Inputs: Data on serial port if present
-        Outputs: Response from arduino given that it is framed by a BEGIN and END byte
+         Inputs: Data on serial port if present, timeout - time to wait for a complete frame (s)
+        Outputs: Response from arduino given that it is framed by a BEGIN and END byte, empty if no complete
+                 frame arrived within the timeout
     -------------------------------------------------------------------------------------------------------"""
-    def readRsp(self):
+    def readRsp(self, timeout):
         resp = bytearray()
         trans = False
         #Wait for response
         self.logger.debug('Waiting for response')
-        while self.ser.inWaiting > 0:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
             c = self.ser.read(1)
+            #Nothing yet, keep waiting until the deadline
+            if not c:
+                continue
             #Wait for BEGIN to read response, stop reading after END
             if c == bytearray([BEGIN]):
                 trans = True
             elif trans:
                 if c == bytearray([END]):
-                    break
+                    return resp
                 else:
                     resp += c
-        return resp
+        self.logger.debug('Response timeout')
+        return bytearray()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Reads a v2 response: the first two bytes give the frame length, the rest is read at once
+         Inputs: Data on serial port if present, timeout - time to wait for a complete frame (s)
+        Outputs: Frame up to and including the delimiter, empty if no complete frame arrived within the
+                 timeout
+    -------------------------------------------------------------------------------------------------------"""
+    def readFrame(self, timeout):
+        frame = bytearray()
+        length = HEADER_BYTES
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            c = self.ser.read(length - len(frame))
+            if not c:
+                continue
+            frame += c
+            #Delimiter left over from an earlier frame
+            while frame[:1] == bytearray([DELIMITER]):
+                del frame[0]
+            if len(frame) >= HEADER_BYTES:
+                length = protocolV2.frameLength(frame)
+                if len(frame) >= length:
+                    return frame
+        self.logger.debug('Response timeout')
+        return bytearray()
 
     """-------------------------------------------------------------------------------------------------------
     Description: Determines if command was received, if it is emits status update
@@ -259,22 +783,46 @@ class arduinoComm(QtCore.QObject):
     -------------------------------------------------------------------------------------------------------"""
     def processRsp(self, resp):
         #Check if packet is valid and if so extract it
-        resp = self.extractPacket(resp)
+        if self.protocol == PROTOCOL_V2:
+            resp = self.extractFrame(resp)
+        else:
+            resp = self.extractPacket(resp)
+            if resp:
+                resp = protocolV1.decodeCtrlChar(resp)
+        #Track link health, any frame with a valid checksum counts as a heartbeat
+        if (resp != None):
+            self.lastRxTime = time.time()
+            self.consecutiveFailures = 0
         if (resp != None):
-            #Decode packet if valid
             if (len(resp) > 0):
-                resp = self.decodeCtrlChar(resp)
                 #Update status
                 if resp[0] == NACK:
                     self.logger.debug('Command not acknowledged')
+                    self.setError(NACK_ERROR)
                     return bytearray([NACK])
                 else:
+                    self._lastError = None
                     return resp
             else:
+                self.setError(CORRUPT_ERROR)
                 return bytearray([NACK])
         else:
             return bytearray([NACK])
 
+    """-------------------------------------------------------------------------------------------------------
+    Description: Records why the last transaction failed
+         Inputs: error - TIMEOUT_ERROR, CORRUPT_ERROR or NACK_ERROR
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def setError(self, error):
+        self._lastError = error
+        if error == TIMEOUT_ERROR:
+            self.timeouts += 1
+        elif error == CORRUPT_ERROR:
+            self.corruptFrames += 1
+        else:
+            self.nacks += 1
+
          
         
     """-------------------------------------------------------------------------------------------------------
@@ -286,38 +834,43 @@ class arduinoComm(QtCore.QObject):
         self.logger.debug('Checking Packet')
         lenresp = len(resp)
         status = bytearray()
+        #Timed out or truncated, nothing to check
+        if lenresp == 0:
+            self.setError(TIMEOUT_ERROR)
+            return None
+        if lenresp < 2:
+            self.logger.debug('Truncated response')
+            self.setError(CORRUPT_ERROR)
+            return None
         #Get received checksum
         self._checksum = resp[lenresp-1]
         #Extract packet from received transmission
         for i in range(lenresp-1):
                 status += bytearray([resp[i]])
         #Calculate checksum and compare it with received 
-        if (self._checksum == self.CRC8(status)):
+        if (self._checksum == protocolV1.crc8(status)):
             self.logger.debug('Valid status')
             return status
         else:
             self.logger.debug('Invalid Checksum')
+            self.setError(CORRUPT_ERROR)
             return None
         
 
     """-------------------------------------------------------------------------------------------------------
-    Description: Decode control characters from received packet
-         Inputs: Valid packet with frame completely removed
-        Outputs: Received packet decoded for control characters
+    Description: Checks and unframes a v2 response
+         Inputs: Received frame including the delimiter
+        Outputs: Payload if the frame is valid, otherwise None
     -------------------------------------------------------------------------------------------------------"""
-    def decodeCtrlChar(self, status):
-        self.logger.debug('Decoding Control Characters')
-        decodedStatus = bytearray([])
-        #If ESC found, ignore and decode next character by setting bit 8 LOW
-        for i in range(len(status)):
-            if (status[i] == ESC):
-                if ((i > 0) and (status[i-1] == ESC)):
-                    decodedStatus= decodedStatus + bytearray([status[i]])
-                elif (i < len(status)-1):
-                        status[i+1]  = status[i+1] & 0x7F
-            else:
-                decodedStatus = decodedStatus + bytearray([status[i]])
-        return decodedStatus
+    def extractFrame(self, resp):
+        if len(resp) == 0:
+            self.setError(TIMEOUT_ERROR)
+            return None
+        status = protocolV2.decodeFrame(resp)
+        if status is None:
+            self.logger.debug('Invalid frame')
+            self.setError(CORRUPT_ERROR)
+        return status
 
 #-----------------------------------------------------------------------#
      
@@ -0,0 +1,1275 @@
+#-----------------------------------------------------------#
+#
+# Program Description: Timing benchmarks for the blood warmer host software,
+#                      run against the simulated AtMega so no hardware is needed
+# Usage: python benchmark.py [benchmark name ...]
+#
+#-----------------------------------------------------------#
+
+#-----------------------------------------------------------#
+# INCLUDES
+#-----------------------------------------------------------#
+import sys, os, time, math, random, threading, struct, termios, socket, tempfile, shutil
+from simulatedDevice import simulatedDevice, simulatedPort, ptyDeviceServer
+from arduinoComm import arduinoComm
+from hardwareState import hardwareState, KEYFRAME_INTERVAL
+from commandScheduler import commandScheduler, SAFETY, CONTROL, HOUSEKEEPING
+from adaptivePoller import adaptivePoller, IDLE, HEATING, INCUBATING
+from outputReconciler import outputReconciler
+from statusBus import statusBusWriter, statusBusReader
+from ipcBridge import ipcChannel, bridgeSockets, CORE_MESSAGES, GUI_MESSAGES
+from checkpointStore import checkpointStore
+from sessionStore import sessionStore, STATE_CHANGE, COMPLETE
+from usbExporter import usbExporter
+from serialCapture import serialCapture
+from protocolAnalyzer import protocolAnalyzer, replayPort
+import protocolV1
+import protocolV2
+from protocolV2 import PROTOCOL_V1, PROTOCOL_V2
+from fleetHost import fleetHost, configurePort, LINK_UP
+from busLink import busLink
+from busScheduler import busScheduler
+from transport import tcpTransport, loopbackTransport
+from resetLine import deviceResetLine
+from telemetryServer import telemetryServer
+from telemetryAggregator import telemetryAggregator
+from trendChart import trendChart, lttb, DRAW_POINTS
+from sensorHealth import sensorHealth, PROBE_NAMES, GRADE_NAMES, PROBE_RESOLUTION, OK, FAULT
+from thermalProtection import thermalProtection
+from alarmEngine import alarmEngine, ALARM_RULES, ALARM_INPUTS
+
+#Control loop update period (s), matches controller.CONTROL_PERIOD
+CONTROL_PERIOD_S = 0.030
+STATUS_REQUEST = 0x07
+MOTOR_DUTY_SET = 0x08
+FAN_DUTY_SET = 0x09
+FAN_POWER_SET = 0x0A
+HEATER_DUTY_SET = 0x0B
+FREQ_SET = 0x0C
+NACK = 0x15
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Builds the host stack (comm link and hardware model) on top of a simulated device
+        Inputs: realTime - sleep for serial wire time, byteErrorRate - response byte corruption probability,
+                canStream, canCompact - firmware supports status streaming and compact stream frames, baudRate
+       Outputs: device, port, hardware model
+   -------------------------------------------------------------------------------------------------------"""
+def simulatedStack(realTime = True, byteErrorRate = 0.0, canStream = True, canCompact = True, baudRate = 19200):
+    device = simulatedDevice(canStream = canStream, canCompact = canCompact)
+    port = simulatedPort(device, baudRate = baudRate, realTime = realTime, byteErrorRate = byteErrorRate)
+    return device, port, hardwareState(comm = arduinoComm(ser = port, resetLine = deviceResetLine(device, realTime)))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Serves a simulated device on a local TCP port the way a serial server does, from a thread
+        Inputs: device
+       Outputs: Port number
+   -------------------------------------------------------------------------------------------------------"""
+def tcpDeviceServer(device):
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    port = simulatedPort(device, realTime = False)
+    def serve():
+        #A serial server takes the next connection when the host reconnects
+        while True:
+            conn, address = listener.accept()
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            while True:
+                data = conn.recv(4096)
+                if not data:
+                    break
+                port.write(data)
+                waiting = port.inWaiting()
+                if waiting:
+                    conn.sendall(port.read(waiting))
+            conn.close()
+    server = threading.Thread(target = serve)
+    server.daemon = True
+    server.start()
+    return listener.getsockname()[1]
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Prints min/mean/max of a list of samples
+        Inputs: name, samples (s)
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def report(name, samples):
+    samples = sorted(samples)
+    mean = sum(samples)/len(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples)*0.99))]
+    print('%-28s n=%-5d min=%7.2fms mean=%7.2fms p99=%7.2fms max=%7.2fms' %
+          (name, len(samples), samples[0]*1e3, mean*1e3, p99*1e3, samples[-1]*1e3))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Door open to heater off latency through the frame safety path.  The door is opened at a
+                random point of the poll period and the simulated device timestamps both events.  The
+                pass/fail bound is asserted in doorInterlock_test.py
+        Inputs: trials
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchDoorReaction(trials = 200):
+    device, port, hardware = simulatedStack()
+    latencies = []
+    for i in range(trials):
+        device.closeDoor()
+        hardware.safety.arm()
+        #Open the door at a random point of the poll period
+        opener = threading.Timer(random.uniform(0, CONTROL_PERIOD_S), device.openDoor)
+        opener.start()
+        while device.doorReactionLatency() is None:
+            hardware.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+            time.sleep(CONTROL_PERIOD_S)
+        opener.join()
+        latencies.append(device.doorReactionLatency())
+    #Measure one round trip to state the guaranteed bound
+    start = time.time()
+    hardware.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+    rtt = time.time() - start
+    report('door open -> heater off', latencies)
+    #Door opens just after a status was sampled: rest of that poll, the next poll, then heater off
+    print('%-28s bound = period + 3 round trips = %.2fms (+1 round trip per NACK)' % ('', (CONTROL_PERIOD_S + 3*rtt)*1e3))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Time from a link glitch to the link being back with outputs restored.  Includes the failed
+                transactions needed to declare the link down
+        Inputs: trials
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchLinkRecovery(trials = 20):
+    device, port, hardware = simulatedStack()
+    outage = []
+    recovery = []
+    hardware.sendCmd(bytearray([MOTOR_DUTY_SET, 0xC0]))
+    for i in range(trials):
+        #Allow back to back recoveries
+        hardware.link._lastRecoveryAttempt = 0
+        port.glitch()
+        start = time.time()
+        while True:
+            hardware.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+            if hardware.link.recoveries > i:
+                break
+        outage.append(time.time() - start)
+        recovery.append(hardware.link.lastRecoveryTime)
+        assert device.motorDutyState == 0xC0
+    report('glitch -> link restored', outage)
+    report('recovery sequence', recovery)
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Throughput and tail latency of status transactions as response bytes get corrupted
+        Inputs: transactions per error rate
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchNoisyLink(transactions = 300):
+    for byteErrorRate in (0.0, 0.001, 0.005, 0.02):
+        device, port, hardware = simulatedStack(byteErrorRate = byteErrorRate)
+        comm = hardware._serial
+        before = comm.linkStats()
+        latencies = []
+        start = time.time()
+        for i in range(transactions):
+            t = time.time()
+            hardware.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+            latencies.append(time.time() - t)
+        elapsed = time.time() - start
+        stats = comm.linkStats()
+        report('byte error rate %.3f' % byteErrorRate, latencies)
+        print('%-28s %.1f transactions/s retries=%d timeouts=%d corrupt=%d failed=%d timeout=%.1fms' %
+              ('', transactions/elapsed, stats['retries'] - before['retries'], stats['timeouts'] - before['timeouts'],
+               stats['corruptFrames'] - before['corruptFrames'],
+               stats['failedTransactions'] - before['failedTransactions'],
+               comm.rtt.timeout(STATUS_REQUEST)*1e3))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Heater off delay when it is queued behind routine work, with every command in one class
+                versus the scheduler priority classes
+        Inputs: periods
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchScheduler(periods = 50):
+    device, port, hardware = simulatedStack()
+    for name, classes in (('single queue', (CONTROL, CONTROL, CONTROL)),
+                          ('priority classes', (HOUSEKEEPING, CONTROL, SAFETY))):
+        housekeeping, control, safety = classes
+        heaterOff = {}
+        def send(cmd):
+            update = hardware.sendCmd(cmd)
+            if cmd[0] == HEATER_DUTY_SET and cmd[1] == 0:
+                heaterOff['time'] = time.time()
+            return update
+        scheduler = commandScheduler(send, lambda update: None)
+        delays = []
+        transactions = 0
+        for i in range(periods):
+            scheduler.submit(bytearray([FREQ_SET, 0x11]), housekeeping)
+            scheduler.submit(bytearray([FAN_DUTY_SET, 0xFF]), housekeeping)
+            scheduler.submit(bytearray([MOTOR_DUTY_SET, 0xC0]), control)
+            scheduler.submit(bytearray([FAN_POWER_SET, 0x01]), control)
+            scheduler.submit(bytearray([HEATER_DUTY_SET, 0x80]), control)
+            scheduler.submit(bytearray([HEATER_DUTY_SET, 0x90]), control)
+            submitted = time.time()
+            scheduler.submit(bytearray([HEATER_DUTY_SET, 0x00]), safety)
+            transactions += scheduler.service()
+            delays.append(heaterOff['time'] - submitted)
+            time.sleep(CONTROL_PERIOD_S)
+        report('heater off, ' + name, delays)
+        print('%-28s %.1f transactions/period, %d merged, %d housekeeping deferred' %
+              ('', float(transactions)/periods, scheduler.merged, scheduler.deferred))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: CPU use, link use and temperature/timing accuracy of fixed 30ms polling versus adaptive
+                polling, for an idle phase, a heating phase and an incubating phase with the heater off.
+                Staleness is how far the device temperature moved since the last sample, measured just
+                before each poll
+        Inputs: phaseTime - length of each phase (s)
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchPolling(phaseTime = 10.0):
+    for name in ('fixed 30ms', 'adaptive, frame door', 'adaptive, edge door'):
+        device, port, hardware = simulatedStack()
+        poller = adaptivePoller()
+        for state in (IDLE, HEATING, INCUBATING):
+            armed = state != IDLE
+            device.heaterDutyState = 0xFF if state == HEATING else 0
+            polls = 0
+            staleness = []
+            periods = []
+            lastTemp = device.probeTempC[0]
+            cpuStart = sum(os.times()[:2])
+            start = time.time()
+            while time.time() - start < phaseTime:
+                device.stepModel()
+                staleness.append(abs(device.probeTempC[0] - lastTemp))
+                lastTemp = device.probeTempC[0]
+                hardware.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+                polls += 1
+                if name == 'fixed 30ms':
+                    period = 30
+                else:
+                    poller.addTemp(hardware.bagTempAvg)
+                    period = poller.period(state, 37.0 - hardware.bagTempAvg, armed, name.endswith('edge door'),
+                                           hardware.heaterDutyState > 0)
+                periods.append(period)
+                time.sleep(period/1000.0)
+            cpu = sum(os.times()[:2]) - cpuStart
+            elapsed = time.time() - start
+            print('%-22s %-10s cpu=%5.1f%% polls/s=%5.1f link=%5.1f%% staleness mean=%.4fC max=%.4fC mean period=%.0fms' %
+                  (name, ('idle', 'heating', 'incubating')[state], 100*cpu/elapsed, polls/elapsed,
+                   100*polls*40*10/19200.0/elapsed, sum(staleness)/len(staleness), max(staleness),
+                   float(sum(periods))/len(periods)))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Transactions per control tick while heating, resending the heater duty every tick versus
+                reconciling desired outputs against the reported hardware state
+        Inputs: ticks
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchReconciler(ticks = 200):
+    for name in ('resend every tick', 'reconciler'):
+        device, port, hardware = simulatedStack(realTime = False)
+        scheduler = commandScheduler(hardware.sendCmd, lambda update: None)
+        outputs = outputReconciler(hardware)
+        transactions = 0
+        start = time.time()
+        for i in range(ticks):
+            #Proportional heater duty that drifts slowly, as in controller.runSystem
+            duty = min(255, int((37.0 - hardware.bagTempAvg)*0xFF))
+            if name == 'reconciler':
+                outputs.setDesired(MOTOR_DUTY_SET, 0xC0)
+                outputs.setDesired(FAN_POWER_SET, 0x01)
+                outputs.setDesired(FAN_DUTY_SET, 0xFF)
+                outputs.setDesired(HEATER_DUTY_SET, duty)
+                for cmd, priority in outputs.commands():
+                    scheduler.submit(cmd, priority)
+            else:
+                scheduler.submit(bytearray([HEATER_DUTY_SET, duty]), CONTROL)
+            transactions += scheduler.service()
+        elapsed = time.time() - start
+        commands = transactions - scheduler.statusPolls
+        print('%-28s %.2f output commands/tick, %.2f transactions/tick, %.0f us host time/tick' %
+              (name, float(commands)/ticks, float(transactions)/ticks, 1e6*elapsed/ticks))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Status bus cost: publish time inside parseStatus, read time for a consumer, and a reader in
+                a separate process checking every frame it sees for torn writes
+        Inputs: frames, readTime (s)
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchStatusBus(frames = 2000, readTime = 2.0):
+    device, port, hardware = simulatedStack(realTime = False)
+    status = hardware._serial.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+    samples = []
+    for i in range(frames):
+        start = time.time()
+        hardware.parseStatus(status, None, start)
+        samples.append(time.time() - start)
+    report('parseStatus with publish', samples)
+    bus, hardware._bus = hardware._bus, None
+    samples = []
+    for i in range(frames):
+        start = time.time()
+        hardware.parseStatus(status, None, start)
+        samples.append(time.time() - start)
+    report('parseStatus without publish', samples)
+    hardware._bus = bus
+
+    path = '/tmp/bloodwarmerStatusBench'
+    writer = statusBusWriter(path)
+    reader = statusBusReader(path)
+    writer.publish((0,)*7 + (0.0,)*7 + (0,)*5)
+    samples = []
+    for i in range(frames):
+        start = time.time()
+        reader.read()
+        samples.append(time.time() - start)
+    report('statusBusReader.read', samples)
+
+    #Writer fills every float with the same value, a torn frame has mismatched fields
+    rfd, wfd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(rfd)
+        reads = torn = misses = 0
+        deadline = time.time() + readTime
+        while time.time() < deadline:
+            frame = reader.read()
+            reads += 1
+            if frame is None:
+                misses += 1
+            elif len(set(frame[10:17])) != 1:
+                torn += 1
+        os.write(wfd, ('%d %d %d' % (reads, torn, misses)).encode())
+        os._exit(0)
+    os.close(wfd)
+    published = 0
+    deadline = time.time() + readTime
+    while time.time() < deadline:
+        published += 1
+        value = float(published % 1000)
+        writer.publish((0,)*7 + (value,)*7 + (0,)*5)
+    os.waitpid(pid, 0)
+    reads, torn, misses = [int(x) for x in os.read(rfd, 64).split()]
+    os.close(rfd)
+    print('%-28s published=%d reads=%d torn=%d retries exhausted=%d' %
+          ('concurrent reader process', published, reads, torn, misses))
+    reader.close()
+    writer.close()
+    os.remove(path)
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Control loop for the jitter benchmark: one status transaction per period, temperature sent
+                to the gui through the bridge when a channel is given
+        Inputs: ticks, channel
+       Outputs: Lateness of each tick (s)
+   -------------------------------------------------------------------------------------------------------"""
+def controlTicks(ticks, channel = None):
+    device, port, hardware = simulatedStack()
+    samples = []
+    nextTick = time.time() + CONTROL_PERIOD_S
+    for i in range(ticks):
+        delay = nextTick - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        samples.append(max(0.0, time.time() - nextTick))
+        hardware.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+        if channel is not None:
+            channel.send('tempUpdate', hardware.bagTempAvg)
+        #Missed periods are skipped, as QTimer does
+        nextTick = max(nextTick + CONTROL_PERIOD_S, time.time())
+    return samples
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Gui load: bursts of interpreter bound work (slot code, pyautogui, repaint bookkeeping) that
+                hold the GIL, with short idle gaps, until stop is set
+        Inputs: stop - threading.Event, channel - bridge channel drained between bursts
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def guiLoad(stop, channel = None):
+    data = [random.random() for i in range(50000)]
+    while not stop.is_set():
+        sorted(data)
+        if channel is not None:
+            channel.receive()
+        time.sleep(0.01)
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Control tick jitter with the controller and gui in one process (control thread, gui in the
+                main thread) and in separate processes joined by the ipc bridge, with and without gui load
+        Inputs: ticks
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchTickJitter(ticks = 300):
+    for loaded in (False, True):
+        samples = []
+        stop = threading.Event()
+        control = threading.Thread(target = lambda: samples.extend(controlTicks(ticks)))
+        control.start()
+        if loaded:
+            guiLoad_ = threading.Thread(target = guiLoad, args = (stop,))
+            guiLoad_.start()
+        control.join()
+        stop.set()
+        if loaded:
+            guiLoad_.join()
+        report('one process, %s' % ('gui load' if loaded else 'gui idle'), samples)
+
+    for loaded in (False, True):
+        coreSock, guiSock = bridgeSockets()
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(rfd)
+            guiSock.close()
+            try:
+                os.nice(-10)
+            except OSError:
+                pass
+            samples = controlTicks(ticks, ipcChannel(coreSock, CORE_MESSAGES, GUI_MESSAGES))
+            os.write(wfd, struct.pack('<%dd' % len(samples), *samples))
+            os._exit(0)
+        os.close(wfd)
+        coreSock.close()
+        channel = ipcChannel(guiSock, GUI_MESSAGES, CORE_MESSAGES)
+        stop = threading.Event()
+        if loaded:
+            gui = threading.Thread(target = guiLoad, args = (stop, channel))
+        else:
+            gui = threading.Thread(target = lambda: [channel.receive() or time.sleep(0.01) for i in iter(stop.is_set, True)])
+        gui.start()
+        data = b''
+        chunk = os.read(rfd, 65536)
+        while chunk:
+            data += chunk
+            chunk = os.read(rfd, 65536)
+        os.close(rfd)
+        os.waitpid(pid, 0)
+        stop.set()
+        gui.join()
+        samples = list(struct.unpack('<%dd' % (len(data)//8), data))
+        report('split processes, %s' % ('gui load' if loaded else 'gui idle'), samples)
+        print('%-28s messages received=%d' % ('', channel.received))
+        channel.close()
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Checkpoint cost on the control tick (periodic and forced saves), background write time and
+                startup load/reconcile time
+        Inputs: ticks
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchCheckpoint(ticks = 2000):
+    path = '/tmp/bloodwarmerBench.ckpt'
+    for name, interval in (('checkpoint 5s interval', 5.0), ('checkpoint every tick', 0.0)):
+        store = checkpointStore(path, interval)
+        samples = []
+        for i in range(ticks):
+            start = time.time()
+            store.save(37.0, 600.0 + i, 120.0 + i, 36.8, True, True, False)
+            samples.append(time.time() - start)
+            time.sleep(0.001)
+        report(name + ' (tick)', samples)
+        store.flush()
+        print('%-28s saves=%d writes=%d worst write=%.2fms' %
+              (name + ' (writer)', store.saves, store.writes, store.worstWriteTime*1e3))
+    samples = []
+    for i in range(200):
+        start = time.time()
+        store.reconcile(store.load(), 36.9)
+        samples.append(time.time() - start)
+    report('load and reconcile', samples)
+    store.clear()
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Session database: cost of recording a sample on the control tick, writer throughput, and
+                query times on a year of history
+        Inputs: sessionsPerDay, samplesPerSession
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchSessionStore(sessionsPerDay = 4, samplesPerSession = 600):
+    path = '/tmp/bloodwarmerBench.db'
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    store = sessionStore(path, sampleInterval = 0)
+    now = time.time()
+    day = 86400.0
+    start = time.time()
+    samples = []
+    for d in range(365):
+        for s in range(sessionsPerDay):
+            sessionStart = now - (365 - d)*day + s*3*3600
+            sessionId = int(sessionStart*1000)
+            setpointTime = random.uniform(300, 1800)
+            store.queue('INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (sessionId, sessionStart, sessionStart + 5400, 37.0, setpointTime, 3600, COMPLETE))
+            for i in range(samplesPerSession):
+                tick = time.time()
+                store.sample(sessionId, 37.0, 37.1, 36.9, 40, 2)
+                samples.append(time.time() - tick)
+            store.event(sessionId, STATE_CHANGE, 'Incubating')
+        #Let the writer keep up, the queue holds MAX_QUEUE rows
+        store.flush()
+    store.flush()
+    elapsed = time.time() - start
+    report('sample on control tick', samples)
+    print('%-28s rows=%d commits=%d dropped=%d %.0f rows/s' %
+          ('writer', store.rowsWritten, store.commits, store.rowsDropped, store.rowsWritten/elapsed))
+    for name, query in (('slow sessions last month', lambda: store.slowSessions(1200, now - 30*day)),
+                        ('sessions last week', lambda: store.sessions(now - 7*day)),
+                        ('samples of one session', lambda: sum(1 for row in store.samples(sessionId))),
+                        ('events of one session', lambda: store.events(sessionId))):
+        times = []
+        for i in range(20):
+            tick = time.time()
+            query()
+            times.append(time.time() - tick)
+        report(name, times)
+    print('%-28s %d of %d sessions' % ('slow sessions last month', len(store.slowSessions(1200, now - 30*day)),
+                                       len(store.sessions(now - 30*day))))
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Usb export: control tick lateness while sessions are exported in the background, time from a
+                drive appearing in the mount table to the export finishing, and compression ratio
+        Inputs: sessions, samplesPerSession, ticks
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchExport(sessions = 20, samplesPerSession = 3600, ticks = 300):
+    root = '/tmp/bloodwarmerBenchMedia'
+    drive = os.path.join(root, 'USB')
+    mountTable = os.path.join(root, 'mounts')
+    dbPath = os.path.join(root, 'sessions.db')
+    if os.path.isdir(root):
+        for dirPath, dirNames, fileNames in os.walk(root, topdown = False):
+            for fileName in fileNames:
+                os.remove(os.path.join(dirPath, fileName))
+            for dirName in dirNames:
+                os.rmdir(os.path.join(dirPath, dirName))
+    os.makedirs(drive)
+    open(mountTable, 'w').close()
+    store = sessionStore(dbPath, sampleInterval = 0)
+    now = time.time()
+    for s in range(sessions):
+        sessionStart = now - 86400 + s*3600
+        sessionId = int(sessionStart*1000)
+        store.queue('INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (sessionId, sessionStart, sessionStart + 3600, 37.0, 600, 3000, COMPLETE))
+        for i in range(samplesPerSession):
+            store.queue('INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?)',
+                        (sessionId, sessionStart + i, 37.0 + random.gauss(0, 0.05), 37.1, 36.9, 40, 2))
+        store.flush()
+    exporter = usbExporter(store, root, 0.1, mountTable)
+    exporter.enable()
+    report('ticks, no drive', controlTicks(ticks))
+
+    samples = []
+    control = threading.Thread(target = lambda: samples.extend(controlTicks(ticks)))
+    control.start()
+    time.sleep(0.5)
+    inserted = time.time()
+    with open(mountTable, 'w') as f:
+        f.write('/dev/sda1 %s vfat rw 0 0\n' % drive)
+    while exporter.exported < sessions and time.time() - inserted < 60:
+        time.sleep(0.01)
+    exportTime = time.time() - inserted
+    control.join()
+    report('ticks, exporting', samples)
+    exportDir = os.path.join(drive, 'bloodwarmer')
+    compressed = sum(os.path.getsize(os.path.join(exportDir, f)) for f in os.listdir(exportDir) if f.endswith('.gz'))
+    print('%-28s %d sessions (%d samples) in %.2fs, %.0f bytes/sample compressed, errors=%d' %
+          ('export after insert', exporter.exported, sessions*samplesPerSession, exportTime,
+           float(compressed)/(sessions*samplesPerSession), exporter.exportErrors))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Cost of serial capture per transaction, then a capture of a noisy link is analyzed, its
+                anomalies compared with the link counters and the anomalies replayed through the host
+        Inputs: transactions, byteErrorRate
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchCapture(transactions = 2000, byteErrorRate = 0.002):
+    capturePath = '/tmp/bloodwarmerBench.cap'
+    replayPath = '/tmp/bloodwarmerBench.replay'
+    device, port, hardware = simulatedStack(realTime = False)
+    comm = hardware._serial
+    for capture in (False, True):
+        if capture:
+            comm.startCapture(capturePath)
+        samples = []
+        for i in range(transactions):
+            start = time.time()
+            comm.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+            samples.append(time.time() - start)
+        report('transaction, capture %s' % ('on' if capture else 'off'), samples)
+    comm.stopCapture()
+
+    port.byteErrorRate = byteErrorRate
+    before = comm.linkStats()
+    comm.startCapture(capturePath)
+    for i in range(transactions):
+        comm.sendCmd(bytearray([HEATER_DUTY_SET if i % 10 == 0 else STATUS_REQUEST, random.randint(0, 255)]))
+    comm.stopCapture()
+    after = comm.linkStats()
+    start = time.time()
+    analyzer = protocolAnalyzer.fromFile(capturePath)
+    analyzeTime = time.time() - start
+    counts = analyzer.anomalyCounts()
+    print('%-28s %d transactions in %.2fs, link saw corrupt=%d timeouts=%d nacks=%d' %
+          ('analyze noisy capture', len(analyzer.transactions), analyzeTime,
+           after['corruptFrames'] - before['corruptFrames'], after['timeouts'] - before['timeouts'],
+           after['nacks'] - before['nacks']))
+    for line in analyzer.summary()[1:]:
+        print('%-28s %s' % ('', line))
+    written = analyzer.exportReplay(replayPath, anomaliesOnly = True)
+    replay = replayPort(replayPath)
+    replayComm = arduinoComm(ser = replay)
+    while not replay.finished:
+        replayComm.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+    print('%-28s %d transactions replayed, host saw corrupt=%d nacks=%d (analyzer crc=%d nack=%d)' %
+          ('replay anomalies', written, replayComm.corruptFrames, replayComm.nacks,
+           counts.get('checksum mismatch', 0), counts.get('nack', 0)))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Receives raw bytes through the host link code as if the Atmega had sent them
+        Inputs: comm, port - simulated port of comm, data - bytes on the wire
+       Outputs: Processed response
+   -------------------------------------------------------------------------------------------------------"""
+def hostReceive(comm, port, data):
+    port._rxBuffer = bytearray(data)
+    if comm.protocol == PROTOCOL_V2:
+        return comm.processRsp(comm.readFrame(0.001))
+    return comm.processRsp(comm.readRsp(0.001))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Protocol v1 against v2: host cost of reading and checking a status frame, transaction time
+                and frame size, then corrupted frames the host accepts with a wrong payload
+        Inputs: frames, trials - corrupted frames per bit error count
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchProtocol(frames = 2000, trials = 20000):
+    device, port, hardware = simulatedStack(realTime = False)
+    comm = hardware._serial
+    port.timeout = 0
+    packets = []
+    for i in range(frames):
+        device.probeTempC = [random.uniform(20, 45) for t in device.probeTempC]
+        device.heaterDutyState = random.randint(0, 255)
+        packets.append(device.statusPacket())
+    encoders = {PROTOCOL_V1: protocolV1.encodeFrame, PROTOCOL_V2: protocolV2.encodeFrame}
+    for protocol in (PROTOCOL_V1, PROTOCOL_V2):
+        comm.protocol = protocol
+        device.protocol = protocol
+        wire = [encoders[protocol](packet) for packet in packets]
+        samples = []
+        for data in wire:
+            start = time.time()
+            hostReceive(comm, port, data)
+            samples.append(time.time() - start)
+        report('v%d read+check status' % protocol, samples)
+        samples = []
+        for i in range(frames):
+            start = time.time()
+            comm.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+            samples.append(time.time() - start)
+        report('v%d transaction' % protocol, samples)
+        sizes = [len(data) for data in wire]
+        print('%-28s mean=%.1f min=%d max=%d bytes' % ('v%d status frame' % protocol, float(sum(sizes))/len(sizes),
+                                                      min(sizes), max(sizes)))
+    for bitErrors in (1, 2, 3, 4, 8):
+        undetected = {}
+        for protocol in (PROTOCOL_V1, PROTOCOL_V2):
+            comm.protocol = protocol
+            undetected[protocol] = 0
+            for i in range(trials):
+                packet = packets[i % len(packets)]
+                data = encoders[protocol](packet)
+                for bit in random.sample(range(len(data)*8), bitErrors):
+                    data[bit // 8] ^= 1 << (bit % 8)
+                resp = hostReceive(comm, port, data)
+                if resp[0] != NACK and resp != packet:
+                    undetected[protocol] += 1
+        print('%-28s undetected v1=%d v2=%d of %d' % ('%d bit errors' % bitErrors, undetected[PROTOCOL_V1],
+                                                      undetected[PROTOCOL_V2], trials))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Status samples per second polled once per control tick against streamed by the Atmega,
+                with a heater command every third tick, then stream gap detection on a noisy line and
+                fallback to polling on firmware without streaming.  Halfway through the Atmega drops the
+                stream, the gap until samples resume is reported
+        Inputs: phaseTime (s)
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchStream(phaseTime = 5.0):
+    for name, byteErrorRate, canStream in (('polling', 0.0, True), ('streaming', 0.0, True),
+                                           ('streaming, noisy', 0.002, True), ('no stream firmware', 0.0, False)):
+        device, port, hardware = simulatedStack(byteErrorRate = byteErrorRate, canStream = canStream)
+        comm = hardware._serial
+        comm.negotiateProtocol()
+        if name != 'polling':
+            hardware.startStream()
+        updates = []
+        scheduler = commandScheduler(hardware.sendCmd, lambda result: updates.append(result))
+        ticks = 0
+        lateTicks = 0
+        droppedAt = None
+        resumeGap = None
+        stats = comm.linkStats()
+        start = time.time()
+        while time.time() - start < phaseTime:
+            tickStart = time.time()
+            if ticks % 3 == 0:
+                scheduler.submit(bytearray([HEATER_DUTY_SET, random.randint(1, 255)]))
+            scheduler.service(not hardware.streaming)
+            if hardware.streaming:
+                received = comm.streamReceived
+                hardware.pollStream()
+                if droppedAt is None and tickStart - start > phaseTime/2:
+                    #Subscription lost on the Atmega side, the host has to notice and subscribe again
+                    droppedAt = time.time()
+                    device.streamPeriod = 0
+                elif droppedAt is not None and resumeGap is None and stats['resubscriptions'] < comm.resubscriptions \
+                     and comm.streamReceived > received:
+                    resumeGap = time.time() - droppedAt
+            ticks += 1
+            elapsed = time.time() - tickStart
+            if elapsed > CONTROL_PERIOD_S:
+                lateTicks += 1
+            time.sleep(max(0.0, CONTROL_PERIOD_S - elapsed))
+        elapsed = time.time() - start
+        stats = comm.linkStats()
+        samples = updates.count(1) + stats['streamReceived']
+        print('%-20s v%d samples/s=%6.1f transactions/s=%5.1f late ticks=%d stream sent=%d lost=%d dup=%d '
+              'stale=%d corrupt=%d resubscribed=%d resume gap=%s' %
+              (name, comm.protocol, samples/elapsed, stats['transactions']/elapsed, lateTicks, device.streamSeq,
+               stats['streamLost'], stats['streamDuplicates'], stats['streamStale'], comm.corruptFrames,
+               stats['resubscriptions'], '%.0fms' % (resumeGap*1e3) if resumeGap is not None else '-'))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Stream throughput with full against compact delta frames at 9600 and 19200 baud.  The
+                stream period is shorter than a full frame takes on the wire so the line limits the rate,
+                heater commands every third control tick share it.  Also run on a noisy line (lost
+                keyframes) and against firmware without compact frames
+        Inputs: phaseTime (s), period - requested stream period (ms)
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchDelta(phaseTime = 5.0, period = 2):
+    for baudRate in (9600, 19200):
+        for name, keyframeInterval, byteErrorRate, canCompact in (
+                ('full frames', 0, 0.0, True), ('delta frames', KEYFRAME_INTERVAL, 0.0, True),
+                ('delta frames, noisy', KEYFRAME_INTERVAL, 0.002, True),
+                ('no delta firmware', KEYFRAME_INTERVAL, 0.0, False)):
+            device, port, hardware = simulatedStack(byteErrorRate = byteErrorRate, canCompact = canCompact,
+                                                    baudRate = baudRate)
+            comm = hardware._serial
+            comm.negotiateProtocol()
+            hardware.startStream(period, keyframeInterval)
+            scheduler = commandScheduler(hardware.sendCmd, lambda result: None)
+            framesStart = device.streamFrames
+            bytesStart = device.streamBytes
+            ticks = 0
+            start = time.time()
+            while time.time() - start < phaseTime:
+                tickStart = time.time()
+                if ticks % 3 == 0:
+                    scheduler.submit(bytearray([HEATER_DUTY_SET, random.randint(1, 255)]))
+                scheduler.service(False)
+                hardware.pollStream()
+                ticks += 1
+                time.sleep(max(0.0, CONTROL_PERIOD_S - (time.time() - tickStart)))
+            elapsed = time.time() - start
+            stats = comm.linkStats()
+            frames = device.streamFrames - framesStart
+            print('%5d baud %-20s samples/s=%5.1f bytes/frame=%4.1f deltas=%d keyframe misses=%d lost=%d '
+                  'corrupt=%d' %
+                  (baudRate, name, stats['streamReceived']/elapsed,
+                   float(device.streamBytes - bytesStart)/max(frames, 1), stats['deltaFrames'],
+                   stats['deltaMisses'], stats['streamLost'], comm.corruptFrames))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: One fleet host process driving simulated units on pseudo terminals (devices served from a
+                child process).  Reports host cpu, per unit tick jitter and status rate, then the same with
+                one unit's link dead to show the others are not delayed
+        Inputs: runTime (s)
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchFleet(runTime = 10.0):
+    for count, stalled in ((8, ()), (32, ()), (64, ()), (32, (0,))):
+        server = ptyDeviceServer(count, stalled)
+        host = fleetHost(logFile = None)
+        for i, fd in enumerate(server.start()):
+            configurePort(fd)
+            host.addUnit('unit%d' % i, fd)
+        cpuStart = sum(os.times()[:2])
+        start = time.time()
+        host.run(runTime)
+        elapsed = time.time() - start
+        cpu = sum(os.times()[:2]) - cpuStart
+        server.stop()
+        stats = host.jitterStats()
+        live = [unit for unit in host.units if unit.linkState == LINK_UP]
+        means = [stats[unit.name][1] for unit in host.units]
+        p99s = [stats[unit.name][2] for unit in host.units]
+        print('%3d units%-12s cpu=%5.1f%% loops/s=%6.0f linked=%d jitter mean=%.2fms worst p99=%.2fms '
+              'worst max=%.2fms status/s per unit=%.1f' %
+              (count, ', 1 stalled' if stalled else '', 100*cpu/elapsed, host.loops/elapsed, len(live),
+               1e3*sum(means)/len(means), 1e3*max(p99s), 1e3*max(unit.jitterMax for unit in host.units),
+               sum(unit.frames for unit in live)/elapsed/max(len(live), 1)))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Units sharing one RS-485 bus (simulated in a child process, wire time modelled): bus
+                utilisation, status polls per second and poll latency (time past each unit's deadline) as
+                the unit count grows, and with dead units backed off
+        Inputs: runTime (s)
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchRS485(runTime = 5.0):
+    for baudRate in (19200, 115200):
+        for count, dead in ((4, ()), (8, ()), (16, ()), (32, ()), (16, (3, 9))):
+            server = ptyDeviceServer.forBus(count, dead, baudRate)
+            fd = server.start()[0]
+            configurePort(fd, getattr(termios, 'B%d' % baudRate))
+            link = busLink(fd, baudRate)
+            scheduler = busScheduler(link, range(1, count + 1))
+            start = time.time()
+            scheduler.run(runTime)
+            elapsed = time.time() - start
+            server.stop()
+            live = [scheduler.nodes[address] for address in scheduler.nodes if address not in dead]
+            latency = sorted(sum((node['latency'] for node in live), []))
+            deadPolls = sum(scheduler.nodes[address]['polls'] for address in dead)
+            print('%6d baud %2d units%-8s utilisation=%5.1f%% polls/s=%6.1f latency mean=%6.1fms p99=%6.1fms '
+                  'missed=%d timeouts=%d dead polls=%d' %
+                  (baudRate, count, ', %d dead' % len(dead) if dead else '', 100*link.wireTime()/elapsed,
+                   sum(node['answers'] for node in live)/elapsed, 1e3*sum(latency)/max(len(latency), 1),
+                   1e3*latency[int(0.99*(len(latency) - 1))] if latency else 0.0,
+                   sum(node['missed'] for node in live), link.timeouts, deadPolls))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Cost of a status transaction (framing, checks, status parse) on each transport: the in
+                process loopback (protocol and host code only), the simulated port and a TCP serial server
+                on localhost (kernel socket I/O), none with wire time
+        Inputs: transactions per transport and protocol
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchTransport(transactions = 5000):
+    for name in ('loopback', 'simulated port', 'tcp localhost'):
+        device = simulatedDevice()
+        if name == 'loopback':
+            port = loopbackTransport(device)
+        elif name == 'simulated port':
+            port = simulatedPort(device, realTime = False)
+        else:
+            port = tcpTransport('127.0.0.1', tcpDeviceServer(device))
+        hardware = hardwareState(comm = arduinoComm(ser = port, resetLine = deviceResetLine(device, False)))
+        for protocol in (PROTOCOL_V1, PROTOCOL_V2):
+            hardware._serial.preferredProtocol = protocol
+            hardware._serial.resetDevice(0, 0)
+            cpuStart = sum(os.times()[:2])
+            samples = []
+            for i in range(transactions):
+                start = time.time()
+                hardware.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+                samples.append(time.time() - start)
+            cpu = sum(os.times()[:2]) - cpuStart
+            report('%s v%d' % (name, protocol), samples)
+            print('%-28s cpu per transaction=%.1fus failed=%d' % ('', 1e6*cpu/transactions,
+                                                                 hardware._serial.failedTransactions))
+        port.close()
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Opens a WebSocket stream client on the telemetry server
+        Inputs: address - server (host, port)
+       Outputs: Non-blocking socket past the handshake
+   -------------------------------------------------------------------------------------------------------"""
+def wsConnect(address):
+    sock = socket.create_connection(address)
+    sock.sendall(b'GET /stream HTTP/1.1\r\nHost: localhost\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                 b'Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n')
+    response = b''
+    while b'\r\n\r\n' not in response:
+        response += sock.recv(1)
+    assert response.startswith(b'HTTP/1.1 101')
+    sock.setblocking(0)
+    return sock
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Counts complete WebSocket frames in a client's received bytes
+        Inputs: rx (bytearray) - received bytes, complete frames are removed
+       Outputs: Number of frames
+   -------------------------------------------------------------------------------------------------------"""
+def wsCount(rx):
+    frames = 0
+    while len(rx) >= 2:
+        length = rx[1] & 0x7F
+        pos = 2
+        if length == 126:
+            if len(rx) < 4:
+                break
+            length = struct.unpack('>H', bytes(rx[2:4]))[0]
+            pos = 4
+        if len(rx) < pos + length:
+            break
+        del rx[:pos + length]
+        frames += 1
+    return frames
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Control tick cost with the telemetry server streaming to a growing number of WebSocket
+                clients on localhost (simulated device, 30ms ticks), and HTTP snapshot latency
+        Inputs: runTime (s) per client count
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchTelemetry(runTime = 5.0):
+    device, port, hardware = simulatedStack(realTime = False)
+    server = telemetryServer('127.0.0.1', 0)
+    server.start()
+    clients = []
+    for count in (0, 10, 50, 100):
+        while len(clients) < count:
+            clients.append([wsConnect(server.address), bytearray(), 0])
+        for client in clients:
+            client[2] = 0
+        updates, sent = server.updates, server.messagesSent
+        samples = []
+        start = time.time()
+        nextTick = start
+        while time.time() - start < runTime:
+            delay = nextTick - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            tickStart = time.time()
+            device.probeTempC[0] += 0.001
+            hardware.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+            server.publishState(1, 37.0, tickStart - start, 0.0, 3600.0)
+            samples.append(time.time() - tickStart)
+            nextTick = max(nextTick + CONTROL_PERIOD_S, time.time())
+            for client in clients:
+                try:
+                    client[1] += client[0].recv(65536)
+                except socket.error:
+                    pass
+                client[2] += wsCount(client[1])
+        elapsed = time.time() - start
+        report('tick, %d stream clients' % count, samples)
+        print('%-28s serializations/s=%.1f messages/s=%.0f received/s per client=%.1f dropped=%d' %
+              ('', (server.updates - updates)/elapsed, (server.messagesSent - sent)/elapsed,
+               sum(client[2] for client in clients)/elapsed/max(len(clients), 1), server.droppedClients))
+    samples = []
+    for i in range(200):
+        start = time.time()
+        sock = socket.create_connection(server.address)
+        sock.sendall(b'GET /snapshot HTTP/1.1\r\nHost: localhost\r\n\r\n')
+        response = b''
+        data = sock.recv(65536)
+        while data:
+            response += data
+            data = sock.recv(65536)
+        sock.close()
+        samples.append(time.time() - start)
+        assert response.startswith(b'HTTP/1.1 200') and b'bagTempAvg' in response
+    report('http snapshot', samples)
+    for client in clients:
+        client[0].close()
+    server.stop()
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Load generator for the telemetry aggregator: ingest rate of live streams from many units
+                (4 samples/s each), then a 90 day history of several units (one sample a minute) and
+                query times per rollup against a scan of the raw samples
+        Inputs: liveUnits, liveTime - simulated seconds of live streams, historyUnits, historyDays
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchAggregator(liveUnits = 20, liveTime = 1800, historyUnits = 5, historyDays = 90):
+    path = tempfile.mkdtemp()
+    try:
+        aggregator = telemetryAggregator(os.path.join(path, 'live'))
+        start = 1.7e9
+        samples = liveUnits*liveTime*4
+        cpuStart = sum(os.times()[:2])
+        for i in range(liveTime*4):
+            t = start + i*0.25
+            for unit in range(liveUnits):
+                aggregator.ingest('unit%d' % unit, t + unit*0.01, (30.0 + i*0.0005, 30.1, 29.9, 128, 1))
+        aggregator.flush()
+        cpu = sum(os.times()[:2]) - cpuStart
+        print('ingest %d units x %d s at 4 Hz    %.0f samples/s (%.1fus/sample)' %
+              (liveUnits, liveTime, samples/cpu, 1e6*cpu/samples))
+        aggregator = telemetryAggregator(os.path.join(path, 'history'))
+        end = start + historyDays*86400
+        buildStart = time.time()
+        for unit in range(historyUnits):
+            name = 'unit%d' % unit
+            t = start
+            while t < end:
+                day = (t - start)/86400.0
+                aggregator.ingest(name, t, (30.0 + 8*math.sin(day), 30.0, 30.0, 100, 2))
+                t += 60
+        aggregator.flush()
+        print('history %d units x %d days built in %.1fs' % (historyUnits, historyDays, time.time() - buildStart))
+        for label, span in (('30 min', 1800), ('1 day', 86400), ('7 days', 7*86400), ('90 days', historyDays*86400)):
+            samples = []
+            for i in range(50):
+                queryStart = time.time()
+                level, times, mins, maxs, means = aggregator.query('unit%d' % (i % historyUnits), 'bagTempAvg',
+                                                                   end - span, end)
+                samples.append(time.time() - queryStart)
+            report('query %s (%s, %d rows)' % (label, level, len(times)), samples)
+        queryStart = time.time()
+        for unit in range(historyUnits):
+            aggregator.query('unit%d' % unit, 'bagTempAvg', start, end)
+        print('%-28s %.1fms' % ('query 90 days, all units', 1e3*(time.time() - queryStart)))
+        queryStart = time.time()
+        times, values = aggregator.raw('unit0', start, end, ('bagTempAvg',))
+        low, high, mean = min(values), max(values), sum(values)/len(values)
+        print('%-28s %.1fms (%d samples)' % ('raw scan 90 days, one unit', 1e3*(time.time() - queryStart), len(values)))
+    finally:
+        shutil.rmtree(path)
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Trend chart cost over a long session at the fastest control period: time to add a sample
+                and to decimate the three series for a frame, which should stay flat as the session grows,
+                against lttb over the whole ring buffer
+        Inputs: sessionHours, checkpoints - number of points in the session to measure at
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchTrend(sessionHours = 4, checkpoints = 4):
+    chart = trendChart()
+    total = int(sessionHours*3600/CONTROL_PERIOD_S)
+    chunk = total//checkpoints
+    t = 0.0
+    for checkpoint in range(checkpoints):
+        addStart = time.time()
+        for i in range(chunk):
+            t += CONTROL_PERIOD_S
+            avg = 37.0 - 15.0*math.exp(-t/1200.0) + 0.05*math.sin(t)
+            chart.addSample(avg + 0.1, avg - 0.1, avg, t)
+        addTime = (time.time() - addStart)/chunk
+        samples = []
+        for i in range(20):
+            frameStart = time.time()
+            for index in range(3):
+                chart.series(index, DRAW_POINTS)
+            samples.append(time.time() - frameStart)
+        print('%5.1f h (%6d samples)  add %.1fus/sample' % (t/3600, chart.count, 1e6*addTime))
+        report('  frame decimation', samples)
+    times, bag1, bag2, avg = chart.samples()
+    frameStart = time.time()
+    for values in (bag1, bag2, avg):
+        lttb(times, values, DRAW_POINTS)
+    print('%-28s %.1fms (%d samples)' % ('lttb over the ring buffer', 1e3*(time.time() - frameStart), len(times)))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Sensor health cost per frame and detection of a frozen, noisy, jumping and drifting probe
+                in a warming bag streamed every 25 ms: frames from the fault to the first warning and
+                fault, and whether the bag temperature stayed usable.  A steady bag on quantized probes
+                must never fault
+        Inputs: frames - frames timed
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchHealth(frames = 20000):
+    period = 0.025
+    def probes(i):
+        t = i*period
+        temp = 37.0 - 15.0*math.exp(-t/900.0)
+        return [temp + random.gauss(0, 0.02) for probe in range(4)]
+    health = sensorHealth()
+    samples = []
+    for i in range(frames):
+        temps = probes(i)
+        start = time.time()
+        health.check(temps, i*period)
+        samples.append(time.time() - start)
+    report('check, healthy probes', samples)
+    faults = (('frozen', lambda i, temp, frozen: frozen),
+              ('noisy', lambda i, temp, frozen: temp + random.gauss(0, 0.6)),
+              ('jump +3 C', lambda i, temp, frozen: temp + 3.0),
+              ('drift 0.02 C/s', lambda i, temp, frozen: temp + 0.02*i*period),
+              ('open circuit', lambda i, temp, frozen: -127.0))
+    for name, fault in faults:
+        health = sensorHealth()
+        warned = faulted = None
+        usable = True
+        for i in range(8000):
+            temps = probes(i)
+            if i == 2000:
+                frozen = temps[1]
+            if i >= 2000:
+                temps[1] = fault(i - 2000, temps[1], frozen)
+                overall = health.check(temps, i*period)
+                if warned is None and health.grades[1] > OK:
+                    warned = i - 2000
+                if faulted is None and health.grades[1] == FAULT:
+                    faulted = i - 2000
+                usable = usable and overall != FAULT and health.bagTemp(temps, 0) is not None
+            else:
+                health.check(temps, i*period)
+        print('%-16s warning after %5s frames, fault after %5s frames, bag 1 usable: %s, other probes %s' %
+              (name, warned, faulted, usable, '/'.join(GRADE_NAMES[health.grades[i]] for i in (0, 2, 3))))
+    #A bag held at the set temp on 12 bit probes: probe 1 sits on one step while probe 2 flickers by one step
+    health = sensorHealth()
+    worst = OK
+    for i in range(40000):
+        step = PROBE_RESOLUTION if random.random() < 0.5 else 0.0
+        worst = max(worst, health.check([37.0, 37.0 + step, 37.0, 37.0], i*period))
+    print('%-16s %ds on one step: probes %s, worst overall %s' % ('steady bag', 40000*period,
+          '/'.join(GRADE_NAMES[grade] for grade in health.grades), GRADE_NAMES[worst]))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Thermal protection cost per frame against the control tick budget, and reaction on the
+                simulated stack: a heater stuck full on (runaway), a slow rise past the probe limit and a
+                warm up heading past the set temp (overshoot hold)
+        Inputs: frames - frames timed
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchThermal(frames = 50000):
+    device, port, hardware = simulatedStack(realTime = False)
+    protection = thermalProtection(hardware.safety)
+    protection.setTemp = 37.0
+    usable = [True]*4
+    samples = []
+    for i in range(frames):
+        t = i*0.025
+        temp = 37.0 - 15.0*math.exp(-t/900.0)
+        probes = (temp, temp + 0.1, temp, temp + 0.1)
+        start = time.time()
+        protection.check(probes, usable, temp, t)
+        samples.append(time.time() - start)
+    report('check per frame', samples)
+    mean = sum(samples)/len(samples)
+    framesPerTick = max(1.0, CONTROL_PERIOD_S/0.025)
+    print('%-28s %.3f%% of the %.0fms tick at %.1f frames/tick' % ('', 100*mean*framesPerTick/CONTROL_PERIOD_S,
+                                                                     CONTROL_PERIOD_S*1e3, framesPerTick))
+    #One probe past the sensor health range is faulted and left out of the bag temperature, it must still trip
+    scenarios = (('runaway', [38.0]*4, 20.0, None), ('over limit', [41.7]*4, 1.0, None),
+                 ('probe past 60 C', [61.0, 37.0, 37.0, 37.0], 1.0, None), ('overshoot hold', [36.0]*4, 1.0, 37.0))
+    for name, startTemps, timeScale, setTemp in scenarios:
+        device = simulatedDevice(timeScale = timeScale)
+        port = simulatedPort(device, realTime = False)
+        hardware = hardwareState(comm = arduinoComm(ser = port, resetLine = deviceResetLine(device, False)))
+        hardware.thermal.setTemp = setTemp
+        device.probeTempC = list(startTemps)
+        device.closeDoor()
+        hardware.safety.arm()
+        #Heater stuck at full duty until the protection turns it off
+        hardware.sendCmd(bytearray([HEATER_DUTY_SET, 0xFF]))
+        start = time.time()
+        ticks = 0
+        while device.heaterDutyState and time.time() - start < 30:
+            hardware.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+            ticks += 1
+            time.sleep(CONTROL_PERIOD_S)
+        reason = hardware.thermal.tripReason or ('held' if hardware.thermal.held else 'no reaction')
+        #Heater commands from the control law are now forced off
+        blocked = hardware._serial.cmdFilter(bytearray([HEATER_DUTY_SET, 0xFF]))[1] == 0
+        print('%-16s heater off after %.2fs (%d ticks), peak %.2f C, control blocked: %s, %s' %
+              (name, time.time() - start, ticks, max(device.probeTempC), blocked, reason))
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Alarm rule evaluation cost per tick as the rule count grows (copies of the standard rules
+                with shifted thresholds), compile time, and the raise/clear sequence of the over temperature
+                rule through its delay and hysteresis
+        Inputs: ticks - ticks timed per rule count
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def benchAlarms(ticks = 20000):
+    for copies in (1, 4, 10):
+        rules = []
+        for copy in range(copies):
+            for rule in ALARM_RULES:
+                rule = dict(rule)
+                rule['name'] = '%s %d' % (rule['name'], copy)
+                for key in ('above', 'below', 'clear'):
+                    if key in rule:
+                        rule[key] += 0.01*copy
+                rules.append(rule)
+        compileStart = time.time()
+        engine = alarmEngine(rules)
+        compileTime = time.time() - compileStart
+        samples = []
+        for i in range(ticks):
+            t = i*CONTROL_PERIOD_S
+            values = (2*math.sin(t/5), -2*math.sin(t/5), 0, 0, 0, 1, 1, 0.0)
+            start = time.time()
+            engine.evaluate(values, t)
+            samples.append(time.time() - start)
+        report('%d rules' % len(rules), samples)
+        print('%-28s compile %.2fms, %.3f%% of the %.0fms tick, %d raised' %
+              ('', 1e3*compileTime, 100*sum(samples)/len(samples)/CONTROL_PERIOD_S, CONTROL_PERIOD_S*1e3,
+               engine.raised))
+    engine = alarmEngine()
+    rule = [r['name'] for r in engine.rules].index('Over temperature')
+    overTemp = ALARM_INPUTS.index('overTemp')
+    incubating = ALARM_INPUTS.index('incubating')
+    steps = ((0.0, 0.8), (1.0, 1.2), (2.5, 1.2), (3.5, 1.2), (4.0, 0.8), (5.0, 0.3), (5.5, 0.3), (6.0, 1.2),
+             (8.5, 1.2))
+    for t, temp in steps:
+        values = [0.0]*len(ALARM_INPUTS)
+        values[overTemp] = temp
+        values[incubating] = 1
+        engine.evaluate(values, t)
+        print('  t=%.1fs over set temp by %.1f C -> %s' % (t, temp, 'raised' if engine.active[rule] else 'clear'))
+
+
+BENCHMARKS = {
+    'door': benchDoorReaction,
+    'link': benchLinkRecovery,
+    'noise': benchNoisyLink,
+    'scheduler': benchScheduler,
+    'polling': benchPolling,
+    'reconciler': benchReconciler,
+    'bus': benchStatusBus,
+    'jitter': benchTickJitter,
+    'checkpoint': benchCheckpoint,
+    'sessions': benchSessionStore,
+    'export': benchExport,
+    'capture': benchCapture,
+    'protocol': benchProtocol,
+    'stream': benchStream,
+    'delta': benchDelta,
+    'fleet': benchFleet,
+    'rs485': benchRS485,
+    'transport': benchTransport,
+    'telemetry': benchTelemetry,
+    'aggregator': benchAggregator,
+    'trend': benchTrend,
+    'health': benchHealth,
+    'thermal': benchThermal,
+    'alarms': benchAlarms,
+}
+
+if __name__ == "__main__":
+    names = sys.argv[1:] or sorted(BENCHMARKS.keys())
+    for name in names:
+        BENCHMARKS[name]()
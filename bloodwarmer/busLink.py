@@ -0,0 +1,133 @@
+#imports
+import os
+import time
+import errno
+import select
+import protocolV2
+from protocolV2 import DELIMITER, BROADCAST
+
+#----------------Constants-----------------------#
+
+#Bits on the wire per byte (start + 8 data + stop)
+BITS_PER_BYTE = 10
+#Most bytes read per wakeup while waiting for a response
+READ_CHUNK = 512
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Master end of a half-duplex RS-485 bus shared by several
+                    Atmega boards.  Every frame carries the unit address
+                    (protocolV2 bus frames), one transaction is on the bus at a
+                    time: the addressed unit answers, every other unit stays
+                    silent.  Responses from the wrong address are discarded
+                    and counted, so a unit answering late can't be mistaken
+                    for the one being polled
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created addressed transactions, wire time accounting
+----------------------------------------------------------------------------"""
+class busLink(object):
+
+    def __init__(self, fd, baudRate = 19200):
+        #fd - non-blocking bus port (see fleetHost.openPort)
+        self.fd = fd
+        self.baudRate = baudRate
+        self._rx = bytearray()
+        #Statistics
+        self.transactions = 0
+        self.timeouts = 0
+        self.corruptFrames = 0
+        self.wrongAddress = 0
+        self.bytesOnWire = 0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Sends a command to one unit and waits for its answer
+         Inputs: address - unit address or BROADCAST (not answered), payload (bytearray), timeout (s)
+        Outputs: Response payload, None on timeout, corrupt frame or broadcast
+    -------------------------------------------------------------------------------------------------------"""
+    def transact(self, address, payload, timeout):
+        self.transactions += 1
+        self.discardInput()
+        frame = protocolV2.encodeBusFrame(address, payload)
+        self.writeAll(frame)
+        self.bytesOnWire += len(frame)
+        if address == BROADCAST:
+            return None
+        deadline = time.time() + timeout
+        while True:
+            end = self._rx.find(bytearray([DELIMITER]))
+            while end == 0:
+                del self._rx[0]
+                end = self._rx.find(bytearray([DELIMITER]))
+            if end > 0:
+                frame = self._rx[:end + 1]
+                del self._rx[:end + 1]
+                self.bytesOnWire += len(frame)
+                decoded = protocolV2.decodeBusFrame(frame)
+                if decoded is None:
+                    self.corruptFrames += 1
+                    return None
+                if decoded[0] != address:
+                    self.wrongAddress += 1
+                    continue
+                return decoded[1]
+            remaining = deadline - time.time()
+            if remaining <= 0 or not self.wait(remaining):
+                self.timeouts += 1
+                return None
+            self.readAvailable()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Time the bus has carried frames (s), for utilisation
+         Inputs: None
+        Outputs: Seconds of wire time
+    -------------------------------------------------------------------------------------------------------"""
+    def wireTime(self):
+        return self.bytesOnWire*BITS_PER_BYTE/float(self.baudRate)
+
+    #--------------------Private Functions----------------------#
+
+    def wait(self, timeout):
+        try:
+            readable, writable, failed = select.select([self.fd], [], [], timeout)
+        except select.error as e:
+            if e.args[0] != errno.EINTR:
+                raise
+            return False
+        return len(readable) > 0
+
+    def readAvailable(self):
+        try:
+            self._rx += os.read(self.fd, READ_CHUNK)
+        except OSError as e:
+            if e.errno not in (errno.EAGAIN, errno.EINTR):
+                raise
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Drops bytes left on the bus by earlier transactions (late answers, noise)
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def discardInput(self):
+        while self.wait(0):
+            before = len(self._rx)
+            self.readAvailable()
+            if len(self._rx) == before:
+                break
+        self.bytesOnWire += len(self._rx)
+        del self._rx[:]
+
+    def writeAll(self, data):
+        data = bytes(data)
+        while data:
+            try:
+                written = os.write(self.fd, data)
+            except OSError as e:
+                if e.errno not in (errno.EAGAIN, errno.EINTR):
+                    raise
+                select.select([], [self.fd], [], 0.01)
+                continue
+            data = data[written:]
+
+#-----------------------------------------------------------------------#
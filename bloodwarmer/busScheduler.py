@@ -0,0 +1,154 @@
+#imports
+import time
+import threading
+
+#----------------Constants-----------------------#
+
+STATUS_REQUEST = 0x07 #Returns status of all hardware
+NACK = 0x15 #No acknowledge packet
+
+#Status deadline of every unit: each unit is polled at least this often (s)
+POLL_PERIOD = 0.25
+#Time a unit has to answer, covers the response wire time at 19200 baud plus turnaround (s)
+RESPONSE_TIMEOUT = 0.05
+#Failed transactions in a row before a unit is treated as dead
+DEAD_AFTER = 3
+#Longest time between probes of a dead unit (s)
+MAX_BACKOFF = 5.0
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Bus master schedule for several units on one half-duplex
+                    bus.  Queued commands go first, round robin across units.
+                    Otherwise the next unit in round robin order whose status
+                    deadline has passed is polled.  A unit that stops answering
+                    is backed off exponentially (probed at most every
+                    MAX_BACKOFF once dead) so its timeouts don't eat the bus
+                    time of the live units, it is polled normally again as soon
+                    as it answers.  A command that fails goes back in the queue
+                    unless a newer one of its type has been queued meanwhile
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created round robin polling with per unit deadlines, dead
+                    unit back-off and command queues
+            -1.0.1: Failed commands are queued again instead of dropped
+----------------------------------------------------------------------------"""
+class busScheduler(object):
+
+    def __init__(self, link, addresses, handle = None, period = POLL_PERIOD, timeout = RESPONSE_TIMEOUT):
+        #handle(address, payload) processes every answer
+        self._link = link
+        self._handle = handle
+        self._period = period
+        self._timeout = timeout
+        self._lock = threading.Lock()
+        self._order = list(addresses)
+        self._next = 0
+        now = time.time()
+        #Per unit: next status deadline, failures in a row, pending commands by type, statistics.  First
+        #deadlines are spread over the period so the polls don't queue up behind each other
+        self.nodes = dict((address, {'due': now + period*i/len(self._order), 'failures': 0, 'pending': {},
+                                     'polls': 0, 'answers': 0, 'missed': 0, 'lastSeen': None, 'latency': []})
+                          for i, address in enumerate(self._order))
+        self._running = False
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Queues a command for a unit, replacing a queued command of the same type
+         Inputs: address, cmd (bytearray) - [cmdType, cmdValue]
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def submit(self, address, cmd):
+        with self._lock:
+            self.nodes[address]['pending'][cmd[0]] = bytearray(cmd)
+
+    def dead(self, address):
+        return self.nodes[address]['failures'] >= DEAD_AFTER
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Runs one transaction if anything is due
+         Inputs: None
+        Outputs: Time until something is due (s), 0 if a transaction was run
+    -------------------------------------------------------------------------------------------------------"""
+    def service(self):
+        now = time.time()
+        address, cmd = self.nextCmd(now)
+        if address is None:
+            return max(0.0, min(node['due'] for node in self.nodes.values()) - now)
+        node = self.nodes[address]
+        poll = cmd[0] == STATUS_REQUEST
+        resp = self._link.transact(address, cmd, self._timeout)
+        done = time.time()
+        if poll:
+            node['polls'] += 1
+            #Deadline missed if the unit was polled more than a period late
+            if done - node['due'] > self._period:
+                node['missed'] += 1
+            if len(node['latency']) < 100000:
+                node['latency'].append(done - node['due'])
+        if resp is None or resp[:1] == bytearray([NACK]):
+            node['failures'] += 1
+            if not poll:
+                #Retried with the next commands, a newer command of the same type replaces it
+                with self._lock:
+                    node['pending'].setdefault(cmd[0], cmd)
+            if node['failures'] >= DEAD_AFTER:
+                node['due'] = done + min(self._period*2**(node['failures'] - DEAD_AFTER + 1), MAX_BACKOFF)
+            elif poll:
+                node['due'] = done
+            return 0.0
+        node['failures'] = 0
+        node['answers'] += 1
+        node['lastSeen'] = done
+        #Every answer carries the status, the poll deadline restarts
+        node['due'] = done + self._period
+        if self._handle is not None:
+            self._handle(address, resp)
+        return 0.0
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Runs the schedule, sleeping while nothing is due
+         Inputs: duration - seconds to run, None runs until stop()
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def run(self, duration = None):
+        end = None if duration is None else time.time() + duration
+        self._running = True
+        while self._running and (end is None or time.time() < end):
+            wait = self.service()
+            if wait > 0:
+                time.sleep(wait if end is None else min(wait, max(0.0, end - time.time())))
+
+    def stop(self):
+        self._running = False
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Picks the next transaction: queued commands of live units first, then due status polls,
+                 both round robin from the unit after the last one served
+         Inputs: now
+        Outputs: (address, command), (None, None) if nothing is due
+    -------------------------------------------------------------------------------------------------------"""
+    def nextCmd(self, now):
+        with self._lock:
+            count = len(self._order)
+            for commands in (True, False):
+                for i in range(count):
+                    index = (self._next + i) % count
+                    address = self._order[index]
+                    node = self.nodes[address]
+                    if commands:
+                        if not node['pending'] or (self.dead(address) and node['due'] > now):
+                            continue
+                        cmdType = sorted(node['pending'])[0]
+                        cmd = node['pending'].pop(cmdType)
+                    elif node['due'] <= now:
+                        cmd = bytearray([STATUS_REQUEST, 0x00])
+                    else:
+                        continue
+                    self._next = (index + 1) % count
+                    return address, cmd
+        return None, None
+
+#-----------------------------------------------------------------------#
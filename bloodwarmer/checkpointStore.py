@@ -0,0 +1,190 @@
+#imports
+import os
+import time
+import zlib
+import struct
+import threading
+
+#----------------Constants-----------------------#
+
+#Checkpoint file, kept next to the gui files on the sd card
+CHECKPOINT_FILE = '/home/pi/Documents/BloodWarmer/incubation.ckpt'
+#Minimum time between periodic checkpoints (s), state changes are saved immediately
+CHECKPOINT_INTERVAL = 5.0
+
+#Record: magic, version, save time, set temp, heat time, incubation time, bag temp, flags, followed by crc32
+RECORD_FORMAT = '<4sBdfddfB'
+MAGIC = b'BWCK'
+RECORD_VERSION = 1
+CRC_FORMAT = '<I'
+RECORD_SIZE = struct.calcsize(RECORD_FORMAT) + struct.calcsize(CRC_FORMAT)
+
+#Record flags
+RUNNING = 0x01
+INCUBATING = 0x02
+READY = 0x04
+
+#Oldest checkpoint that may be resumed (s), blood left longer has to be restarted
+MAX_RESUME_AGE = 300.0
+#Incubation continues only if the bag is still this close to set temp (C), the band controller uses
+#to leave incubation
+RESUME_TEMP_BAND = 0.5
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Saves incubation progress so it survives a crash or brown
+                    out.  The control loop only packs a small record, at most
+                    once per interval or on a state change, and hands it to a
+                    writer thread.  The writer replaces the checkpoint file
+                    atomically (write temp file, fsync, rename) so a power cut
+                    leaves either the old or the new record, never a partial
+                    one.  On startup the saved record is reconciled against the
+                    live bag temperature before resume is offered
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created record format, background atomic writer, load
+                    and startup reconciliation
+----------------------------------------------------------------------------"""
+class checkpointStore(object):
+
+    def __init__(self, path = CHECKPOINT_FILE, interval = CHECKPOINT_INTERVAL):
+        self._path = path
+        self._interval = interval
+        self._lastSave = 0
+        self._pending = None
+        #_lock guards the pending record only, file operations hold _fileLock so save never waits on the sd card
+        self._lock = threading.Lock()
+        self._fileLock = threading.Lock()
+        self._wake = threading.Event()
+        self._writer = threading.Thread(target = self.writeLoop)
+        self._writer.daemon = True
+        self._writer.start()
+        #Statistics
+        self.saves = 0
+        self.writes = 0
+        self.writeErrors = 0
+        self.lastWriteTime = None
+        self.worstWriteTime = 0.0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Queues a checkpoint if the interval has passed, cheap enough to call every control tick
+         Inputs: setTemp, heatTime, incTime (s), tempAvg (C), running, incubating, ready,
+                 force - save regardless of the interval (state changes)
+        Outputs: True if a checkpoint was queued
+    -------------------------------------------------------------------------------------------------------"""
+    def save(self, setTemp, heatTime, incTime, tempAvg, running, incubating, ready, force = False):
+        now = time.time()
+        if not force and now - self._lastSave < self._interval:
+            return False
+        self._lastSave = now
+        flags = (RUNNING if running else 0) | (INCUBATING if incubating else 0) | (READY if ready else 0)
+        record = struct.pack(RECORD_FORMAT, MAGIC, RECORD_VERSION, now, setTemp, heatTime, incTime, tempAvg, flags)
+        record += struct.pack(CRC_FORMAT, zlib.crc32(record) & 0xFFFFFFFF)
+        with self._lock:
+            self._pending = record
+        self._wake.set()
+        self.saves += 1
+        return True
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Writes a queued checkpoint from the calling thread, used before shutdown
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def flush(self):
+        self.write()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Drops the saved checkpoint, incubation progress is no longer needed
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def clear(self):
+        with self._fileLock:
+            with self._lock:
+                self._pending = None
+            try:
+                os.remove(self._path)
+            except OSError:
+                pass
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Reads the saved checkpoint
+         Inputs: None
+        Outputs: Dictionary of saved state, None if there is no valid checkpoint
+    -------------------------------------------------------------------------------------------------------"""
+    def load(self):
+        try:
+            with open(self._path, 'rb') as f:
+                data = f.read(RECORD_SIZE + 1)
+        except (IOError, OSError):
+            return None
+        if len(data) != RECORD_SIZE:
+            return None
+        record = data[:-struct.calcsize(CRC_FORMAT)]
+        crc, = struct.unpack(CRC_FORMAT, data[len(record):])
+        if zlib.crc32(record) & 0xFFFFFFFF != crc:
+            return None
+        magic, version, savedAt, setTemp, heatTime, incTime, tempAvg, flags = struct.unpack(RECORD_FORMAT, record)
+        if magic != MAGIC or version != RECORD_VERSION:
+            return None
+        return {'savedAt': savedAt, 'setTemp': setTemp, 'heatTime': heatTime, 'incTime': incTime,
+                'tempAvg': tempAvg, 'running': bool(flags & RUNNING), 'incubating': bool(flags & INCUBATING),
+                'ready': bool(flags & READY)}
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Decides whether a saved incubation can be resumed given the live sensor readings.  Only a
+                 run that was interrupted, not finished and not too old is resumable.  Incubation time is
+                 kept only if the bag is still within RESUME_TEMP_BAND of set temp, otherwise the bag has
+                 to heat up and incubate again
+         Inputs: saved - result of load(), tempAvg - live average bag temperature (C), now - current time
+        Outputs: Dictionary with setTemp, heatTime, incTime, None if not resumable
+    -------------------------------------------------------------------------------------------------------"""
+    def reconcile(self, saved, tempAvg, now = None):
+        if now is None:
+            now = time.time()
+        if saved is None or not saved['running'] or saved['ready']:
+            return None
+        if not 0 <= now - saved['savedAt'] <= MAX_RESUME_AGE:
+            return None
+        incTime = saved['incTime']
+        if saved['setTemp'] - tempAvg > RESUME_TEMP_BAND:
+            incTime = 0
+        return {'setTemp': saved['setTemp'], 'heatTime': saved['heatTime'], 'incTime': incTime}
+
+    #--------------------Private Functions----------------------#
+
+    def writeLoop(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            self.write()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Replaces the checkpoint file with the pending record
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def write(self):
+        with self._fileLock:
+            with self._lock:
+                record, self._pending = self._pending, None
+            if record is None:
+                return
+            start = time.time()
+            tmpPath = self._path + '.tmp'
+            try:
+                with open(tmpPath, 'wb') as f:
+                    f.write(record)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.rename(tmpPath, self._path)
+            except (IOError, OSError):
+                self.writeErrors += 1
+                return
+            self.writes += 1
+            self.lastWriteTime = time.time() - start
+            self.worstWriteTime = max(self.worstWriteTime, self.lastWriteTime)
+
+#-----------------------------------------------------------------------#
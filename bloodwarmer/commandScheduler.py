@@ -0,0 +1,152 @@
+#imports
+import time
+import threading
+
+#----------------Constants-----------------------#
+
+STATUS_REQUEST = 0x07 #Returns status of all hardware
+
+#Priority classes, lower value is sent first
+SAFETY = 0
+CONTROL = 1
+HOUSEKEEPING = 2
+PRIORITIES = (SAFETY, CONTROL, HOUSEKEEPING)
+
+#Link time per period that may be spent on housekeeping (s), safety and
+#control commands are always sent
+TICK_BUDGET = 0.025
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Priority aware command queue in front of the serial link.
+                    Commands are queued by priority class (safety, control,
+                    housekeeping) and sent highest class first, FIFO within a
+                    class.  A queued command is replaced by a newer command of
+                    the same type, so two heater duty updates collapse to the
+                    latest, unless the queued command belongs to a higher class
+                    (a pending heater off is never overridden by a control
+                    update).  Every command returns a status packet, so each
+                    service() call sends at least one transaction, falling back
+                    to STATUS_REQUEST, which guarantees a status snapshot every
+                    period
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created priority queues, command merging, per period
+                    budget and status snapshot guarantee
+            -1.0.1: Status request fallback can be turned off when the Atmega
+                    streams status
+----------------------------------------------------------------------------"""
+class commandScheduler(object):
+
+    def __init__(self, send, handle, budget = TICK_BUDGET):
+        #send(cmd) performs the transaction, handle(result) processes its status update
+        self._send = send
+        self._handle = handle
+        self._budget = budget
+        self._lock = threading.Lock()
+        #One queue per class: list of command types in arrival order plus latest command per type
+        self._order = dict((priority, []) for priority in PRIORITIES)
+        self._pending = dict((priority, {}) for priority in PRIORITIES)
+        #Statistics
+        self.sent = dict((priority, 0) for priority in PRIORITIES)
+        self.merged = 0
+        self.deferred = 0
+        self.statusPolls = 0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Queues a command, replacing a queued command of the same type
+         Inputs: cmd (bytearray) - [cmdType, cmdValue], priority - SAFETY, CONTROL or HOUSEKEEPING
+        Outputs: False if the command was dropped because a higher class command of the same type is queued
+    -------------------------------------------------------------------------------------------------------"""
+    def submit(self, cmd, priority = CONTROL):
+        cmdType = cmd[0]
+        with self._lock:
+            for queued in PRIORITIES:
+                if cmdType in self._pending[queued]:
+                    self.merged += 1
+                    if queued < priority:
+                        return False
+                    del self._pending[queued][cmdType]
+                    self._order[queued].remove(cmdType)
+            self._pending[priority][cmdType] = bytearray(cmd)
+            self._order[priority].append(cmdType)
+        return True
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Drops a queued command that has not been sent yet
+         Inputs: cmdType
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def cancel(self, cmdType):
+        with self._lock:
+            for priority in PRIORITIES:
+                if cmdType in self._pending[priority]:
+                    del self._pending[priority][cmdType]
+                    self._order[priority].remove(cmdType)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Runs one period: sends queued commands highest class first.  Housekeeping stops once the
+                 budget is used up and carries over to the next period.  Sends a status request if nothing
+                 else was sent
+         Inputs: poll - send the status request, False while status is streamed
+        Outputs: Number of transactions
+    -------------------------------------------------------------------------------------------------------"""
+    def service(self, poll = True):
+        deadline = time.time() + self._budget
+        transactions = 0
+        while True:
+            overBudget = transactions > 0 and time.time() >= deadline
+            cmd = self.nextCmd(overBudget)
+            if cmd is None:
+                break
+            self._handle(self._send(cmd))
+            transactions += 1
+        #Status snapshot guarantee
+        if transactions == 0 and poll:
+            self.statusPolls += 1
+            self._handle(self._send(bytearray([STATUS_REQUEST, 0x00])))
+            transactions = 1
+        return transactions
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Sends everything queued regardless of budget, used before shutdown
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def flush(self):
+        cmd = self.nextCmd(False)
+        while cmd is not None:
+            self._handle(self._send(cmd))
+            cmd = self.nextCmd(False)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Number of commands waiting in each class
+         Inputs: None
+        Outputs: {priority: count}
+    -------------------------------------------------------------------------------------------------------"""
+    def queued(self):
+        with self._lock:
+            return dict((priority, len(self._order[priority])) for priority in PRIORITIES)
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Takes the next command to send off the queues
+         Inputs: overBudget - housekeeping is deferred when True
+        Outputs: Command, None if nothing should be sent this period
+    -------------------------------------------------------------------------------------------------------"""
+    def nextCmd(self, overBudget):
+        with self._lock:
+            for priority in PRIORITIES:
+                if not self._order[priority]:
+                    continue
+                if priority == HOUSEKEEPING and overBudget:
+                    self.deferred += 1
+                    return None
+                cmdType = self._order[priority].pop(0)
+                self.sent[priority] += 1
+                return self._pending[priority].pop(cmdType)
+        return None
+
+#-----------------------------------------------------------------------#
@@ -2,24 +2,33 @@
 # -*- coding: cp1252 -*-
 
 #Imports
-import struct, time, math, csv
+import time, math
 from PyQt4 import QtCore, QtGui, uic
 from hardwareState import hardwareState
+from commandScheduler import commandScheduler, CONTROL
+from adaptivePoller import adaptivePoller, IDLE, HEATING, INCUBATING
+from outputReconciler import outputReconciler
+from checkpointStore import checkpointStore
+from sessionStore import sessionStore, STATE_CHANGE, DOOR_FAULT, SENSOR_FAULT, RESUMED, THERMAL_FAULT, STOPPED, COMPLETE
+from usbExporter import usbExporter
+from telemetryServer import telemetryServer
+from etaEstimator import etaEstimator
+from sensorHealth import GRADE_NAMES
+from alarmEngine import alarmEngine, POPUP, STOP, DOOR, MESSAGE
+from unitControl import heaterDuty, KP_HEAT, SETPOINT_BAND, INCUBATION_TIME_SECONDS
 
 #-------------------------Constants----------------------------------#
-#Controller proportional constant
-#TODO test system to determine these heating constants
-KP_HEAT = 0xFF
+#Heater control law, set temp band and incubation time are shared with fleet units (unitControl)
 FAN_HEAT_SPEED = 0xFF
 MOTOR_SPEED = 0xC0
 ON = 0x01
 OFF = 0x00
 
 #-----------Control Timing-------------#
-#Control loop update period
+#Control loop update period (fastest poll rate, see adaptivePoller)
 CONTROL_PERIOD = 30
-#Time to incubate
-INCUBATION_TIME_SECONDS = 3600.0
+#Period of ETA updates to the gui (s)
+ETA_PERIOD = 1.0
 
 #--------------------Commands--------------------#
 STATUS_REQUEST = 0x07 #Returns status of all hardware
@@ -85,12 +94,44 @@ FREQ_SET = 0x0C
 #                           which should be run, added signaling for buttons
 #					1.1:  Added save functionality, updated incubation configuration,
 #						  added safety catches, added system completion functionality
+#                   1.1.1: Arms door safety path while running, added doorOpenedHandler
+#                          for trips from the GPIO edge callback
+#                   1.1.2: Commands go through the priority scheduler, sent once per
+#                          control period, heater off on stop sent as a safety command
+#                   1.1.3: Control timer period adapted to system state by adaptivePoller
+#                   1.1.4: Outputs set through outputReconciler, commands only sent when
+#                          the reported hardware state differs from the desired state
+#                   1.1.5: Added control tick jitter statistics
+#                   1.1.6: Incubation progress checkpointed, interrupted run offered
+#                          for resume on startup
+#                   1.1.7: Sessions, samples and events recorded in the session database
+#                   1.1.8: Save exports sessions to usb drives from a background worker,
+#                          no file writes in the control thread
+#                   1.1.9: Status streamed by the Atmega when the firmware supports it,
+#                          status requests only sent when polling
+#                   1.2.0: System state and incubation time published to the telemetry
+#                          server every tick
+#                   1.2.1: Bag and average temperatures sent to the gui trend chart
+#                   1.2.2: Time to set temp and to completion estimated from the warming
+#                          trajectory, sent to the gui and telemetry
+#                   1.2.3: Probe health warnings recorded in the session log
+#                   1.2.4: Thermal protection trips stop the system, set temp kept in the
+#                          protection for the overshoot prediction
+#                   1.2.5: Door, sensor fault, temperature, link and overrun alarms raised by
+#                          the compiled alarm rules once per tick instead of ad hoc checks
+#                   1.2.6: Heater duty from the control law shared with fleet units
+#                   1.2.7: Status streamed at the adaptive poll period instead of a fixed rate
+#                   1.2.8: Full poll rate while armed only when the heater is on
 #
 #----------------------------------------------------------------------------#
 
 class controller(QtCore.QObject):
     #signal to send updated temperatures to gui
     tempUpdate = QtCore.pyqtSignal(float)
+    #Bag 1, bag 2 and average temperature for the trend chart
+    trendUpdate = QtCore.pyqtSignal(float, float, float)
+    #Estimated time to set temp and to completion, margin (s), -1 if unknown
+    etaUpdate = QtCore.pyqtSignal(float, float, float)
     #signals for messages to user
     doorSafetyWarning = QtCore.pyqtSignal()
     incubationFinishedMessage = QtCore.pyqtSignal()
@@ -103,6 +144,9 @@ class controller(QtCore.QObject):
     backPressed = QtCore.pyqtSignal()
     selectPressed = QtCore.pyqtSignal()
 
+    #Interrupted incubation can be resumed: set temp (C), incubation time (s)
+    resumeAvailable = QtCore.pyqtSignal(float, float)
+
 	#Display timer signals
     startGuiTimer = QtCore.pyqtSignal(bool)  #bool = 
     stopGuiTimer = QtCore.pyqtSignal()
@@ -110,25 +154,20 @@ class controller(QtCore.QObject):
     #Timer for updating hardware status/sending commands
     updateTimer = QtCore.QTimer()
 
-	
-	#Define format for writing to csv
-    csv.register_dialect(
-        'bloodWarmerDialect',
-        delimiter = '\t',
-        quotechar = '"',
-        doublequote = True,
-        skipinitialspace = True,
-        lineterminator = '\r\n',
-        quoting = csv.QUOTE_MINIMAL)
-        
     def __init__(self):
         super(self.__class__, self).__init__()
         #Initialize hardware model
         self.arduino = hardwareState()
+        #Initialize command scheduler in front of the serial link
+        self.scheduler = commandScheduler(self.arduino.sendCmd, self.handleUpdate)
+        #Status poll rate by system state
+        self.poller = adaptivePoller()
+        #Desired output state, diffed against reported hardware state
+        self.outputs = outputReconciler(self.arduino)
         #Initialize controller variables
-        self._lastHeaterDutyByte = 0
 	self._kp = KP_HEAT
         self._setTemp = 37.0
+        self.arduino.thermal.setTemp = self._setTemp
         self._tempAvg = 0.0
         #Initialize status flags
         self._running = False
@@ -139,10 +178,42 @@ class controller(QtCore.QObject):
         self._incTime = 0
         self._heatTime = 0
         self._heatStartTime = 0
-		#Initialize save file
-        self.saveFile = None
+        #Time to set temp, fitted to the filtered bag temperature while heating
+        self.eta = etaEstimator()
+        self._lastEta = 0
+        #Alarm rules, compiled once
+        self.alarms = alarmEngine()
+        #Control tick jitter statistics (s)
+        self._lastTick = None
+        self.ticks = 0
+        self.jitterSum = 0.0
+        self.jitterMax = 0.0
+        #Incubation progress checkpoint, reconciled against the first status update
+        self.checkpoints = checkpointStore()
+        self._savedState = self.checkpoints.load()
+        self._resumeState = None
+        #Incubation history
+        self.sessions = sessionStore()
+        self._sessionId = None
+        #Session export to usb drives, enabled by the save button
+        self.exporter = usbExporter(self.sessions)
+        #Central monitoring, control runs without it if the port can't be opened
+        try:
+            self.telemetry = telemetryServer()
+            self.telemetry.start()
+        except (IOError, OSError):
+            self.telemetry = None
         #Configure controller timer
         self.updateTimer.timeout.connect(self.runSystem,QtCore.Qt.QueuedConnection)
+        #Door trips from the safety path (GPIO callback runs in another thread)
+        self.arduino.safety.doorOpened.connect(self.doorOpenedHandler,QtCore.Qt.QueuedConnection)
+        #Probe health grade changes go in the session log
+        self.arduino.sensorWarning.connect(self.sensorWarningHandler)
+        #Over temperature trips, the heater is already off when they arrive
+        self.arduino.thermal.tripped.connect(self.thermalTripHandler,QtCore.Qt.QueuedConnection)
+        self.arduino.thermal.overshootHold.connect(self.overshootHoldHandler)
+        #Status pushed by the Atmega at the poll period, older firmware keeps being polled
+        self.arduino.startStream(self.pollPeriod())
         self.startUpdateTimer()
 
     """-------------------------------------------------------------------------------------------------------
@@ -166,6 +237,9 @@ class controller(QtCore.QObject):
             self.startSystem()
         elif not systemState and self.arduino.doorSwitch:
             self.stopSystem()
+            #Stopped by the user, nothing to resume
+            self.checkpoints.clear()
+            self.endSession()
         else:
             self.stopSystem()
             self.doorSafetyWarning.emit()
@@ -175,16 +249,13 @@ class controller(QtCore.QObject):
 
 		
 	"""-------------------------------------------------------------------------------------------------------
-       Description: Enables logging of temperature over time
+       Description: Enables export of logged sessions to usb drives
             Inputs: None
            Outputs: None
        -------------------------------------------------------------------------------------------------------"""
     @QtCore.pyqtSlot()
     def enableSaving(self):
-        try:
-            self.saveFile = open('/media/pi/USB/bloodwarmerData.csv', 'a')
-        except:
-            self.saveFile = None
+        self.exporter.enable()
 			
         
     """-------------------------------------------------------------------------------------------------------
@@ -193,7 +264,28 @@ class controller(QtCore.QObject):
        Outputs: None
    -------------------------------------------------------------------------------------------------------"""
     def startUpdateTimer(self):
-        self.updateTimer.start(CONTROL_PERIOD)
+        #Time stopped is not tick jitter
+        self._lastTick = None
+        period = self.pollPeriod()
+        if self.arduino.streaming:
+            self.arduino.setStreamPeriod(period)
+        self.updateTimer.start(period)
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Poll period for the current system state
+        Inputs: None
+       Outputs: Control timer period (ms)
+   -------------------------------------------------------------------------------------------------------"""
+    def pollPeriod(self):
+        if not self._running:
+            state = IDLE
+        elif self._incubating:
+            state = INCUBATING
+        else:
+            state = HEATING
+        heaterOn = bool(self.outputs.desired(HEATER_DUTY_SET) or self.arduino.heaterDutyState)
+        return self.poller.period(state, self._setTemp - self._tempAvg, self.arduino.safety.armed,
+                                  self.arduino.safety.edgeWired, heaterOn)
 
 		
 	"""-------------------------------------------------------------------------------------------------------
@@ -213,8 +305,18 @@ class controller(QtCore.QObject):
     def updateHandler(self):
 		#Set temperature to be controlled
         self._tempAvg = self.arduino.bagTempAvg
+        self.poller.addTemp(self._tempAvg)
+        if self._running and not self._incubating:
+            self.eta.addTemp(time.time(), self._tempAvg)
+        #Offer resume once live temperatures are known
+        if self._savedState is not None:
+            self.offerResume()
 		#Send average temperature to gui
         self.tempUpdate.emit(self._tempAvg)
+        self.trendUpdate.emit(self.arduino.bag1TempC, self.arduino.bag2TempC, self._tempAvg)
+        #Poll faster while the user is pressing buttons
+        if self.arduino.upSwitch or self.arduino.downSwitch or self.arduino.backSwitch or self.arduino.selectSwitch:
+            self.poller.activity()
 		
         #Call tactile input event handlers
         if self.arduino.upSwitch:
@@ -225,11 +327,45 @@ class controller(QtCore.QObject):
             self.backPressed.emit()
         if self.arduino.selectSwitch:
             self.selectPressed.emit()
-        #Checks if door is open and sets safety warning if not
-        if self._running and not self.arduino.doorSwitch:
-                self.stopSystem()
-                self.doorSafetyWarning.emit()
-	
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Safety path turned the heater off, stops the rest of the system if a status update has not
+                already done so
+        Inputs: None
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+    @QtCore.pyqtSlot()
+    def doorOpenedHandler(self):
+        if self._running:
+            self.logEvent(DOOR_FAULT, 'Door opened')
+            self.stopSystem()
+            self.doorSafetyWarning.emit()
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Records a probe health grade change
+        Inputs: grade - sensorHealth grade, detail - probe and reason
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+    @QtCore.pyqtSlot(int, str)
+    def sensorWarningHandler(self, grade, detail):
+        self.logEvent(SENSOR_FAULT, '%s - %s' % (GRADE_NAMES[grade], detail))
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Thermal protection turned the heater off for good, stops the system and tells the user
+        Inputs: reason - what tripped
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+    @QtCore.pyqtSlot(str)
+    def thermalTripHandler(self, reason):
+        self.logEvent(THERMAL_FAULT, reason)
+        if self._running:
+            self.stopSystem()
+        self.arduino.systemError.emit("Over Temperature")
+
+    @QtCore.pyqtSlot(bool)
+    def overshootHoldHandler(self, held):
+        self.logEvent(THERMAL_FAULT, 'Heater held off for predicted overshoot' if held else 'Heater hold released')
+
 	"""-------------------------------------------------------------------------------------------------------
    Description: Starts control system
         Inputs: None
@@ -238,23 +374,26 @@ class controller(QtCore.QObject):
     def startSystem(self):
 		#Set control loop running flag
         self._running = 1
-		#Save time and average temperature to flash drive if save button has been pressed
-        if self.saveFile:
-            try:
-                self.saveFile = open('/media/pi/USB/bloodwarmerData.csv', 'a')
-                dataWriter = csv.writer(self.saveFile, dialect = "bloodWarmerDialect")
-                dataWriter.writerow(("Date/Time",'            ',"Average Bag Temperature (C)"))
-            except:
-                pass
+        #Heater may be driven from here on, arm door interlock and clear thermal trips
+        self.arduino.thermal.reset()
+        self.arduino.safety.arm()
+        #Starting again acknowledges latched alarms
+        self.reportAlarms(self.alarms.acknowledge())
+        #Open a session unless continuing one after a door fault
+        if self._sessionId is None:
+            self._sessionId = self.sessions.startSession(self._setTemp)
+        self.logEvent(STATE_CHANGE, 'Started')
+        self.eta.reset()
         #Initialize motor and fan
-        self.sendCmd(bytearray([MOTOR_DUTY_SET, MOTOR_SPEED]))
-        self.sendCmd(bytearray([FAN_POWER_SET, ON]))
-        self.sendCmd(bytearray([FAN_DUTY_SET, FAN_HEAT_SPEED]))
+        self.outputs.setDesired(MOTOR_DUTY_SET, MOTOR_SPEED)
+        self.outputs.setDesired(FAN_POWER_SET, ON)
+        self.outputs.setDesired(FAN_DUTY_SET, FAN_HEAT_SPEED)
+        self.reconcileOutputs()
         #Determine system state starting in, configure controller and display appropriately
         error = self._setTemp - self._tempAvg
-        if error <= 0.5 and ~self._incubating:
+        if error <= SETPOINT_BAND and ~self._incubating:
             self._incubating = True
-            self._incStartTime = time.time()
+            self._incStartTime = time.time() - self._incTime
             self.startGuiTimer.emit(True)
             self.systemUpdate.emit(2)
         elif self._incubating:
@@ -270,18 +409,16 @@ class controller(QtCore.QObject):
     def stopSystem(self):
 		#Set control loop running flag to 0
         self._running = 0
-		#Stops motor, fan, and heater
-        self.sendCmd(bytearray([MOTOR_DUTY_SET, OFF]))
-        self.sendCmd(bytearray([FAN_POWER_SET, OFF]))
-        self.sendCmd(bytearray([HEATER_DUTY_SET, OFF]))
+        self.arduino.safety.disarm()
+		#Stops heater, motor, and fan
+        self.outputs.setDesired(HEATER_DUTY_SET, OFF)
+        self.outputs.setDesired(MOTOR_DUTY_SET, OFF)
+        self.outputs.setDesired(FAN_POWER_SET, OFF)
+        self.reconcileOutputs()
 		#Stops display timer and updates system state displayed
         self.stopGuiTimer.emit()
         self.systemUpdate.emit(0)
-		#Closes save file if open
-        try:
-            self.saveFile.close()
-        except:
-            pass
+        self.saveCheckpoint(True)
         
 
     """-------------------------------------------------------------------------------------------------------
@@ -292,22 +429,36 @@ class controller(QtCore.QObject):
     QtCore.pyqtSlot(float)
     def updateSetTemp(self,newSetTemp):
         self._setTemp = newSetTemp
+        self.arduino.thermal.setTemp = newSetTemp
 
 
 	"""-------------------------------------------------------------------------------------------------------
-       Description: Sends command to atmega controller, stops system on temp sensor fault
-            Inputs: cmd - command to send to arduino
+       Description: Queues command to atmega controller, sent on the next control period
+            Inputs: cmd - command to send to arduino, priority - scheduler priority class
+           Outputs: None
+       -------------------------------------------------------------------------------------------------------"""
+    def sendCmd(self, cmd, priority = CONTROL):
+        self.scheduler.submit(cmd, priority)
+
+    """-------------------------------------------------------------------------------------------------------
+       Description: Queues commands for outputs whose reported state differs from the desired state
+            Inputs: None
+           Outputs: None
+       -------------------------------------------------------------------------------------------------------"""
+    def reconcileOutputs(self):
+        for cmd, priority in self.outputs.commands():
+            self.sendCmd(cmd, priority)
+
+    """-------------------------------------------------------------------------------------------------------
+       Description: Handles the status update returned by each command, temp sensor faults are raised by the
+                alarm rules
+            Inputs: update - result of hardwareState.sendCmd
            Outputs: None
        -------------------------------------------------------------------------------------------------------"""
-    def sendCmd(self, cmd):
-		#Send command
-        update = self.arduino.sendCmd(cmd)
+    def handleUpdate(self, update):
 		#Handle model update
         if update == 1:
             self.updateHandler()
-		#Stop system on temp sensor fault
-        if update == 2:
-            self.stopSystem()
 
     """-------------------------------------------------------------------------------------------------------
    Description: Control system run function, signaled by start button,
@@ -316,17 +467,10 @@ class controller(QtCore.QObject):
    -------------------------------------------------------------------------------------------------------"""
     QtCore.pyqtSlot()
     def runSystem(self):
+        self.recordTick()
         #Run control loop
         if self._running:
 			
-			#If save button has been pressed, save time and average temperature to file
-            if self.saveFile:
-                try:
-                    logTime = time.asctime(time.localtime(time.time()))
-                    dataWriter = csv.writer(self.saveFile, dialect = "bloodWarmerDialect")
-                    dataWriter.writerow((logTime,"%.2f" % self._tempAvg))
-                except:
-                    pass
 					
 			#Calculate the time spent heating
             self._heatTime = time.time() - self._heatStartTime
@@ -337,7 +481,7 @@ class controller(QtCore.QObject):
                 error = 0
             #Check and configure for system state (heating/incubation) 
 			#start incubating
-            if error <= 0.5 and not self._incubating:
+            if error <= SETPOINT_BAND and not self._incubating:
 				#set incubation flag
                 self._incubating = True
 				#Get incubation time
@@ -345,26 +489,23 @@ class controller(QtCore.QObject):
 				#Restart gui timer and update system state to incubating
                 self.startGuiTimer.emit(True)
                 self.systemUpdate.emit(2)
+                self.logEvent(STATE_CHANGE, 'Incubating')
+                if self._sessionId is not None:
+                    self.sessions.setpointReached(self._sessionId)
 			#Stop incubating
-            elif error > 0.5 and self._incubating:
+            elif error > SETPOINT_BAND and self._incubating:
 				#Set incubation flag
                 self._incubating = False
 				#Reset incubation time and switch system state to heating
                 self._incStartTime = 0
                 self._incTime = 0
                 self.systemUpdate.emit(1)
+                self.logEvent(STATE_CHANGE, 'Heating')
             else:
-                #Calculate heater duty signal to send based on constant
-                duty = error*self._kp
-                #Ceiling function for duty value
-                if duty > 255:
-                    duty = 255
-                #Convert duty value from float to byte
-                dutyByte = struct.pack("B",duty)
-                #Set duty cycle of heater
-                if dutyByte is not self._lastHeaterDutyByte:
-                    self.sendCmd(bytearray([HEATER_DUTY_SET,dutyByte]))
-                self._lastHeaterDutyByte = dutyByte
+                #Heater duty from the shared control law
+                duty = heaterDuty(self._setTemp, self._tempAvg, self._kp)
+                #Set duty cycle of heater, sent only if it differs from the reported duty
+                self.outputs.setDesired(HEATER_DUTY_SET, duty)
 				#Update incubation time
                 if self._incubating:
                     self._incTime = time.time() - self._incStartTime
@@ -373,9 +514,187 @@ class controller(QtCore.QObject):
                         self.systemUpdate.emit(3)
                         self.incubationFinishedMessage.emit()
                         self._ready = True
+                        self.saveCheckpoint(True)
+                        self.logEvent(STATE_CHANGE, 'Complete')
+            self.saveCheckpoint()
+            if self._sessionId is not None:
+                self.sessions.sample(self._sessionId, self._tempAvg, self.arduino.bag1TempC, self.arduino.bag2TempC,
+                                     self.arduino.heaterDutyState, self.systemState())
+        #Send commands for outputs that differ from the hardware, a status request is sent if nothing is queued
+        #and status is not streamed
+        self.reconcileOutputs()
+        self.scheduler.service(not self.arduino.streaming)
+        if self.arduino.streaming:
+            self.handleUpdate(self.arduino.pollStream())
+        #Alarms on the state after this tick's updates
+        self.reportAlarms(self.alarms.evaluate(self.alarmInputs()))
+        warmEta, completionEta, etaMargin = self.completionEta()
+        if time.time() - self._lastEta >= ETA_PERIOD:
+            self._lastEta = time.time()
+            self.etaUpdate.emit(*[-1.0 if value is None else value for value in (warmEta, completionEta, etaMargin)])
+        if self.telemetry is not None:
+            self.telemetry.publishState(self.systemState(), self._setTemp, self._heatTime, self._incTime,
+                                        max(0.0, INCUBATION_TIME_SECONDS - self._incTime),
+                                        warmEta, completionEta, etaMargin)
+        #Adapt poll rate to the new state
+        period = self.pollPeriod()
+        if period != self.updateTimer.interval():
+            self.updateTimer.setInterval(period)
+            #The stream follows the poll rate, an idle system is not streamed at the near setpoint rate
+            if self.arduino.streaming:
+                self.arduino.setStreamPeriod(period)
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Current system state as signalled by systemUpdate
+        Inputs: None
+       Outputs: 0 = Idle, 1 = Heating, 2 = Incubating, 3 = Complete
+   -------------------------------------------------------------------------------------------------------"""
+    def systemState(self):
+        if not self._running:
+            return 0
+        return 3 if self._ready else 2 if self._incubating else 1
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Alarm rule inputs, in alarmEngine.ALARM_INPUTS order
+        Inputs: None
+       Outputs: Tuple of inputs
+   -------------------------------------------------------------------------------------------------------"""
+    def alarmInputs(self):
+        return (self._tempAvg - self._setTemp, self._setTemp - self._tempAvg, not self.arduino.doorSwitch,
+                self.arduino.sensorState, self.arduino.link.state, self._running, self._incubating,
+                self._incTime - INCUBATION_TIME_SECONDS if self._ready else 0.0)
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Acts on raised alarms through the existing popups, logs raised and cleared alarms and sends
+                the active alarms to telemetry
+        Inputs: changes - (rule index, raised) from the alarm engine
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+    def reportAlarms(self, changes):
+        if not changes:
+            return
+        for index, raised in changes:
+            rule = self.alarms.rules[index]
+            self.logEvent(rule['event'], rule['name'] if raised else rule['name'] + ' cleared')
+            if not raised:
+                continue
+            action = rule['action']
+            if action in (STOP, DOOR) and self._running:
+                self.stopSystem()
+            if action == DOOR:
+                self.doorSafetyWarning.emit()
+            elif action in (STOP, POPUP):
+                self.arduino.systemError.emit(rule['name'])
+            elif action == MESSAGE:
+                self.incubationFinishedMessage.emit()
+        if self.telemetry is not None:
+            self.telemetry.publishAlarms(self.alarms.activeNames())
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Estimated time to set temp and to the end of incubation.  While heating the warming fit gives
+                the time to set temp, incubation then takes INCUBATION_TIME_SECONDS.  While incubating only the
+                incubation time is left
+        Inputs: None
+       Outputs: (time to set temp, time to completion, margin) in s, None if not known
+   -------------------------------------------------------------------------------------------------------"""
+    def completionEta(self):
+        if not self._running:
+            return None, None, None
+        if self._incubating or self._ready:
+            return 0.0, max(0.0, INCUBATION_TIME_SECONDS - self._incTime), 0.0
+        warmEta, margin = self.eta.timeTo(self._setTemp - SETPOINT_BAND)
+        if warmEta is None:
+            return None, None, None
+        return warmEta, warmEta + INCUBATION_TIME_SECONDS, margin
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Checkpoints incubation progress, periodically unless forced
+        Inputs: force - save now (state change)
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+    def saveCheckpoint(self, force = False):
+        self.checkpoints.save(self._setTemp, self._heatTime, self._incTime, self._tempAvg,
+                              self._running, self._incubating, self._ready, force)
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Reconciles the checkpoint from before startup with live readings and offers resume if the
+                interrupted run can continue
+        Inputs: None
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+    def offerResume(self):
+        saved, self._savedState = self._savedState, None
+        self._resumeState = self.checkpoints.reconcile(saved, self._tempAvg)
+        if self._resumeState is None:
+            self.checkpoints.clear()
+            return
+        self.resumeAvailable.emit(self._resumeState['setTemp'], self._resumeState['incTime'])
+
+    """-------------------------------------------------------------------------------------------------------
+       Description: Handles the user choice on an interrupted run
+            Inputs: systemState - if the system should be running or not
+                    restart - resume the saved progress (0), or start over (1)
+           Outputs: None
+       -------------------------------------------------------------------------------------------------------"""
+    @QtCore.pyqtSlot(bool, bool)
+    def resumeHandler(self, systemState, restart):
+        if not restart and self._resumeState is not None:
+            self._setTemp = self._resumeState['setTemp']
+            self.arduino.thermal.setTemp = self._setTemp
+            self._heatTime = self._resumeState['heatTime']
+            self._incTime = self._resumeState['incTime']
         else:
-			#Get hardware update only if controller not running
-            self.sendCmd(bytearray([STATUS_REQUEST,0x00]))
+            self._heatTime = 0
+            self._incTime = 0
+        self._resumeState = None
+        self._heatStartTime = time.time() - self._heatTime
+        self.systemHandler(systemState, restart)
+        if not restart:
+            self.logEvent(RESUMED, 'Resumed with %d s incubated' % self._incTime)
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Records an event in the current session
+        Inputs: kind - sessionStore event kind, detail - text
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+    def logEvent(self, kind, detail):
+        if self._sessionId is not None:
+            self.sessions.event(self._sessionId, kind, detail)
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Closes the current session
+        Inputs: None
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+    def endSession(self):
+        if self._sessionId is not None:
+            self.sessions.endSession(self._sessionId, COMPLETE if self._ready else STOPPED, self._incTime)
+            self._sessionId = None
+            self.exporter.sessionEnded()
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Records how far the time since the last control tick is from the timer period
+        Inputs: None
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+    def recordTick(self):
+        now = time.time()
+        if self._lastTick is not None:
+            jitter = abs(now - self._lastTick - self.updateTimer.interval()/1000.0)
+            self.ticks += 1
+            self.jitterSum += jitter
+            self.jitterMax = max(self.jitterMax, jitter)
+        self._lastTick = now
+
+    """-------------------------------------------------------------------------------------------------------
+   Description: Control tick jitter so far
+        Inputs: None
+       Outputs: (ticks, mean jitter, max jitter) in seconds
+   -------------------------------------------------------------------------------------------------------"""
+    def tickJitter(self):
+        if self.ticks == 0:
+            return 0, 0.0, 0.0
+        return self.ticks, self.jitterSum/self.ticks, self.jitterMax
 
 
 
@@ -0,0 +1,137 @@
+#-----------------------------------------------------------#
+#
+# Program Description: Door interlock tests against the simulated AtMega: heater
+#                      off within DOOR_REACTION_BOUND_S of the door opening,
+#                      polled and streamed, the trip latching and re-arming
+# Usage: python -m pytest doorInterlock_test.py  (or python doorInterlock_test.py)
+#
+#-----------------------------------------------------------#
+
+#-----------------------------------------------------------#
+# INCLUDES
+#-----------------------------------------------------------#
+import time, random, threading, unittest
+from simulatedDevice import simulatedDevice, simulatedPort
+from arduinoComm import arduinoComm
+from hardwareState import hardwareState
+from resetLine import deviceResetLine
+
+#Control loop update period (s), matches controller.CONTROL_PERIOD
+CONTROL_PERIOD_S = 0.030
+#Door open to heater commanded off: the rest of one poll period, the next status round trip and the heater off
+#round trip, with margin for a loaded host (s)
+DOOR_REACTION_BOUND_S = 0.150
+#Trials per reaction test, the door opens at a random point of the period
+TRIALS = 20
+STATUS_REQUEST = 0x07
+HEATER_DUTY_SET = 0x0B
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Door interlock on the simulated stack, serial wire time
+                    included
+----------------------------------------------------------------------------"""
+class doorInterlockTest(unittest.TestCase):
+
+    def setUp(self):
+        self.device = simulatedDevice()
+        self.port = simulatedPort(self.device)
+        self.hardware = hardwareState(comm = arduinoComm(ser = self.port,
+                                                         resetLine = deviceResetLine(self.device)))
+        self.heater(0x80)
+
+    def tearDown(self):
+        if self.hardware.streaming:
+            self.hardware.stopStream()
+
+    #--------------------Helper Functions-----------------------#
+
+    def heater(self, duty):
+        self.hardware.sendCmd(bytearray([HEATER_DUTY_SET, duty]))
+
+    def poll(self):
+        if self.hardware.streaming:
+            self.hardware.pollStream()
+        else:
+            self.hardware.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+
+    #Closes the door and reads past any frame sent while it was open
+    def closeDoor(self):
+        self.device.closeDoor()
+        time.sleep(2*CONTROL_PERIOD_S)
+        self.poll()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Opens the door at a random point of the control period and runs the control loop until the
+                 heater is off
+         Inputs: None
+        Outputs: Door open to heater off latency (s)
+    -------------------------------------------------------------------------------------------------------"""
+    def openDoorAndWait(self):
+        opener = threading.Timer(random.uniform(0, CONTROL_PERIOD_S), self.device.openDoor)
+        opener.start()
+        deadline = time.time() + 10*DOOR_REACTION_BOUND_S
+        while self.device.doorReactionLatency() is None and time.time() < deadline:
+            self.poll()
+            time.sleep(CONTROL_PERIOD_S)
+        opener.join()
+        latency = self.device.doorReactionLatency()
+        self.assertIsNotNone(latency, 'heater never turned off after the door opened')
+        return latency
+
+    def assertReaction(self):
+        worst = 0.0
+        for i in range(TRIALS):
+            self.closeDoor()
+            self.hardware.safety.arm()
+            self.heater(0x80)
+            worst = max(worst, self.openDoorAndWait())
+            self.assertEqual(self.device.heaterDutyState, 0)
+            self.assertTrue(self.hardware.safety.tripped)
+        self.assertLess(worst, DOOR_REACTION_BOUND_S)
+
+    #--------------------Tests----------------------------------#
+
+    def testHeaterOffPolled(self):
+        self.assertReaction()
+
+    def testHeaterOffStreamed(self):
+        self.hardware._serial.negotiateProtocol()
+        self.assertTrue(self.hardware.startStream(int(CONTROL_PERIOD_S*1000)))
+        self.assertReaction()
+
+    def testTripLatches(self):
+        self.hardware.safety.arm()
+        self.openDoorAndWait()
+        #Heater commands are forced off while tripped, also once the door is closed again
+        self.heater(0x80)
+        self.assertEqual(self.device.heaterDutyState, 0)
+        self.closeDoor()
+        self.heater(0x80)
+        self.assertEqual(self.device.heaterDutyState, 0)
+        self.assertTrue(self.hardware.safety.tripped)
+        self.assertEqual(self.hardware.safety.trips, 1)
+
+    def testRearm(self):
+        self.hardware.safety.arm()
+        self.openDoorAndWait()
+        self.closeDoor()
+        self.hardware.safety.arm()
+        self.assertFalse(self.hardware.safety.tripped)
+        self.heater(0x80)
+        self.assertEqual(self.device.heaterDutyState, 0x80)
+        #Armed again, the next opening trips again
+        self.openDoorAndWait()
+        self.assertEqual(self.device.heaterDutyState, 0)
+        self.assertEqual(self.hardware.safety.trips, 2)
+
+    def testDisarmedDoesNotTrip(self):
+        self.hardware.safety.disarm()
+        self.device.openDoor()
+        self.poll()
+        self.assertFalse(self.hardware.safety.tripped)
+        self.assertEqual(self.device.heaterDutyState, 0x80)
+
+
+if __name__ == '__main__':
+    unittest.main()
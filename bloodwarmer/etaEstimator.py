@@ -0,0 +1,132 @@
+#imports
+import math
+
+#----------------Constants-----------------------#
+
+#Time between the temperatures a warming rate is taken from (s), the filtered average still carries
+#a little sensor noise that a shorter spacing would turn into rate noise
+RATE_SPACING = 5.0
+#Fit memory: weight of a rate falls to 1/e after this long (s)
+FIT_HORIZON = 120.0
+#Rates needed before an estimate is given
+MIN_RATES = 4
+#Slowest warming rate an estimate is given for (C/s)
+MIN_RATE = 0.0005
+#Longest estimate given (s)
+MAX_ETA = 4*3600.0
+#Confidence interval width in standard errors (about 95%)
+CONFIDENCE_Z = 2.0
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Online estimate of the time a warming bag takes to reach a
+                    target temperature.  The bag warms like a body heated
+                    towards an equilibrium temperature, dT/dt = a + b*T
+                    (b = -1/tau, equilibrium -a/b), which is a straight line in
+                    (T, dT/dt).  Every RATE_SPACING s a warming rate is taken
+                    from the filtered temperature and added to an exponentially
+                    weighted least squares fit of that line, kept as running
+                    sums so a sample costs the same however long the warm up.
+                    The fit is solved for the time to the target: exponential
+                    if the equilibrium lies above the target, linear at the
+                    current rate otherwise.  The spread of the rates about the
+                    line gives the error of the predicted rate, and so the
+                    margin of the estimate
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created incremental warming fit, time to target and margin
+----------------------------------------------------------------------------"""
+class etaEstimator(object):
+
+    def __init__(self, spacing = RATE_SPACING, horizon = FIT_HORIZON):
+        self._spacing = spacing
+        self._horizon = horizon
+        self.reset()
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Forgets the fit, for a new warm up
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def reset(self):
+        self._anchor = None
+        self._temp = None
+        self.rates = 0
+        #Weighted sums of 1, T, r, T*T, T*r and r*r, T the temperature and r the rate
+        self._sw = self._sx = self._sy = self._sxx = self._sxy = self._syy = 0.0
+        #Sum of squared weights, for the effective number of rates
+        self._sw2 = 0.0
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Adds a filtered temperature, a rate is added to the fit once RATE_SPACING has passed
+         Inputs: t - sample time (s), temp - filtered bag temperature (C)
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def addTemp(self, t, temp):
+        self._temp = temp
+        if self._anchor is None:
+            self._anchor = (t, temp)
+            return
+        t0, temp0 = self._anchor
+        dt = t - t0
+        if dt < self._spacing:
+            return
+        if dt > 3*self._spacing:
+            #Gap in the samples (stopped, link down), the rate across it means nothing
+            self._anchor = (t, temp)
+            return
+        self._anchor = (t, temp)
+        x = (temp + temp0)/2
+        y = (temp - temp0)/dt
+        decay = math.exp(-dt/self._horizon)
+        self._sw = self._sw*decay + 1.0
+        self._sw2 = self._sw2*decay*decay + 1.0
+        self._sx = self._sx*decay + x
+        self._sy = self._sy*decay + y
+        self._sxx = self._sxx*decay + x*x
+        self._sxy = self._sxy*decay + x*y
+        self._syy = self._syy*decay + y*y
+        self.rates += 1
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Time until the bag reaches a temperature
+         Inputs: target - temperature (C)
+        Outputs: (eta, margin) in s, margin is the half width of the confidence interval.  (0, 0) if the bag
+                 is already there, (None, None) while there are too few rates or the bag is not warming
+    -------------------------------------------------------------------------------------------------------"""
+    def timeTo(self, target):
+        temp = self._temp
+        if temp is None:
+            return None, None
+        if temp >= target:
+            return 0.0, 0.0
+        if self.rates < MIN_RATES:
+            return None, None
+        sw = self._sw
+        meanX = self._sx/sw
+        meanY = self._sy/sw
+        varX = self._sxx - sw*meanX*meanX
+        covXY = self._sxy - sw*meanX*meanY
+        #All rates taken at one temperature: only the mean rate is known
+        b = covXY/varX if varX > 1e-9 else 0.0
+        a = meanY - b*meanX
+        rate = a + b*temp
+        if rate < MIN_RATE:
+            return None, None
+        if b < 0 and -a/b > target:
+            #Exponential approach to the equilibrium temperature
+            equilibrium = -a/b
+            eta = math.log((equilibrium - temp)/(equilibrium - target))/-b
+        else:
+            eta = (target - temp)/rate
+        if eta > MAX_ETA:
+            return None, None
+        #Standard error of the rate predicted at the current temperature
+        effective = sw*sw/self._sw2
+        residual = max(0.0, self._syy - sw*meanY*meanY - b*covXY)/sw*effective/max(1.0, effective - 2)
+        leverage = 1.0/effective + ((temp - meanX)**2/(varX/sw*effective) if varX > 1e-9 else 0.0)
+        rateError = math.sqrt(residual*leverage)
+        return eta, min(MAX_ETA, eta*CONFIDENCE_Z*rateError/rate)
+
+#-----------------------------------------------------------------------#
@@ -0,0 +1,719 @@
+#imports
+import os
+import math
+import time
+import errno
+import fcntl
+import select
+import termios
+import logging
+import collections
+import protocolV1
+import protocolV2
+import statusDelta
+import linkSupervisor
+from protocolV1 import BEGIN, END
+from protocolV2 import PROTOCOL_V1, PROTOCOL_V2, VERSION_REQUEST, DELIMITER
+from unitControl import unitControl, SETPOINT_BAND, INCUBATION_TIME_SECONDS
+from sensorHealth import PROBE_NAMES, GRADE_NAMES
+from alarmEngine import alarmEngine, POPUP, STOP, DOOR
+
+#----------------Constants-----------------------#
+
+#Communication control characters
+ACK = 0x06 #Acknowledge packet
+NACK = 0x15 #No acknowledge packet
+
+#--------------------Commands--------------------#
+STATUS_REQUEST = 0x07 #Returns status of all hardware
+HEATER_DUTY_SET = 0x0B
+SUBSCRIBE = 0x0E
+STATUS_ENCODING = 0x0F
+STREAM_STATUS = 0x11
+STREAM_DELTA = 0x12
+STATUS_LENGTH = 29
+STREAM_SEQ_INDEX = 29
+STREAM_KEY_INDEX = 30
+DELTA_HEADER = 3
+
+#-----------Serial port config values------------#
+BAUD_RATE = termios.B19200
+#Most bytes read from one unit per wakeup, a babbling link can't starve the others
+READ_CHUNK = 512
+#Received bytes kept without a complete frame before they are dropped as noise
+MAX_RX_BUFFER = 1024
+
+#-----------Unit control-------------------------#
+#Control period of every unit (s), units are staggered across the period.  Control law, set temp band and
+#incubation time are the single unit controller's (unitControl)
+FLEET_TICK = 0.030
+
+#-----------Link supervision---------------------#
+STREAM_PERIOD = 25
+KEYFRAME_INTERVAL = 40
+#Time without a status frame before the link is brought up again (s)
+STREAM_TIMEOUT = 0.2
+#Time to wait for the answer to a handshake or subscribe (s)
+HANDSHAKE_TIMEOUT = 0.1
+#Time before a command is sent again while the reported output still differs (s)
+RESEND_INTERVAL = 0.1
+#Jitter samples kept per unit
+JITTER_SAMPLES = 10000
+#Time between attempts to open a port again after it hung up (s)
+PORT_RETRY = 1.0
+
+#Link states
+LINK_DOWN = 0
+HANDSHAKE = 1
+SUBSCRIBING = 2
+LINK_UP = 3
+
+#Unit states, same values as controller.systemUpdate
+IDLE = 0
+HEATING = 1
+INCUBATING = 2
+COMPLETE = 3
+
+#Shared fleet log
+FLEET_LOGFILE = '/home/pi/Downloads/fleet.log'
+#------------------------------------------------#
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Opens a serial port for the fleet loop: raw, non-blocking
+     Inputs: path - tty device, baud - termios speed constant
+    Outputs: File descriptor
+-------------------------------------------------------------------------------------------------------"""
+def openPort(path, baud = BAUD_RATE):
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    configurePort(fd, baud)
+    return fd
+
+
+def configurePort(fd, baud = BAUD_RATE):
+    attrs = termios.tcgetattr(fd)
+    #Raw 8N1, no flow control
+    attrs[0] = 0
+    attrs[1] = 0
+    attrs[2] = termios.CS8 | termios.CREAD | termios.CLOCAL
+    attrs[3] = 0
+    attrs[4] = baud
+    attrs[5] = baud
+    attrs[6][termios.VMIN] = 0
+    attrs[6][termios.VTIME] = 0
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+    fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+
+
+"""----------------------------------------------------------------------------
+ Class Description: One warmer driven by the fleet host: its serial link as a
+                    non-blocking state machine plus the heater control of the
+                    single unit controller.  Nothing in here waits on the port,
+                    bytes are fed in by the fleet loop when the descriptor is
+                    readable.  Status is streamed by the Atmega (polled on
+                    firmware without streaming) and commands are not waited
+                    for: the heater duty is sent again while the reported duty
+                    differs from the desired one, as outputReconciler does.
+                    Every status frame goes through the same protections as the
+                    single unit (unitControl: door interlock, probe health,
+                    thermal protection), the unit is the link they send the
+                    heater off on, and the alarm rules run every tick, raised
+                    alarms go to the fleet log
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created non-blocking link, handshake, stream parsing, heater
+                    control and tick jitter statistics
+            -1.0.1: Status checked by the shared unit protections, alarm rules
+                    stop the unit, heater law shared with the controller
+            -1.0.2: Link down while the port is closed after a hangup, reopened
+                    by the fleet host
+----------------------------------------------------------------------------"""
+class fleetUnit(object):
+
+    def __init__(self, name, fd, setTemp = 37.0, logger = None, telemetry = None):
+        self.name = name
+        self.fd = fd
+        #tty device the port is opened from again after a hangup, None if the port can't be reopened
+        self.path = None
+        self.portLostTime = None
+        self.setTemp = setTemp
+        self._logger = logger or logging.getLogger('fleetHost')
+        #telemetry(unit, time) is called after every tick with a new status
+        self._telemetry = telemetry
+        #Link
+        self.protocol = PROTOCOL_V1
+        self.linkState = LINK_DOWN
+        self.polling = False
+        self._rx = bytearray()
+        self._tx = bytearray()
+        self._linkAttempt = 0
+        self._connectAttempts = 0
+        self._expectedSeq = None
+        self._keyframe = None
+        self._keyId = None
+        self._keyframeNeeded = False
+        self._lastKeyframeRequest = 0
+        #Reported hardware state
+        self.lastRxTime = None
+        self.doorSwitch = 1
+        self.bagTemp = 0.0
+        self.sensorState = 0
+        self.heaterDutyState = None
+        self._updated = False
+        #Protections, the safety monitor filters every command sent through send
+        self.cmdFilter = None
+        self.unit = unitControl(self, doorPin = None)
+        self.unit.setTemp = setTemp
+        self.unit.safety.doorOpened.connect(self.doorOpened)
+        self.unit.thermal.tripped.connect(self.thermalTripped)
+        self.unit.thermal.overshootHold.connect(self.overshootHold)
+        self.alarms = alarmEngine()
+        #Control
+        self.state = IDLE
+        self.fault = None
+        self.desiredHeater = 0
+        self._lastHeaterSend = 0
+        self._incStart = None
+        self.incTime = 0.0
+        #Tick schedule and jitter (s)
+        self.nextTick = None
+        self.ticks = 0
+        self.jitterSum = 0.0
+        self.jitterMax = 0.0
+        self.jitter = collections.deque(maxlen = JITTER_SAMPLES)
+        #Statistics
+        self.frames = 0
+        self.corruptFrames = 0
+        self.nacks = 0
+        self.streamLost = 0
+        self.reconnects = 0
+        self.bytesRead = 0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Brings the link up and starts heating to the set temperature
+         Inputs: now, firstTick - time of the first control tick
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def start(self, now, firstTick):
+        self.nextTick = firstTick
+        self.state = HEATING
+        self.fault = None
+        self.unit.setTemp = self.setTemp
+        self.unit.arm()
+        #Starting again acknowledges latched alarms
+        self.reportAlarms(self.alarms.acknowledge())
+        self.connect(now)
+
+    def stop(self):
+        self.state = IDLE
+        self.desiredHeater = 0
+        self.unit.disarm()
+        self.send(bytearray([HEATER_DUTY_SET, 0]))
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Sends a command, the link the unit protections send on
+         Inputs: cmd (bytearray) - [cmdType, cmdValue]
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def sendCmd(self, cmd):
+        self.send(cmd)
+
+    @property
+    def wantsWrite(self):
+        return len(self._tx) > 0
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Reads what the port has and handles every complete frame
+         Inputs: now
+        Outputs: False if the port hung up: a readable port with nothing to read, or EIO
+    -------------------------------------------------------------------------------------------------------"""
+    def receive(self, now):
+        try:
+            data = os.read(self.fd, READ_CHUNK)
+        except OSError as e:
+            if e.errno in (errno.EAGAIN, errno.EINTR):
+                return True
+            if e.errno == errno.EIO:
+                return False
+            raise
+        if not data:
+            return False
+        self.bytesRead += len(data)
+        self._rx += data
+        payload = self.popFrame()
+        while payload is not False:
+            self.handleFrame(payload, now)
+            payload = self.popFrame()
+        if len(self._rx) > MAX_RX_BUFFER:
+            del self._rx[:]
+        return True
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Writes as much of the pending output as the port takes
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def flushTx(self):
+        #Port closed after a hangup, nothing goes out until it is reopened
+        if self.fd is None:
+            return
+        try:
+            written = os.write(self.fd, bytes(self._tx))
+        except OSError as e:
+            #A hung up port is reported by the next poll
+            if e.errno in (errno.EAGAIN, errno.EINTR, errno.EIO):
+                return
+            raise
+        del self._tx[:written]
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: The port hung up and was closed by the fleet host: the link is down, the heater is
+                 treated as off and nothing is sent until the port is reopened
+         Inputs: now
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def portLost(self, now):
+        self._logger.warning('%s: port hung up, link down' % self.name)
+        self.fd = None
+        self.portLostTime = now
+        self.linkState = LINK_DOWN
+        self.polling = False
+        self.heaterDutyState = None
+        del self._rx[:]
+        del self._tx[:]
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: The port was opened again after a hangup, the link is brought up again if the unit is running
+         Inputs: fd - open non-blocking port, now
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def portOpened(self, fd, now):
+        self._logger.info('%s: port reopened' % self.name)
+        self.fd = fd
+        self.portLostTime = None
+        self.reconnects += 1
+        self._connectAttempts = 0
+        if self.state != IDLE:
+            self.connect(now)
+
+    def retryPort(self, now):
+        return self.fd is None and self.path is not None and now - self.portLostTime > PORT_RETRY
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Control tick: link supervision, heater control and telemetry
+         Inputs: now
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def tick(self, now):
+        jitter = now - self.nextTick
+        self.ticks += 1
+        self.jitterSum += jitter
+        self.jitterMax = max(self.jitterMax, jitter)
+        self.jitter.append(jitter)
+        self.nextTick += FLEET_TICK
+        #Fell more than a period behind, skip the missed ticks
+        if self.nextTick < now:
+            self.nextTick = now + FLEET_TICK
+        self.supervise(now)
+        if self.linkState == LINK_UP and self.polling:
+            self.send(bytearray([STATUS_REQUEST, 0x00]))
+        self.control(now)
+        #Alarms on the state after this tick's control
+        self.reportAlarms(self.alarms.evaluate(self.alarmInputs(), now))
+        if self._updated:
+            self._updated = False
+            if self._telemetry is not None:
+                self._telemetry(self, now)
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Starts the link over.  Attempts alternate between the version handshake in v1 framing
+                 (the Atmega was reset) and subscribing in v2 framing (it still speaks v2)
+         Inputs: now
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def connect(self, now):
+        self._connectAttempts += 1
+        self._linkAttempt = now
+        self._expectedSeq = None
+        self._keyframe = None
+        del self._rx[:]
+        if self._connectAttempts % 2:
+            self.protocol = PROTOCOL_V1
+            self.linkState = HANDSHAKE
+            self.send(bytearray([VERSION_REQUEST, PROTOCOL_V2]))
+        else:
+            self.protocol = PROTOCOL_V2
+            self._tx += bytearray([DELIMITER])
+            self.subscribe(now)
+
+    def subscribe(self, now):
+        self._linkAttempt = now
+        self.linkState = SUBSCRIBING
+        self.send(bytearray([SUBSCRIBE, STREAM_PERIOD]))
+
+    def supervise(self, now):
+        if self.linkState in (HANDSHAKE, SUBSCRIBING):
+            if now - self._linkAttempt > HANDSHAKE_TIMEOUT:
+                self.connect(now)
+        elif self.linkState == LINK_UP and now - self.lastRxTime > STREAM_TIMEOUT:
+            self._logger.warning('%s: link stalled, reconnecting' % self.name)
+            self.reconnects += 1
+            self._connectAttempts = 0
+            self.polling = False
+            self.connect(now)
+        elif self._keyframeNeeded and now - self._lastKeyframeRequest > STREAM_TIMEOUT:
+            self._lastKeyframeRequest = now
+            self.send(bytearray([STATUS_ENCODING, KEYFRAME_INTERVAL]))
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Heater control, same law as the controller: proportional to the error below the set
+                 temperature, off with the door open, on a fault or without a link.  Heater commands still go
+                 through the safety monitor, forced off while it is tripped or holding
+         Inputs: now
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def control(self, now):
+        desired = 0
+        if self.state in (HEATING, INCUBATING, COMPLETE) and self.fault is None and self.linkState == LINK_UP \
+           and self.doorSwitch:
+            error = max(0.0, self.setTemp - self.bagTemp)
+            if error <= SETPOINT_BAND and self.state == HEATING:
+                self.state = INCUBATING
+                self._incStart = now - self.incTime
+                self._logger.info('%s: incubating' % self.name)
+            elif error > SETPOINT_BAND and self.state == INCUBATING:
+                self.state = HEATING
+                self.incTime = 0.0
+                self._logger.info('%s: heating' % self.name)
+            if self.state in (INCUBATING, COMPLETE):
+                self.incTime = now - self._incStart
+                if self.incTime >= INCUBATION_TIME_SECONDS and self.state == INCUBATING:
+                    self.state = COMPLETE
+                    self._logger.info('%s: complete' % self.name)
+            desired = self.unit.heaterDuty(self.setTemp)
+        self.desiredHeater = desired
+        if self.linkState == LINK_UP and self.heaterDutyState != desired and \
+           now - self._lastHeaterSend > RESEND_INTERVAL:
+            self._lastHeaterSend = now
+            self.send(bytearray([HEATER_DUTY_SET, desired]))
+
+    def send(self, payload):
+        if self.cmdFilter is not None:
+            payload = self.cmdFilter(payload)
+        if self.protocol == PROTOCOL_V2:
+            self._tx += protocolV2.encodeFrame(payload)
+        else:
+            self._tx += protocolV1.encodeFrame(payload)
+        self.flushTx()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Takes the next complete frame off the receive buffer and checks it
+         Inputs: None
+        Outputs: Payload, None for a corrupt frame, False if no complete frame has been received
+    -------------------------------------------------------------------------------------------------------"""
+    def popFrame(self):
+        buf = self._rx
+        if self.protocol == PROTOCOL_V2:
+            end = buf.find(bytearray([DELIMITER]))
+            if end < 0:
+                return False
+            frame = buf[:end + 1]
+            del buf[:end + 1]
+            if end == 0:
+                return self.popFrame()
+            return protocolV2.decodeFrame(frame)
+        start = buf.find(bytearray([BEGIN]))
+        if start < 0:
+            del buf[:]
+            return False
+        end = buf.find(bytearray([END]), start)
+        if end < 0:
+            del buf[:start]
+            return False
+        start = buf.rfind(bytearray([BEGIN]), start, end)
+        frame = buf[start + 1:end]
+        del buf[:end + 1]
+        return protocolV1.decodeFrame(frame)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Handles a received frame: handshake and subscribe answers, stream frames and command
+                 responses (both carry the full status)
+         Inputs: payload - from popFrame, now
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def handleFrame(self, payload, now):
+        if not payload:
+            self.corruptFrames += 1
+            return
+        self.frames += 1
+        kind = payload[0]
+        if self.linkState == HANDSHAKE:
+            if kind == ACK and len(payload) >= 2 and payload[1] == PROTOCOL_V2:
+                self.protocol = PROTOCOL_V2
+                self.subscribe(now)
+            elif kind == NACK:
+                #Firmware without v2
+                self.subscribe(now)
+            return
+        if kind == NACK:
+            self.nacks += 1
+            if self.linkState == SUBSCRIBING:
+                #Firmware without streaming, status is polled every tick
+                self.polling = True
+                self.linkUp(now)
+            return
+        if self.linkState == SUBSCRIBING and kind == ACK:
+            self.linkUp(now)
+            self.send(bytearray([STATUS_ENCODING, KEYFRAME_INTERVAL]))
+        if kind == STREAM_DELTA:
+            payload = self.expandDelta(payload)
+            if payload is None:
+                return
+        elif kind == STREAM_STATUS and len(payload) > STREAM_KEY_INDEX:
+            self._keyframe = payload[:STREAM_SEQ_INDEX]
+            self._keyId = payload[STREAM_KEY_INDEX]
+            self._keyframeNeeded = False
+        elif kind != STREAM_STATUS and kind != ACK:
+            return
+        if len(payload) < STATUS_LENGTH:
+            return
+        if payload[0] == STREAM_STATUS and len(payload) > STREAM_SEQ_INDEX:
+            seq = payload[STREAM_SEQ_INDEX]
+            if self._expectedSeq is not None:
+                self.streamLost += (seq - self._expectedSeq) & 0xFF
+            self._expectedSeq = (seq + 1) & 0xFF
+        self.parseStatus(payload, now)
+
+    def linkUp(self, now):
+        self.linkState = LINK_UP
+        self.lastRxTime = now
+        self._connectAttempts = 0
+        self._logger.info('%s: link up, protocol v%d%s' % (self.name, self.protocol,
+                                                            ', polled' if self.polling else ''))
+
+    def expandDelta(self, payload):
+        status = None
+        if len(payload) >= DELTA_HEADER and self._keyframe is not None and payload[2] == self._keyId:
+            status = statusDelta.decodeDelta(self._keyframe, payload[DELTA_HEADER:])
+        if status is None:
+            self._keyframeNeeded = True
+            return None
+        status[0] = STREAM_STATUS
+        status.append(payload[1])
+        return status
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Updates the reported state from a status packet after the unit protections have checked it
+         Inputs: status - full status packet, now
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def parseStatus(self, status, now):
+        self.lastRxTime = now
+        self._updated = True
+        self.doorSwitch = status[7]
+        self.sensorState = self.unit.checkStatus(status, now)
+        for probe, grade, reason in self.unit.health.changes:
+            self._logger.warning('%s: %s %s - %s' % (self.name, PROBE_NAMES[probe], GRADE_NAMES[grade], reason))
+        self.bagTemp = self.unit.bagTemp
+        self.heaterDutyState = status[27]
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Alarm rule inputs, in alarmEngine.ALARM_INPUTS order
+         Inputs: None
+        Outputs: Tuple of inputs
+    -------------------------------------------------------------------------------------------------------"""
+    def alarmInputs(self):
+        return (self.bagTemp - self.setTemp, self.setTemp - self.bagTemp, not self.doorSwitch, self.sensorState,
+                linkSupervisor.LINK_OK if self.linkState == LINK_UP else linkSupervisor.LINK_DOWN,
+                self.state != IDLE, self.state in (INCUBATING, COMPLETE),
+                self.incTime - INCUBATION_TIME_SECONDS if self.state == COMPLETE else 0.0)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Logs raised and cleared alarms, a stopping alarm stops the unit
+         Inputs: changes - (rule index, raised) from the alarm engine
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def reportAlarms(self, changes):
+        for index, raised in changes:
+            rule = self.alarms.rules[index]
+            if not raised:
+                self._logger.info('%s: %s cleared' % (self.name, rule['name']))
+                continue
+            action = rule['action']
+            if action in (STOP, DOOR):
+                self._logger.error('%s: %s' % (self.name, rule['name']))
+                if self.state != IDLE:
+                    self.fault = rule['name']
+                    self.stop()
+            elif action == POPUP:
+                self._logger.error('%s: %s' % (self.name, rule['name']))
+            else:
+                self._logger.warning('%s: %s' % (self.name, rule['name']))
+
+    def doorOpened(self):
+        if self.state != IDLE:
+            self._logger.error('%s: door opened, heater off' % self.name)
+            self.fault = 'Door open'
+            self.stop()
+
+    def thermalTripped(self, reason):
+        self._logger.error('%s: over temperature, %s' % (self.name, reason))
+        self.fault = 'Over temperature'
+        if self.state != IDLE:
+            self.stop()
+
+    def overshootHold(self, held):
+        self._logger.info('%s: %s' % (self.name, 'heater held off for predicted overshoot' if held else
+                                                 'heater hold released'))
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Drives many warmers from one process.  A single poll()
+                    loop waits on every unit's serial port and on the next
+                    control tick, units tick on their own schedule staggered
+                    across the control period.  No call blocks on a port, so
+                    a stalled or babbling link only costs its own unit.  Units
+                    share one logger and one telemetry callback
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created poll loop, staggered unit ticks and fleet statistics
+            -1.0.1: Hung up ports closed and taken off the poller instead of
+                    polled in a loop, reopened every PORT_RETRY
+----------------------------------------------------------------------------"""
+class fleetHost(object):
+
+    def __init__(self, tick = FLEET_TICK, logFile = FLEET_LOGFILE, telemetry = None):
+        self._tick = tick
+        self._telemetry = telemetry
+        self.logger = logging.getLogger('fleetHost')
+        if logFile is not None and not self.logger.handlers:
+            hdlr = logging.FileHandler(logFile)
+            hdlr.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+            self.logger.addHandler(hdlr)
+            self.logger.setLevel(logging.INFO)
+        self.units = []
+        self._byFd = {}
+        self._poller = select.poll()
+        self._running = False
+        self.loops = 0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Adds a unit on an open non-blocking port
+         Inputs: name, fd, setTemp (C), path - tty device to reopen the port from after a hangup, None leaves
+                 the unit down once its port hangs up
+        Outputs: fleetUnit
+    -------------------------------------------------------------------------------------------------------"""
+    def addUnit(self, name, fd, setTemp = 37.0, path = None):
+        unit = fleetUnit(name, fd, setTemp, self.logger, self._telemetry)
+        unit.path = path
+        self.units.append(unit)
+        self._byFd[fd] = unit
+        self._poller.register(fd, select.POLLIN)
+        return unit
+
+    def addPort(self, path, setTemp = 37.0):
+        return self.addUnit(path, openPort(path), setTemp, path)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Starts every unit and runs the loop
+         Inputs: duration - seconds to run, None runs until stop()
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def run(self, duration = None):
+        now = time.time()
+        end = None if duration is None else now + duration
+        for i, unit in enumerate(self.units):
+            unit.start(now, now + self._tick*(i + 1)/len(self.units))
+        self._running = True
+        while self._running and (end is None or now < end):
+            self.runOnce()
+            now = time.time()
+        for unit in self.units:
+            unit.stop()
+
+    def stop(self):
+        self._running = False
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: One loop pass: waits for port activity or the next tick, handles both
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def runOnce(self):
+        self.loops += 1
+        for unit in self.units:
+            if unit.fd is not None:
+                self._poller.modify(unit.fd, select.POLLIN | (select.POLLOUT if unit.wantsWrite else 0))
+        nextTick = min(unit.nextTick for unit in self.units)
+        timeout = max(0, int(math.ceil((nextTick - time.time())*1000)))
+        try:
+            events = self._poller.poll(timeout)
+        except select.error as e:
+            if e.args[0] != errno.EINTR:
+                raise
+            events = []
+        now = time.time()
+        for fd, event in events:
+            unit = self._byFd[fd]
+            #Data still buffered before a hangup is read first
+            if event & select.POLLIN and not unit.receive(now):
+                self.closePort(unit, now)
+            elif event & (select.POLLHUP | select.POLLERR | select.POLLNVAL):
+                self.closePort(unit, now)
+            elif event & select.POLLOUT:
+                unit.flushTx()
+        now = time.time()
+        for unit in self.units:
+            if unit.retryPort(now):
+                self.reopenPort(unit, now)
+            if unit.nextTick <= now:
+                unit.tick(now)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Tick jitter of every unit
+         Inputs: None
+        Outputs: dict of unit name to (ticks, mean, p99, max) in s
+    -------------------------------------------------------------------------------------------------------"""
+    def jitterStats(self):
+        stats = {}
+        for unit in self.units:
+            samples = sorted(unit.jitter)
+            if not samples:
+                continue
+            stats[unit.name] = (unit.ticks, unit.jitterSum/unit.ticks,
+                                samples[min(len(samples) - 1, int(len(samples)*0.99))], unit.jitterMax)
+        return stats
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Takes a hung up port off the poller and closes it, a hung up tty stays readable and would
+                 wake the loop on every pass
+         Inputs: unit, now
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def closePort(self, unit, now):
+        self._poller.unregister(unit.fd)
+        del self._byFd[unit.fd]
+        try:
+            os.close(unit.fd)
+        except OSError:
+            pass
+        unit.portLost(now)
+
+    def reopenPort(self, unit, now):
+        try:
+            fd = openPort(unit.path)
+        except (OSError, termios.error):
+            unit.portLostTime = now
+            return
+        self._byFd[fd] = unit
+        self._poller.register(fd, select.POLLIN)
+        unit.portOpened(fd, now)
+
+#-----------------------------------------------------------------------#
@@ -1,11 +1,17 @@
 
 #imports
 import math
-import struct
+import time
 from PyQt4 import QtCore
 from arduinoComm import arduinoComm
+from linkSupervisor import linkSupervisor
+from statusBus import statusBusWriter
+from sensorHealth import PROBE_NAMES, FAULT
+from unitControl import unitControl
 
 NACK = 0x15 #No acknowledge packet
+#Length of a complete status packet
+STATUS_LENGTH = 29
 
 #--------------------Commands--------------------#
 STATUS_REQUEST = 0x07 #Returns status of all hardware
@@ -53,11 +59,10 @@ Command values correspond to the following frequencies:
 """
 FREQ_SET = 0x0C
 
-#--------Temp Sensor calibration offsets---------#
-BAG11_CAL = -0.1
-BAG12_CAL = -0.2
-BAG21_CAL = -0.1
-BAG22_CAL = -0.2
+#Default status stream period (ms), the controller streams at the adaptive poll period instead
+STREAM_PERIOD = 25
+#Stream keyframe interval in frames, delta frames in between.  0 streams full frames
+KEYFRAME_INTERVAL = 40
 #------------------------------------------------#
 
 
@@ -78,16 +83,47 @@ BAG22_CAL = -0.2
                     sendCmd requests and all commands will execute at a fixed interval,
                     fixed bug in commands
 			-1.0.4: Reconfigured to run in controller
+            -1.0.5: Added safety monitor, door state is checked on frame receipt
+                    before the rest of the packet is parsed
+            -1.0.6: Added link supervisor, checked after every transaction, ignore
+                    truncated status packets
+            -1.0.7: Added fanPowerState property
+            -1.0.8: Publish every parsed status frame to the shared memory status bus
+            -1.0.9: Added status streaming, pollStream parses the frames the
+                    Atmega pushed since the last poll
+            -1.0.10: Stream uses compact delta frames when the firmware has them
+            -1.0.11: Probe readings graded by the sensor health engine instead of
+                     the negative reading check, faulted probes left out of the
+                     bag temperatures
+            -1.0.12: Over temperature protection checked on every parsed frame
+            -1.0.13: Sensor faults reported through sensorState for the alarm rules
+                     instead of a systemError from the parser
+            -1.0.14: Door interlock, probe health, bag temperatures and thermal
+                     protection moved to unitControl, shared with fleet units
+            -1.0.15: setStreamPeriod changes the rate of a running stream
 ----------------------------------------------------------------------------"""
 class hardwareState(QtCore.QObject):
 
-    #Signal to notify controller of status update
-    systemError = QtCore.pyqtSignal()
+    #System failure: text shown in the error popup
+    systemError = QtCore.pyqtSignal(str)
+    #Probe health grade changed: grade, description
+    sensorWarning = QtCore.pyqtSignal(int, str)
     
-    def __init__(self, runCmd = 0, cmdType = STATUS_REQUEST, cmdValue = 0x00, checksum = 0x00, upSwitch = 0x00, downSwitch = 0x00, selectSwitch = 0x00, backSwitch = 0x00, pressureSwitch1 = 0x00, pressureSwitch2 = 0x00, doorSwitch = 0x00, bag1TempC = 0.0, bag2TempC = 0.0, bagTempAvg = 0.0, pwmFrequency = 0x00, motorDutyState = 0x00, fanPowerState = 0x01, fanDutyState = 0x00, heaterDutyState = 0x00):
+    def __init__(self, runCmd = 0, cmdType = STATUS_REQUEST, cmdValue = 0x00, checksum = 0x00, upSwitch = 0x00, downSwitch = 0x00, selectSwitch = 0x00, backSwitch = 0x00, pressureSwitch1 = 0x00, pressureSwitch2 = 0x00, doorSwitch = 0x00, bag1TempC = 0.0, bag2TempC = 0.0, bagTempAvg = 0.0, pwmFrequency = 0x00, motorDutyState = 0x00, fanPowerState = 0x01, fanDutyState = 0x00, heaterDutyState = 0x00, comm = None):
         super(self.__class__, self).__init__()
         #Initialize hardware properties
-        self._serial = arduinoComm()
+        if comm is None:
+            comm = arduinoComm()
+        self._serial = comm
+        #Door interlock, probe health and thermal protection, shared with fleet units
+        self.unit = unitControl(self._serial)
+        self.safety = self.unit.safety
+        self.health = self.unit.health
+        self.thermal = self.unit.thermal
+        #Serial link watchdog
+        self.link = linkSupervisor(self._serial)
+        #Overall probe health grade of the last frame
+        self.sensorState = 0
         self._runCmd = runCmd
         self._cmdType = cmdType
         self._cmdValue = cmdValue
@@ -99,8 +135,6 @@ class hardwareState(QtCore.QObject):
         self._pressureSwitch1 = pressureSwitch1
         self._pressureSwitch2 = pressureSwitch2
         self._doorSwitch = doorSwitch
-        self._bag1Readings = []
-        self._bag2Readings = []
         self._bag1TempC = bag1TempC
         self._bag2TempC = bag2TempC
         self._bagTempAvg = bagTempAvg
@@ -109,6 +143,11 @@ class hardwareState(QtCore.QObject):
         self._fanPowerState = fanPowerState
         self._fanDutyState = fanDutyState
         self._heaterDutyState = heaterDutyState
+        #Shared memory snapshot for out of process readers, status is still parsed if it can't be created
+        try:
+            self._bus = statusBusWriter()
+        except (IOError, OSError):
+            self._bus = None
 
 
     """-------------------------------------------------------------------------------------------------------
@@ -118,18 +157,64 @@ class hardwareState(QtCore.QObject):
     -------------------------------------------------------------------------------------------------------"""
     def sendCmd(self,cmd):
         response = self._serial.sendCmd(cmd)
-        return self.parseStatus(response,cmd)
+        rxTime = time.time()
+        self.link.check()
+        return self.parseStatus(response,cmd,rxTime)
         
 
+    """-------------------------------------------------------------------------------------------------------
+    Description: Asks the Atmega to push status frames instead of being polled
+         Inputs: period - stream period (ms), keyframeInterval - frames per keyframe, 0 for full frames
+        Outputs: True if streaming, False if the firmware only answers polls
+    -------------------------------------------------------------------------------------------------------"""
+    def startStream(self, period = STREAM_PERIOD, keyframeInterval = KEYFRAME_INTERVAL):
+        if not self._serial.subscribe(period):
+            return False
+        #Firmware without compact frames keeps streaming full frames
+        if keyframeInterval:
+            self._serial.compactStatus(keyframeInterval)
+        return True
+
+    def stopStream(self):
+        self._serial.subscribe(0)
+
+    #Changes the rate of a running stream, the sequence and compact frame state carry on
+    def setStreamPeriod(self, period):
+        if period == self._serial.streamPeriod:
+            return True
+        return self._serial.subscribe(period)
+
+    @property
+    def streaming(self):
+        return self._serial.streaming
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Parses the status frames streamed since the last call, oldest first
+         Inputs: None
+        Outputs: Highest parseStatus result (0 no update, 1 updated, 2 sensor fault)
+    -------------------------------------------------------------------------------------------------------"""
+    def pollStream(self):
+        result = 0
+        for status, rxTime in self._serial.readStream():
+            result = max(result, self.parseStatus(status, None, rxTime))
+        self.link.check()
+        return result
+
+
     """-------------------------------------------------------------------------------------------------------
             Description: Parses received hardware status packet into hardware model, notifies controller about update
-                 Inputs: Decoded hardware status packet
+                 Inputs: Decoded hardware status packet, time packet was received
                 Outputs: emits update
     -------------------------------------------------------------------------------------------------------"""
-    def parseStatus(self, status,cmd):
-        if status[0] == NACK:
+    def parseStatus(self, status,cmd,rxTime = None):
+        if status[0] == NACK or len(status) < STATUS_LENGTH:
             return 0;
         else:
+            #Door interlock, probe grading, bag temperatures and thermal protection run before the model is
+            #updated
+            self.sensorState = self.unit.checkStatus(status, rxTime)
+            for probe, grade, reason in self.health.changes:
+                self.sensorWarning.emit(grade, '%s: %s' % (PROBE_NAMES[probe], reason))
             #Update user input
             self._upSwitch = status[1]
             self._downSwitch = status[2]
@@ -139,60 +224,38 @@ class hardwareState(QtCore.QObject):
             self._pressureSwitch1 = status[5]
             self._pressureSwitch2 = status[6]
             self._doorSwitch = status[7]
-            #Unpack and update temperatures
-            newBag11TempC, = struct.unpack("f", bytearray([status[8], status[9], status[10], status[11]]))
-            newBag12TempC, = struct.unpack("f", bytearray([status[12], status[13], status[14], status[15]]))
-            newBag21TempC,= struct.unpack("f", bytearray([status[16], status[17], status[18], status[19]]))
-            newBag22TempC, = struct.unpack("f", bytearray([status[20], status[21], status[22], status[23]]))
-
-            if newBag11TempC < 0 or newBag12TempC < 0 or newBag21TempC < 0 or newBag22TempC < 0:
-                self.systemError.emit("System Failure")
+            #Stop once a bag has no usable probe left
+            if self.sensorState == FAULT:
                 return 2
-
-            #Sensor Calibration
-            newBag11TempC -= BAG11_CAL
-            newBag12TempC -= BAG12_CAL
-            newBag21TempC -= BAG21_CAL
-            newBag22TempC -= BAG22_CAL
-            #Get average reading for each bag
-            newBag11TempC = (newBag11TempC + newBag12TempC)/2
-            newBag21TempC = (newBag21TempC + newBag22TempC)/2
-            #Get average of last 10 readings
-            self._bag1TempC = self.avgTemp(self._bag1Readings, newBag11TempC)
-            self._bag2TempC = self.avgTemp(self._bag2Readings, newBag21TempC)
-            # Ensure both bags are in system ; if one is not included, take the lower temperature
-            if self._bag1TempC - self._bag2TempC > 1:
-                self._bagTempAvg = self._bag2TempC
-
-            if self._bag2TempC - self._bag1TempC > 1:
-                self._bagTempAvg = self._bag1TempC
-            else:
-                self._bagTempAvg = (self._bag1TempC + self._bag2TempC) / 2
+            #Running averages of the bags from their usable probes
+            self._bag1TempC = self.unit.bag1Temp
+            self._bag2TempC = self.unit.bag2Temp
+            self._bagTempAvg = self.unit.bagTemp
+            probeTemps = self.unit.probeTemps
             #Update output status
             self._motorDutyState = status[24]
             self._fanPowerState = status[25]
             self._fanDutyState = status[26]
             self._heaterDutyState = status[27]
             self._pwmFrequency = status[28]
+            self.publishStatus(probeTemps, rxTime)
             return 1;
 
 
     """-------------------------------------------------------------------------------------------------------
-    Description: Calculates and returns a running average of the last ten temperature readings
-         Inputs: tempReadings = List of last 10 readings, newTemp = Latest reading
-        Outputs: avgTemp
+    Description: Publishes the parsed state to the status bus
+         Inputs: probeTemps - calibrated probe temperatures, rxTime - time packet was received
+        Outputs: None
     -------------------------------------------------------------------------------------------------------"""
-    def avgTemp(self, tempReadings, newTemp):
-        tempReadings.insert(0,newTemp)
-        readings = len(tempReadings)
-        avgTemp = 0
-        if (readings > 10):
-            tempReadings.remove(tempReadings[readings-1])
-            readings -= 1
-        for temp in tempReadings:
-            avgTemp += temp
-        avgTemp /= readings
-        return avgTemp
+    def publishStatus(self, probeTemps, rxTime):
+        if self._bus is None:
+            return
+        self._bus.publish((self._upSwitch, self._downSwitch, self._selectSwitch, self._backSwitch,
+                           self._pressureSwitch1, self._pressureSwitch2, self._doorSwitch) + probeTemps +
+                          (self._bag1TempC, self._bag2TempC, self._bagTempAvg,
+                           self._motorDutyState, self._fanPowerState, self._fanDutyState,
+                           self._heaterDutyState, self._pwmFrequency), rxTime)
+
 
 ##----------------------Hardware properties for state access------------------------ 
     @property
@@ -314,6 +377,14 @@ class hardwareState(QtCore.QObject):
     @motorDutyState.setter
     def motorDutyState(self, value):
         self._motorDutyState = value
+
+    @property
+    def fanPowerState(self):
+        return self._fanPowerState
+
+    @fanPowerState.setter
+    def fanPowerState(self, value):
+        self._fanPowerState = value
         
     @property
     def fanDutyState(self): 
@@ -0,0 +1,251 @@
+#imports
+import errno
+import socket
+import struct
+from PyQt4 import QtCore
+
+#----------------Constants-----------------------#
+
+#Messages from the control process to the GUI process: (controller signal name, struct format of arguments)
+CORE_MESSAGES = [('tempUpdate', 'f'),
+                 ('trendUpdate', 'fff'),
+                 ('etaUpdate', 'fff'),
+                 ('doorSafetyWarning', ''),
+                 ('incubationFinishedMessage', ''),
+                 ('systemUpdate', 'B'),
+                 ('upPressed', ''),
+                 ('downPressed', ''),
+                 ('backPressed', ''),
+                 ('selectPressed', ''),
+                 ('startGuiTimer', '?'),
+                 ('stopGuiTimer', ''),
+                 ('systemError', '32p'),
+                 ('resumeAvailable', 'ff')]
+
+#Messages from the GUI process to the control process: (controller slot name, struct format of arguments)
+GUI_MESSAGES = [('updateSetTemp', 'f'),
+                ('systemHandler', '??'),
+                ('enableSaving', ''),
+                ('shutdown', ''),
+                ('resumeHandler', '??')]
+
+#Largest message, one id byte plus arguments
+MAX_MESSAGE_SIZE = 64
+#------------------------------------------------#
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Creates the connected socket pair used between the control and GUI processes.  Sequenced
+             packets keep message boundaries and report a closed peer
+     Inputs: None
+    Outputs: (control process socket, GUI process socket)
+-------------------------------------------------------------------------------------------------------"""
+def bridgeSockets():
+    return socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+
+
+"""----------------------------------------------------------------------------
+ Class Description: One end of the control/GUI channel.  Each message is a
+                    single packet: message id byte followed by the arguments
+                    packed with the format from the message table.  Sends never
+                    block, a message that does not fit in the socket buffer
+                    (GUI not reading) is dropped and counted so the control
+                    process is never held up by the GUI
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created message tables, channel, control and GUI bridges
+            -1.0.1: Added resume messages
+            -1.0.2: Added trend chart temperatures
+            -1.0.3: Added time to set temp and completion estimates
+            -1.0.4: systemError carries its text, sent length prefixed
+----------------------------------------------------------------------------"""
+class ipcChannel(object):
+
+    def __init__(self, sock, sendMessages, receiveMessages):
+        self._sock = sock
+        self._sock.setblocking(False)
+        self._sendIds = dict((name, (msgId, struct.Struct('<' + fmt), len(fmt.strip('0123456789'))))
+                             for msgId, (name, fmt) in enumerate(sendMessages))
+        self._receive = [(name, struct.Struct('<' + fmt)) for name, fmt in receiveMessages]
+        self.closed = False
+        #Statistics
+        self.sent = 0
+        self.received = 0
+        self.dropped = 0
+
+    #--------------------Interface Functions--------------------#
+
+    def fileno(self):
+        return self._sock.fileno()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Sends a message without blocking
+         Inputs: name - message name from the send table, args - message arguments, extra arguments are ignored
+        Outputs: False if the message was dropped
+    -------------------------------------------------------------------------------------------------------"""
+    def send(self, name, *args):
+        if self.closed:
+            return False
+        msgId, packer, argCount = self._sendIds[name]
+        try:
+            self._sock.send(struct.pack('<B', msgId) + packer.pack(*args[:argCount]))
+        except socket.error as e:
+            if e.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                self.closed = True
+            self.dropped += 1
+            return False
+        self.sent += 1
+        return True
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Reads every message waiting on the socket
+         Inputs: None
+        Outputs: List of (name, args), closed is set when the peer has gone away
+    -------------------------------------------------------------------------------------------------------"""
+    def receive(self):
+        messages = []
+        while not self.closed:
+            try:
+                data = self._sock.recv(MAX_MESSAGE_SIZE)
+            except socket.error as e:
+                if e.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    self.closed = True
+                break
+            if not data:
+                self.closed = True
+                break
+            msgId = bytearray(data[:1])[0]
+            if msgId >= len(self._receive):
+                continue
+            name, unpacker = self._receive[msgId]
+            messages.append((name, unpacker.unpack(data[1:])))
+            self.received += 1
+        return messages
+
+    def close(self):
+        self.closed = True
+        self._sock.close()
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Control process end of the bridge.  Forwards the controller
+                    signals to the GUI process and re-emits GUI requests as
+                    signals connected to the controller slots
+----------------------------------------------------------------------------"""
+class coreBridge(QtCore.QObject):
+
+    #GUI requests, same names as the controller slots they drive
+    updateSetTemp = QtCore.pyqtSignal(float)
+    systemHandler = QtCore.pyqtSignal(bool, bool)
+    enableSaving = QtCore.pyqtSignal()
+    shutdown = QtCore.pyqtSignal()
+    resumeHandler = QtCore.pyqtSignal(bool, bool)
+    #GUI process closed its end
+    guiClosed = QtCore.pyqtSignal()
+
+    def __init__(self, sock):
+        super(self.__class__, self).__init__()
+        self.channel = ipcChannel(sock, CORE_MESSAGES, GUI_MESSAGES)
+        self._notifier = QtCore.QSocketNotifier(self.channel.fileno(), QtCore.QSocketNotifier.Read)
+        self._notifier.activated.connect(self.receive)
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Connects the controller to the bridge in both directions
+         Inputs: controller
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def attach(self, controller):
+        for name, fmt in CORE_MESSAGES:
+            if name == 'systemError':
+                #Popup text arrives as a QString, packed as a byte string
+                controller.arduino.systemError.connect(lambda text: self.channel.send('systemError', str(text)))
+            else:
+                getattr(controller, name).connect(self.forwarder(name))
+        self.updateSetTemp.connect(controller.updateSetTemp)
+        self.systemHandler.connect(controller.systemHandler)
+        self.enableSaving.connect(controller.enableSaving)
+        self.resumeHandler.connect(controller.resumeHandler)
+
+    #--------------------Private Functions----------------------#
+
+    def forwarder(self, name):
+        return lambda *args: self.channel.send(name, *args)
+
+    @QtCore.pyqtSlot()
+    def receive(self):
+        for name, args in self.channel.receive():
+            getattr(self, name).emit(*args)
+        if self.channel.closed:
+            self._notifier.setEnabled(False)
+            self.guiClosed.emit()
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: GUI process end of the bridge.  Has the same signals as the
+                    controller so the GUI is wired to it exactly as it was to
+                    the controller, and the controller slots the GUI calls
+----------------------------------------------------------------------------"""
+class guiBridge(QtCore.QObject):
+
+    #Controller signals re-emitted in the GUI process
+    tempUpdate = QtCore.pyqtSignal(float)
+    trendUpdate = QtCore.pyqtSignal(float, float, float)
+    etaUpdate = QtCore.pyqtSignal(float, float, float)
+    doorSafetyWarning = QtCore.pyqtSignal()
+    incubationFinishedMessage = QtCore.pyqtSignal()
+    systemUpdate = QtCore.pyqtSignal(int)
+    upPressed = QtCore.pyqtSignal()
+    downPressed = QtCore.pyqtSignal()
+    backPressed = QtCore.pyqtSignal()
+    selectPressed = QtCore.pyqtSignal()
+    startGuiTimer = QtCore.pyqtSignal(bool)
+    stopGuiTimer = QtCore.pyqtSignal()
+    systemError = QtCore.pyqtSignal(str)
+    resumeAvailable = QtCore.pyqtSignal(float, float)
+    #Control process closed its end
+    coreClosed = QtCore.pyqtSignal()
+
+    def __init__(self, sock):
+        super(self.__class__, self).__init__()
+        self.channel = ipcChannel(sock, GUI_MESSAGES, CORE_MESSAGES)
+        self._notifier = QtCore.QSocketNotifier(self.channel.fileno(), QtCore.QSocketNotifier.Read)
+        self._notifier.activated.connect(self.receive)
+
+    #--------------------Interface Functions--------------------#
+
+    @QtCore.pyqtSlot(float)
+    def updateSetTemp(self, newSetTemp):
+        self.channel.send('updateSetTemp', newSetTemp)
+
+    @QtCore.pyqtSlot(bool, bool)
+    def systemHandler(self, systemState, restart):
+        self.channel.send('systemHandler', systemState, restart)
+
+    @QtCore.pyqtSlot()
+    def enableSaving(self):
+        self.channel.send('enableSaving')
+
+    @QtCore.pyqtSlot()
+    def shutdown(self):
+        self.channel.send('shutdown')
+
+    @QtCore.pyqtSlot(bool, bool)
+    def resumeHandler(self, systemState, restart):
+        self.channel.send('resumeHandler', systemState, restart)
+
+    #--------------------Private Functions----------------------#
+
+    @QtCore.pyqtSlot()
+    def receive(self):
+        for name, args in self.channel.receive():
+            getattr(self, name).emit(*args)
+        if self.channel.closed:
+            self._notifier.setEnabled(False)
+            self.coreClosed.emit()
+
+#-----------------------------------------------------------------------#
@@ -0,0 +1,170 @@
+#imports
+import time
+from PyQt4 import QtCore
+
+#----------------Constants-----------------------#
+
+STATUS_REQUEST = 0x07 #Returns status of all hardware
+NACK = 0x15 #No acknowledge packet
+
+#Failed transactions in a row before the link is considered down
+MAX_CONSECUTIVE_FAILURES = 2
+#Time without a valid frame before the link is considered down (s)
+HEARTBEAT_TIMEOUT = 1.0
+#Minimum time between recovery attempts while the link stays down (s)
+RECOVERY_INTERVAL = 5.0
+#Pulse the Atmega reset pin if reopening the port does not bring the link back
+RESET_ON_RECOVERY = True
+#Reset pulse and boot time used during recovery (s)
+RECOVERY_RESET_PULSE = 0.1
+RECOVERY_BOOT_TIME = 2.0
+
+#Link health states
+LINK_OK = 0
+LINK_DEGRADED = 1
+LINK_DOWN = 2
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Watches the serial link to the Atmega and recovers it after
+                    a glitch.  Tracks heartbeat age and consecutive failures from
+                    the comm link, when the link goes down it reopens the port,
+                    pulses the Atmega reset pin if that is not enough, and
+                    replays the last commanded outputs.  Recovery runs from the
+                    control tick and never blocks it for the reset: the pin is
+                    held, released and the Atmega probed on later ticks once the
+                    pulse and boot time have passed.  Recovery time is bounded
+                    by (2 + outputs) transactions, each limited to MAX_RETRIES + 1
+                    attempts of at most MAX_TIMEOUT, plus reset pulse and boot
+                    time and a tick period for each step
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created heartbeat/failure tracking, recovery sequence and
+                    recovery time measurement
+            -1.0.1: Reset pulse and boot waited out across ticks instead of
+                    blocking the control thread
+----------------------------------------------------------------------------"""
+class linkSupervisor(QtCore.QObject):
+
+    #Signal to report link health: LINK_OK, LINK_DEGRADED or LINK_DOWN
+    linkHealthUpdate = QtCore.pyqtSignal(int)
+
+    def __init__(self, comm, resetOnRecovery = RESET_ON_RECOVERY):
+        super(self.__class__, self).__init__()
+        self._comm = comm
+        self._resetOnRecovery = resetOnRecovery
+        self._state = LINK_OK
+        self._lastRecoveryAttempt = 0
+        #Reset in progress: time to release the reset pin, time the Atmega has booted
+        self._recoveryStart = None
+        self._resetRelease = None
+        self._bootDone = None
+        #Recovery statistics
+        self.recoveries = 0
+        self.failedRecoveries = 0
+        self.lastRecoveryTime = None
+        self.worstRecoveryTime = 0.0
+
+    #--------------------Interface Functions--------------------#
+
+    @property
+    def state(self):
+        return self._state
+
+    @property
+    def recovering(self):
+        return self._resetRelease is not None or self._bootDone is not None
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Time since the last valid frame was received
+         Inputs: None
+        Outputs: Heartbeat age (s)
+    -------------------------------------------------------------------------------------------------------"""
+    def heartbeatAge(self):
+        return time.time() - self._comm.lastRxTime
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Updates link health after a transaction, starts recovery when the link is down
+         Inputs: None
+        Outputs: Link health state
+    -------------------------------------------------------------------------------------------------------"""
+    def check(self):
+        failures = self._comm.consecutiveFailures
+        if self.recovering:
+            #Atmega held in reset or booting, the next recovery step is due
+            self.recover()
+        elif failures == 0:
+            self.setState(LINK_OK)
+        elif failures < MAX_CONSECUTIVE_FAILURES and self.heartbeatAge() < HEARTBEAT_TIMEOUT:
+            self.setState(LINK_DEGRADED)
+        else:
+            self.setState(LINK_DOWN)
+            #Do not stall every tick while the unit is unplugged
+            if time.time() - self._lastRecoveryAttempt >= RECOVERY_INTERVAL:
+                self.recover()
+        return self._state
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Brings the link back one step per call: reopen port and probe, if that fails hold the Atmega
+                 in reset.  Later calls release it once RECOVERY_RESET_PULSE has passed and probe it once
+                 RECOVERY_BOOT_TIME has passed, then replay outputs
+         Inputs: None
+        Outputs: True if the link was recovered, False if recovery failed, None while the reset is in progress
+    -------------------------------------------------------------------------------------------------------"""
+    def recover(self):
+        now = time.time()
+        if self._resetRelease is not None:
+            if now >= self._resetRelease:
+                self._resetRelease = None
+                self._comm.releaseReset()
+                self._bootDone = now + self._comm.resetLine.waitTime(RECOVERY_BOOT_TIME)
+            return None
+        if self._bootDone is not None:
+            if now < self._bootDone:
+                return None
+            self._bootDone = None
+            self._comm.booted()
+            return self.finish(self.probe())
+        self._recoveryStart = now
+        self._lastRecoveryAttempt = now
+        if self._comm.reopen() and self.probe():
+            return self.finish(True)
+        if not self._resetOnRecovery:
+            return self.finish(False)
+        self._comm.holdReset()
+        self._resetRelease = now + self._comm.resetLine.waitTime(RECOVERY_RESET_PULSE)
+        return None
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Ends a recovery attempt: replays outputs and records the recovery time if it succeeded
+         Inputs: recovered - the Atmega answered
+        Outputs: recovered
+    -------------------------------------------------------------------------------------------------------"""
+    def finish(self, recovered):
+        if recovered:
+            self._comm.replayOutputs()
+            self.recoveries += 1
+            self.lastRecoveryTime = time.time() - self._recoveryStart
+            if self.lastRecoveryTime > self.worstRecoveryTime:
+                self.worstRecoveryTime = self.lastRecoveryTime
+            self.setState(LINK_OK)
+        else:
+            self.failedRecoveries += 1
+        return recovered
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Checks that the Atmega answers a status request
+         Inputs: None
+        Outputs: True if a valid response was received
+    -------------------------------------------------------------------------------------------------------"""
+    def probe(self):
+        resp = self._comm.sendCmd(bytearray([STATUS_REQUEST, 0x00]))
+        return resp[0] != NACK or self._comm.consecutiveFailures == 0
+
+    def setState(self, state):
+        if state != self._state:
+            self._state = state
+            self.linkHealthUpdate.emit(state)
+
+#-----------------------------------------------------------------------#
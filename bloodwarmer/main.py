@@ -11,7 +11,7 @@
 # INCLUDES
 #-----------------------------------------------------------#
 
-import sys, time, os
+import sys, time, os, signal
 import RPi.GPIO as GPIO 
 from PyQt4 import QtCore, QtGui, uic
 from arduinoComm import arduinoComm
@@ -21,6 +21,32 @@ from mainWindow import mainWindow
 from warningPopup import warningPopup
 from errorPopup import errorPopup
 from messagePopup import messagePopup
+from ipcBridge import bridgeSockets, coreBridge, guiBridge
+from fleetHost import fleetHost
+
+#-----------------------------------------------------------#
+# SUPERVISOR MODE
+#-----------------------------------------------------------#
+#Command line option that runs control and GUI in separate processes
+SUPERVISOR_ARG = '--supervisor'
+#Process priorities, raising the control process priority requires root
+CORE_NICE = -10
+GUI_NICE = 5
+#Exit code of the control process after a user shutdown
+SHUTDOWN_EXIT = 3
+
+#-----------------------------------------------------------#
+# SERIAL CAPTURE
+#-----------------------------------------------------------#
+#Command line option that records raw serial traffic for protocolAnalyzer
+CAPTURE_ARG = '--capture'
+captureSerial = False
+
+#-----------------------------------------------------------#
+# FLEET MODE
+#-----------------------------------------------------------#
+#Command line option that drives several warmers without a gui, followed by their serial ports
+FLEET_ARG = '--fleet'
 
 
 
@@ -32,12 +58,13 @@ from messagePopup import messagePopup
    -------------------------------------------------------------------------------------------------------"""
 @QtCore.pyqtSlot()
 def shutdown():
-    #Close save file
-    try:
-        controller.saveFile.close()
-    except:
-        pass
     controller.stopSystem()
+    #Send off commands before the event loops stop
+    controller.scheduler.flush()
+    controller.checkpoints.flush()
+    controller.endSession()
+    controller.sessions.flush()
+    controller.arduino._serial.stopCapture()
     #Clean up objects
     GPIO.cleanup()
     controller.deleteLater()
@@ -53,9 +80,15 @@ def shutdown():
         Inputs: None
        Outputs: None
    -------------------------------------------------------------------------------------------------------"""
-def signalHandler():
+def signalHandler(controller, systemError, shutdown):
     #Allows controller to send updated, averaged temp values to gui
     controller.tempUpdate.connect(window.setTemps)
+    #Bag temperatures, set temp and state changes drawn on the trend chart
+    controller.trendUpdate.connect(window.trend.addSample)
+    window.sendTemp.connect(window.trend.setSetpoint)
+    controller.systemUpdate.connect(window.trend.addMarker)
+    #Estimated time until the bag is ready
+    controller.etaUpdate.connect(window.setEta)
     #Connect start button to its event handler
     window.startButton.clicked.connect(window.startClicked)
     #Connect set temp adjustment to its event handler
@@ -71,7 +104,7 @@ def signalHandler():
     controller.selectPressed.connect(window.selectButtonHandler)
 	#popup event handlers
     controller.doorSafetyWarning.connect(warning.setWarning)
-    controller.arduino.systemError.connect(error.setError)
+    systemError.connect(error.setError)
     controller.incubationFinishedMessage.connect(message.displayMessage)
 	# Warning Connections
     warning.continueButton.clicked.connect(warning.chooseResume)
@@ -79,6 +112,13 @@ def signalHandler():
     warning.continueButton.pressed.connect(warning.chooseResume)
     warning.restartButton.pressed.connect(warning.chooseRestart)
     warning.runSystem.connect(controller.systemHandler)
+    # Resume of an interrupted incubation
+    controller.resumeAvailable.connect(window.setResumeState)
+    controller.resumeAvailable.connect(resume.setResume)
+    resume.continueButton.clicked.connect(resume.chooseResume)
+    resume.restartButton.clicked.connect(resume.chooseRestart)
+    resume.runSystem.connect(window.resumeSystem)
+    resume.runSystem.connect(controller.resumeHandler)
 	#system display update
     controller.systemUpdate.connect(window.updateStatus)
 	#display timer connections
@@ -91,6 +131,120 @@ def signalHandler():
     window.shutdownPressed.connect(shutdown)
 
 
+"""-------------------------------------------------------------------------------------------------------
+   Description: Creates the gui windows and popups
+        Inputs: None
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def createGui():
+    global window, warning, error, message, resume
+    window = mainWindow()
+    warning = warningPopup()
+    resume = warningPopup()
+    error = errorPopup()
+    message = messagePopup()
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Control process of supervisor mode: serial link and controller, no gui
+        Inputs: sock - bridge socket to the gui process
+       Outputs: Exit code, SHUTDOWN_EXIT after a user shutdown
+   -------------------------------------------------------------------------------------------------------"""
+def runCore(sock):
+    global app, controller
+    try:
+        os.nice(CORE_NICE)
+    except OSError:
+        pass
+    app = QtCore.QCoreApplication(sys.argv)
+    controller = controller()
+    if captureSerial:
+        controller.arduino._serial.startCapture()
+    bridge = coreBridge(sock)
+    bridge.attach(controller)
+    bridge.shutdown.connect(lambda: app.exit(SHUTDOWN_EXIT))
+    #Terminated by the supervisor, leave the hardware safe
+    signal.signal(signal.SIGTERM, lambda signum, frame: app.exit(0))
+    exitCode = app.exec_()
+    controller.stopSystem()
+    controller.scheduler.flush()
+    controller.checkpoints.flush()
+    controller.endSession()
+    controller.sessions.flush()
+    controller.arduino._serial.stopCapture()
+    GPIO.cleanup()
+    return exitCode
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Gui process of supervisor mode, wired to the controller through the bridge
+        Inputs: sock - bridge socket to the control process
+       Outputs: Exit code
+   -------------------------------------------------------------------------------------------------------"""
+def runGui(sock):
+    global app
+    try:
+        os.nice(GUI_NICE)
+    except OSError:
+        pass
+    app = QtGui.QApplication(sys.argv)
+    createGui()
+    core = guiBridge(sock)
+    signalHandler(core, core.systemError, core.shutdown)
+    #Nothing left to display once the control process is gone
+    core.coreClosed.connect(app.quit)
+    window.show()
+    return app.exec_()
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Starts the control and gui processes and waits for either to exit.  The other one is then
+                terminated, the os is shut down if the user asked for it
+        Inputs: None
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def supervise():
+    coreSock, guiSock = bridgeSockets()
+    children = {}
+    for name, run, sock, other in (('core', runCore, coreSock, guiSock), ('gui', runGui, guiSock, coreSock)):
+        pid = os.fork()
+        if pid == 0:
+            other.close()
+            exitCode = 1
+            try:
+                exitCode = run(sock)
+            finally:
+                os._exit(exitCode)
+        children[pid] = name
+    coreSock.close()
+    guiSock.close()
+    pid, status = os.wait()
+    exited = children.pop(pid)
+    for pid in children:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+    if exited == 'core' and os.WIFEXITED(status) and os.WEXITSTATUS(status) == SHUTDOWN_EXIT:
+        os.system('shutdown now -h')
+
+
+
+"""-------------------------------------------------------------------------------------------------------
+   Description: Fleet mode: one process drives a warmer on each serial port, no gui
+        Inputs: ports - serial port paths
+       Outputs: None
+   -------------------------------------------------------------------------------------------------------"""
+def runFleet(ports):
+    host = fleetHost()
+    for port in ports:
+        host.addPort(port)
+    signal.signal(signal.SIGTERM, lambda signum, frame: host.stop())
+    signal.signal(signal.SIGINT, lambda signum, frame: host.stop())
+    host.run()
+    for name, (ticks, meanJitter, p99Jitter, maxJitter) in sorted(host.jitterStats().items()):
+        host.logger.info('%s: control ticks: %d, jitter mean %.1fms p99 %.1fms max %.1fms' %
+                         (name, ticks, meanJitter*1e3, p99Jitter*1e3, maxJitter*1e3))
+
+
 
 ##############################################################################
 #
@@ -102,16 +256,35 @@ def signalHandler():
 #                           one function, added some comments, generalized
 #                           systemStart signal to systemState, added connections
 ##                           for button event handlers
+#                    1.0.3:  Flush command scheduler on shutdown
+#                    1.0.4:  Added supervisor mode (--supervisor), control and gui
+#                           in separate processes joined by ipcBridge
+#                    1.0.5:  Resume popup for interrupted incubation, checkpoint
+#                           written before shutdown
+#                    1.0.6:  Session closed and session database flushed on shutdown
+#                    1.0.7:  Removed save file close, export runs in usbExporter
+#                    1.0.8:  Added serial capture option (--capture)
+#                    1.0.9:  Added fleet mode (--fleet port ...)
+#                    1.0.10: Fleet jitter statistics go to the fleet log
 #
 ##############################################################################
 if __name__ == "__main__":
+    if FLEET_ARG in sys.argv:
+        runFleet(sys.argv[sys.argv.index(FLEET_ARG) + 1:])
+        sys.exit(0)
+    if CAPTURE_ARG in sys.argv:
+        sys.argv.remove(CAPTURE_ARG)
+        captureSerial = True
+    if SUPERVISOR_ARG in sys.argv:
+        sys.argv.remove(SUPERVISOR_ARG)
+        supervise()
+        sys.exit(0)
     app = QtGui.QApplication(sys.argv)
     #Create controller, serial link, and main window objects
     controller = controller()
-    window = mainWindow()
-    warning = warningPopup()
-    error = errorPopup()
-    message = messagePopup()
+    if captureSerial:
+        controller.arduino._serial.startCapture()
+    createGui()
     
     #------------------------------------------------------------------------#
     # CREATE THREADS FOR CONTROLLER & SERIAL LINK
@@ -126,7 +299,7 @@ if __name__ == "__main__":
     #------------------------------------------------------------------------#
     # SIGNAL CONNECTIONS
     #------------------------------------------------------------------------#
-    signalHandler()
+    signalHandler(controller, controller.arduino.systemError, shutdown)
 
     #------------------------------------------------------------------------#
     # START HARDWARE AND CONTROLLER THREADS
@@ -5,6 +5,7 @@
 
 import sys, time, os, pyautogui
 from PyQt4 import QtCore, QtGui, uic
+from trendChart import trendChart
 
 
 #-----------------------------------------------------------#
@@ -28,6 +29,9 @@ Ui_MainWindow, QtBaseClass = uic.loadUiType(qtMainWindowFile)
 #                            help read code better. Implemented the button slots using pyautogui
 #                            library, which fires off appropriate key strokes based on buttons
 #                            pressed.
+#                     1.0.3: Added resume slots for incubation interrupted by a crash or power loss
+#                     1.0.4: Added session temperature trend chart below the controls
+#                     1.0.5: Added estimated time until the bag is ready
 #
 # -----------------------------------------------------------------------------------------------#
 class mainWindow(QtGui.QMainWindow, Ui_MainWindow):
@@ -48,6 +52,7 @@ class mainWindow(QtGui.QMainWindow, Ui_MainWindow):
         # Local Variables
         # ---------------------------------------------------#
         self._time = 0
+        self._resumeTime = 0
         self.systemIsRunning = False
         self.targetedTemperature = 0
         self.focusedProperty = self.startButton.setFocus()
@@ -65,6 +70,9 @@ class mainWindow(QtGui.QMainWindow, Ui_MainWindow):
         self.adjustTemp.setDecimals(1)
         self.adjustTemp.setSingleStep(.1)
         self.adjustTemp.setSuffix("C")
+        # Session temperature trend below the controls
+        self.trend = trendChart(self.main)
+        self.gridLayout.addWidget(self.trend, 6, 0, 1, 2)
 
 
     @QtCore.pyqtSlot(bool)
@@ -74,6 +82,27 @@ class mainWindow(QtGui.QMainWindow, Ui_MainWindow):
         self.guiTimer.start(1000)
 
 
+    """-------------------------------------------------------------------------------------------------------
+           Description: Shows the saved state of an interrupted incubation while the user decides to resume
+                Inputs: setTemp - saved set temp (C), incTime - saved incubation time (s)
+               Outputs: None
+           -------------------------------------------------------------------------------------------------------"""
+    @QtCore.pyqtSlot(float, float)
+    def setResumeState(self, setTemp, incTime):
+        self.adjustTemp.setValue(setTemp)
+        self._resumeTime = int(incTime)
+
+    """-------------------------------------------------------------------------------------------------------
+           Description: Updates the start button and display timer for the user choice on an interrupted run
+                Inputs: systemState - if the system should be running or not, restart - start over
+               Outputs: None
+           -------------------------------------------------------------------------------------------------------"""
+    @QtCore.pyqtSlot(bool, bool)
+    def resumeSystem(self, systemState, restart):
+        self.systemIsRunning = systemState
+        self.startButton.setText("Stop" if systemState else "Start")
+        self._time = 0 if restart else self._resumeTime
+
     @QtCore.pyqtSlot()
     def stopGuiTimer(self):
         self.guiTimer.stop()
@@ -125,6 +154,23 @@ class mainWindow(QtGui.QMainWindow, Ui_MainWindow):
 
 
 
+    """-------------------------------------------------------------------------------------------------------
+           Description: Shows the estimated time until incubation completes
+                Inputs: warmEta - time to set temp, completionEta - time to completion, margin (s), -1 if
+                        not known
+               Outputs: None
+           -------------------------------------------------------------------------------------------------------"""
+    @QtCore.pyqtSlot(float, float, float)
+    def setEta(self, warmEta, completionEta, margin):
+        if completionEta < 0:
+            self.etaLabel.setText("Ready in: --:--")
+            return
+        minutes = int(round(completionEta / 60))
+        text = "Ready in: %d:%02d" % (minutes / 60, minutes % 60)
+        if margin > 0:
+            text += " %d min" % max(1, int(round(margin / 60)))
+        self.etaLabel.setText(text)
+
     @QtCore.pyqtSlot(int)
     def updateStatus(self,status):
         if status is 0:
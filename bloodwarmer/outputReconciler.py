@@ -0,0 +1,91 @@
+#--------------------Commands--------------------#
+MOTOR_DUTY_SET = 0x08
+FAN_DUTY_SET = 0x09
+FAN_POWER_SET = 0x0A
+HEATER_DUTY_SET = 0x0B
+#------------------------------------------------#
+
+#Priority classes, see commandScheduler
+SAFETY = 0
+CONTROL = 1
+
+#Outputs held by the reconciler, in the order commands are issued
+OUTPUT_CMDS = [HEATER_DUTY_SET, MOTOR_DUTY_SET, FAN_POWER_SET, FAN_DUTY_SET]
+#Heater duty differences up to this many counts are not worth a transaction
+HEATER_DEADBAND = 3
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Holds the desired output vector (motor duty, fan power, fan
+                    duty, heater duty) and compares it with the output states
+                    reported in the last status packet.  Only outputs that
+                    differ produce a command.  Heater duty changes inside
+                    HEATER_DEADBAND are ignored, except for off and full on
+                    which are always matched exactly.  Heater off is issued as
+                    a safety command, everything else as control
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created desired state, diff against reported state and
+                    heater deadband
+----------------------------------------------------------------------------"""
+class outputReconciler(object):
+
+    def __init__(self, hardware, heaterDeadband = HEATER_DEADBAND):
+        self._hardware = hardware
+        self._heaterDeadband = heaterDeadband
+        self._desired = {}
+        #Statistics
+        self.commandsIssued = 0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Sets the value an output should have
+         Inputs: cmdType - output command, value - command value (0-255)
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def setDesired(self, cmdType, value):
+        self._desired[cmdType] = int(value)
+
+    def desired(self, cmdType):
+        return self._desired.get(cmdType)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Output state from the last status packet
+         Inputs: cmdType - output command
+        Outputs: Reported value
+    -------------------------------------------------------------------------------------------------------"""
+    def reported(self, cmdType):
+        if cmdType == MOTOR_DUTY_SET:
+            return self._hardware.motorDutyState
+        elif cmdType == FAN_POWER_SET:
+            return self._hardware.fanPowerState
+        elif cmdType == FAN_DUTY_SET:
+            return self._hardware.fanDutyState
+        else:
+            return self._hardware.heaterDutyState
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Minimal set of commands that brings the hardware to the desired state
+         Inputs: None
+        Outputs: List of (cmd, priority)
+    -------------------------------------------------------------------------------------------------------"""
+    def commands(self):
+        cmds = []
+        for cmdType in OUTPUT_CMDS:
+            if cmdType not in self._desired:
+                continue
+            desired = self._desired[cmdType]
+            reported = self.reported(cmdType)
+            if desired == reported:
+                continue
+            if cmdType == HEATER_DUTY_SET:
+                if 0 < desired < 0xFF and abs(desired - reported) <= self._heaterDeadband:
+                    continue
+                priority = SAFETY if desired == 0 else CONTROL
+            else:
+                priority = CONTROL
+            cmds.append((bytearray([cmdType, desired]), priority))
+        self.commandsIssued += len(cmds)
+        return cmds
+
+#-----------------------------------------------------------------------#
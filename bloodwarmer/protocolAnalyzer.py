@@ -0,0 +1,455 @@
+#-----------------------------------------------------------#
+#
+# Program Description: Offline analyzer for serial captures (see serialCapture).
+#                      Decodes frames with the link framing and checksum rules
+#                      (v1 or v2, told apart by the command framing),
+#                      reports round trip times and anomalies and exports
+#                      transactions for replay through the host software.
+#                      Streamed status frames are counted and checked for
+#                      sequence gaps, then left out of the transactions
+# Usage: python protocolAnalyzer.py capture [replay file]
+#
+#-----------------------------------------------------------#
+
+#imports
+import sys
+import time
+import binascii
+from serialCapture import readCapture, TX, RX
+from protocolV1 import BEGIN, END, ESC, crc8, decodeCtrlChar
+import protocolV2
+from protocolV2 import DELIMITER
+
+#----------------Constants-----------------------#
+
+#Communication control characters
+ACK = 0x06 #Acknowledge packet
+NACK = 0x15 #No acknowledge packet
+STREAM_STATUS = 0x11 #First byte of a streamed status packet
+STREAM_DELTA = 0x12 #First byte of a compact stream frame, followed by the sequence number
+#Index of the stream sequence number
+STREAM_SEQ_INDEX = 29
+
+#Anomalies
+NO_RESPONSE = 'no response'
+STRAY_BYTES = 'bytes outside frame'
+TRUNCATED = 'truncated frame'
+CRC_ERROR = 'checksum mismatch'
+BAD_ESCAPE = 'invalid escape'
+HOST_DECODE = 'host decoder mismatch'
+NACKED = 'nack'
+EXTRA_FRAMES = 'extra frames'
+#Command checksum equal to a control character, sent unescaped it breaks the command frame
+BAD_COMMAND = 'command framing'
+
+#First line of a replay file
+REPLAY_HEADER = '#bloodwarmer replay v1'
+#Transactions kept before and after each anomaly in an anomaly replay
+REPLAY_CONTEXT = 5
+#------------------------------------------------#
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Splits raw received bytes into frames the way the link reads them
+     Inputs: data (bytearray)
+    Outputs: (list of frames between BEGIN and END, bytes outside frames, unterminated frame or None)
+-------------------------------------------------------------------------------------------------------"""
+def splitFrames(data):
+    frames = []
+    stray = 0
+    frame = None
+    for c in data:
+        if c == BEGIN:
+            if frame is not None:
+                stray += len(frame) + 1
+            frame = bytearray()
+        elif frame is None:
+            stray += 1
+        elif c == END:
+            frames.append(frame)
+            frame = None
+        else:
+            frame.append(c)
+    return frames, stray, frame
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Splits raw received v2 bytes into frames at the delimiters
+     Inputs: data (bytearray)
+    Outputs: (list of frames including the delimiter, unterminated bytes)
+-------------------------------------------------------------------------------------------------------"""
+def splitFramesV2(data):
+    parts = data.split(bytearray([DELIMITER]))
+    return [part + bytearray([DELIMITER]) for part in parts[:-1] if part], parts[-1]
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Checks one frame, checksum over the encoded bytes then escape sequences
+     Inputs: frame (bytearray) - bytes between BEGIN and END
+    Outputs: (decoded payload or None, list of anomalies)
+-------------------------------------------------------------------------------------------------------"""
+def checkFrame(frame):
+    if len(frame) < 2:
+        return None, [TRUNCATED]
+    encoded = frame[:-1]
+    if crc8(encoded) != frame[-1]:
+        return None, [CRC_ERROR]
+    anomalies = []
+    i = 0
+    while i < len(encoded):
+        if encoded[i] == ESC:
+            #Only BEGIN, END and ESC are escaped, with bit 7 set
+            if i + 1 == len(encoded) or encoded[i + 1] & 0x7F not in (BEGIN, END, ESC) or \
+               not encoded[i + 1] & 0x80:
+                anomalies.append(BAD_ESCAPE)
+                break
+            i += 1
+        i += 1
+    payload = decodeCtrlChar(encoded)
+    if hostDecode(encoded) != payload:
+        anomalies.append(HOST_DECODE)
+    if payload[:1] == bytearray([NACK]):
+        anomalies.append(NACKED)
+    return payload, anomalies
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Decodes the way arduinoComm.decodeCtrlChar did before 1.0.8, so frames older hosts
+             misread can be flagged
+     Inputs: encoded (bytearray) - frame without checksum
+    Outputs: Decoded payload
+-------------------------------------------------------------------------------------------------------"""
+def hostDecode(encoded):
+    status = bytearray(encoded)
+    decoded = bytearray()
+    for i in range(len(status)):
+        if status[i] == ESC:
+            if i > 0 and status[i-1] == ESC:
+                decoded.append(status[i])
+            elif i < len(status) - 1:
+                status[i+1] = status[i+1] & 0x7F
+        else:
+            decoded.append(status[i])
+    return decoded
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Linear interpolated percentile of sorted samples
+     Inputs: samples (sorted), fraction (0-1)
+    Outputs: Percentile
+-------------------------------------------------------------------------------------------------------"""
+def percentile(samples, fraction):
+    pos = (len(samples) - 1)*fraction
+    low = int(pos)
+    high = min(low + 1, len(samples) - 1)
+    return samples[low] + (samples[high] - samples[low])*(pos - low)
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Pairs captured writes with the responses that followed
+                    them and checks every frame.  Each transaction is a dict:
+                    time (s into the capture), tx, rx (raw bytes), cmdType, rtt
+                    (s, None without a response), payload (decoded response)
+                    and anomalies
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created frame checks, round trip statistics and replay
+                    export
+            -1.0.1: Added protocol v2 frames
+            -1.0.2: Stream frames separated from command responses
+            -1.0.3: Compact stream frames counted as stream frames
+----------------------------------------------------------------------------"""
+class protocolAnalyzer(object):
+
+    def __init__(self, records, startMono = None, startWall = None):
+        if startMono is None:
+            startMono = records[0][0] if records else 0.0
+        self.startMono = startMono
+        self.startWall = startWall
+        self.transactions = []
+        self.strayRecords = 0
+        #Streamed status frames and sequence numbers missing between them
+        self.streamFrames = 0
+        self.streamLost = 0
+        self._streamSeq = None
+        self.analyze(records)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Loads a capture file
+         Inputs: path
+        Outputs: protocolAnalyzer
+    -------------------------------------------------------------------------------------------------------"""
+    @classmethod
+    def fromFile(cls, path):
+        startWall, startMono, records = readCapture(path)
+        return cls(records, startMono, startWall)
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Round trip time statistics per command type, time from the write to the last byte of the
+                 response read by the link
+         Inputs: None
+        Outputs: dict of cmdType to (count, mean, p50, p99, max) in s
+    -------------------------------------------------------------------------------------------------------"""
+    def rttStats(self):
+        rtts = {}
+        for t in self.transactions:
+            if t['rtt'] is not None and t['payload'] is not None:
+                rtts.setdefault(t['cmdType'], []).append(t['rtt'])
+        stats = {}
+        for cmdType, samples in rtts.items():
+            samples.sort()
+            stats[cmdType] = (len(samples), sum(samples)/len(samples), percentile(samples, 0.5),
+                              percentile(samples, 0.99), samples[-1])
+        return stats
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Number of transactions with each anomaly
+         Inputs: None
+        Outputs: dict of anomaly to count
+    -------------------------------------------------------------------------------------------------------"""
+    def anomalyCounts(self):
+        counts = {}
+        for t in self.transactions:
+            for anomaly in t['anomalies']:
+                counts[anomaly] = counts.get(anomaly, 0) + 1
+        return counts
+
+    def anomalies(self):
+        return [t for t in self.transactions if t['anomalies']]
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Writes transactions to a replay file, one per line: time, command and response as hex
+         Inputs: path, anomaliesOnly - keep only anomalous transactions and REPLAY_CONTEXT either side,
+                 context - transactions kept either side
+        Outputs: Number of transactions written
+    -------------------------------------------------------------------------------------------------------"""
+    def exportReplay(self, path, anomaliesOnly = False, context = REPLAY_CONTEXT):
+        keep = range(len(self.transactions))
+        if anomaliesOnly:
+            selected = set()
+            for i, t in enumerate(self.transactions):
+                if t['anomalies']:
+                    selected.update(range(max(0, i - context), min(len(self.transactions), i + context + 1)))
+            keep = sorted(selected)
+        with open(path, 'w') as f:
+            f.write(REPLAY_HEADER + '\n')
+            for i in keep:
+                t = self.transactions[i]
+                f.write('%.6f\t%s\t%s\t%s\n' % (t['time'], binascii.hexlify(bytes(t['tx'])).decode('ascii'),
+                                                binascii.hexlify(bytes(t['rx'])).decode('ascii'),
+                                                ','.join(t['anomalies'])))
+        return len(keep)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Text summary of the capture
+         Inputs: None
+        Outputs: List of lines
+    -------------------------------------------------------------------------------------------------------"""
+    def summary(self):
+        lines = []
+        if self.startWall is not None:
+            lines.append('Capture started %s' % time.asctime(time.localtime(self.startWall)))
+        if self.transactions:
+            lines.append('%d transactions over %.1fs, %d RX records without a command' %
+                         (len(self.transactions), self.transactions[-1]['time'] - self.transactions[0]['time'],
+                          self.strayRecords))
+        if self.streamFrames:
+            lines.append('%d stream frames, %d missing' % (self.streamFrames, self.streamLost))
+        for cmdType, (count, mean, p50, p99, worst) in sorted(self.rttStats().items()):
+            lines.append('cmd 0x%02X n=%-6d rtt mean=%6.2fms p50=%6.2fms p99=%6.2fms max=%6.2fms' %
+                         (cmdType, count, mean*1e3, p50*1e3, p99*1e3, worst*1e3))
+        for anomaly, count in sorted(self.anomalyCounts().items()):
+            lines.append('%-24s %d' % (anomaly, count))
+        return lines
+
+    #--------------------Private Functions----------------------#
+
+    def analyze(self, records):
+        current = None
+        for stamp, direction, data in records:
+            #Lone v2 delimiters only resynchronize the receiver
+            if direction == TX and not data.strip(bytearray([DELIMITER])):
+                continue
+            if direction == TX:
+                if current is not None:
+                    self.finish(current)
+                current = {'time': stamp - self.startMono, 'stamp': stamp, 'tx': data, 'rx': bytearray(),
+                           'rxStamp': None}
+            elif direction == RX:
+                if current is None:
+                    self.strayRecords += 1
+                    continue
+                current['rx'] += data
+                if current['rxStamp'] is None:
+                    current['rxStamp'] = stamp
+        if current is not None:
+            self.finish(current)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Decodes the command and response of a transaction and records its anomalies
+         Inputs: transaction dict being built
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def finish(self, t):
+        if t['tx'][:1] != bytearray([BEGIN]) and t['tx'][-1:] == bytearray([DELIMITER]):
+            self.finishV2(t)
+            return
+        anomalies = []
+        frames, stray, partial = splitFrames(t['tx'])
+        if len(frames) != 1 or stray or partial is not None:
+            anomalies.append(BAD_COMMAND)
+        #Command type is the first payload byte, read it even from a broken frame
+        command = decodeCtrlChar(t['tx'][1:3])
+        t['cmdType'] = command[0] if command else None
+        frames, stray, partial = splitFrames(t['rx'])
+        frames = self.dropStream(frames, lambda frame: checkFrame(frame)[0])
+        t['payload'] = None
+        t['rtt'] = None
+        if not frames:
+            anomalies.append(TRUNCATED if partial is not None else NO_RESPONSE)
+        else:
+            t['rtt'] = t['rxStamp'] - t['stamp']
+            t['payload'], frameAnomalies = checkFrame(frames[0])
+            anomalies.extend(frameAnomalies)
+            if len(frames) > 1:
+                anomalies.append(EXTRA_FRAMES)
+        if stray:
+            anomalies.append(STRAY_BYTES)
+        t['anomalies'] = anomalies
+        del t['rxStamp']
+        self.transactions.append(t)
+
+    def finishV2(self, t):
+        anomalies = []
+        command = protocolV2.decodeFrame(t['tx'])
+        if command is None:
+            anomalies.append(BAD_COMMAND)
+        t['cmdType'] = command[0] if command else None
+        frames, partial = splitFramesV2(t['rx'])
+        frames = self.dropStream(frames, protocolV2.decodeFrame)
+        t['payload'] = None
+        t['rtt'] = None
+        if not frames:
+            anomalies.append(TRUNCATED if partial else NO_RESPONSE)
+        else:
+            t['rtt'] = t['rxStamp'] - t['stamp']
+            t['payload'] = protocolV2.decodeFrame(frames[0])
+            if t['payload'] is None:
+                anomalies.append(CRC_ERROR)
+            elif t['payload'][:1] == bytearray([NACK]):
+                anomalies.append(NACKED)
+            if len(frames) > 1:
+                anomalies.append(EXTRA_FRAMES)
+        t['anomalies'] = anomalies
+        del t['rxStamp']
+        self.transactions.append(t)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Counts the valid stream frames received during a transaction and removes them
+         Inputs: frames - received frames, decode - returns the payload of a frame or None
+        Outputs: Remaining frames
+    -------------------------------------------------------------------------------------------------------"""
+    def dropStream(self, frames, decode):
+        remaining = []
+        for frame in frames:
+            payload = decode(frame)
+            if payload is not None and payload[0] == STREAM_DELTA and len(payload) > 1:
+                seq = payload[1]
+            elif payload is not None and payload[0] == STREAM_STATUS and len(payload) > STREAM_SEQ_INDEX:
+                seq = payload[STREAM_SEQ_INDEX]
+            else:
+                remaining.append(frame)
+                continue
+            if self._streamSeq is not None:
+                self.streamLost += (seq - self._streamSeq) & 0xFF
+            self._streamSeq = (seq + 1) & 0xFF
+            self.streamFrames += 1
+        return remaining
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Stand-in for serial.Serial that answers each write with
+                    the next captured response from a replay file, so a
+                    recorded session can be run through arduinoComm,
+                    hardwareState and the controller.  Responses come back in
+                    capture order whatever the host sends, writes that differ
+                    from the captured command are counted
+----------------------------------------------------------------------------"""
+class replayPort(object):
+    'pyserial compatible port playing back a capture'
+
+    def __init__(self, path, realTime = False):
+        self.timeout = None
+        self._realTime = realTime
+        self._transactions = []
+        with open(path) as f:
+            if f.readline().strip() != REPLAY_HEADER:
+                raise ValueError('%s is not a replay file' % path)
+            for line in f:
+                fields = line.rstrip('\n').split('\t')
+                self._transactions.append((float(fields[0]), bytearray(binascii.unhexlify(fields[1])),
+                                           bytearray(binascii.unhexlify(fields[2]))))
+        self._next = 0
+        self._replayStart = None
+        self._rxBuffer = bytearray()
+        self._open = True
+        self.mismatches = 0
+
+    @property
+    def finished(self):
+        return self._next >= len(self._transactions)
+
+    def open(self):
+        self._open = True
+
+    def close(self):
+        self._open = False
+
+    def isOpen(self):
+        return self._open
+
+    def flushInput(self):
+        self._rxBuffer = bytearray()
+
+    def flushOutput(self):
+        pass
+
+    def inWaiting(self):
+        return len(self._rxBuffer)
+
+    def write(self, data):
+        if self.finished:
+            return len(data)
+        stamp, tx, rx = self._transactions[self._next]
+        self._next += 1
+        if bytearray(data) != tx:
+            self.mismatches += 1
+        if self._realTime:
+            #Keep the captured spacing between transactions
+            if self._replayStart is None:
+                self._replayStart = time.time() - stamp
+            time.sleep(max(0.0, self._replayStart + stamp - time.time()))
+        self._rxBuffer += rx
+        return len(data)
+
+    def read(self, size = 1):
+        if not self._rxBuffer:
+            if self.timeout:
+                time.sleep(self.timeout)
+            return bytes()
+        data = self._rxBuffer[:size]
+        del self._rxBuffer[:size]
+        return bytes(data)
+
+#-----------------------------------------------------------------------#
+
+
+if __name__ == "__main__":
+    analyzer = protocolAnalyzer.fromFile(sys.argv[1])
+    for line in analyzer.summary():
+        print(line)
+    if len(sys.argv) > 2:
+        print('%d transactions written to %s' % (analyzer.exportReplay(sys.argv[2], anomaliesOnly = True), sys.argv[2]))
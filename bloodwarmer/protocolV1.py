@@ -0,0 +1,98 @@
+#-----------------------------------------------------------#
+#
+# Program Description: Protocol v1 framing, spoken by every board.  The
+#                      payload has its control characters escaped, then the
+#                      CRC-8 (Maxim/Dallas) of the escaped payload is added
+#                      and the whole is wrapped in BEGIN and END:
+#
+#                          BEGIN escaped(payload) crc8 END
+#
+#                      A control character inside the payload is sent as ESC
+#                      followed by the character with bit 7 set.  The checksum
+#                      itself is not escaped
+# Last Edited: 10/19/2026
+#
+#-----------------------------------------------------------#
+
+#----------------Constants-----------------------#
+
+#Communication control characters
+BEGIN = 0x02 #Start transmission
+END = 0x03 #End transmission
+ESC = 0x1B #Escape character: indicates control characters within packet
+
+#CRC-8 Maxim/Dallas (reflected poly 0x8C, init 0x00)
+CRC8_POLY = 0x8C
+CRC8_TABLE = []
+for _i in range(256):
+    _crc = _i
+    for _bit in range(8):
+        _crc = (_crc >> 1) ^ CRC8_POLY if _crc & 0x01 else _crc >> 1
+    CRC8_TABLE.append(_crc)
+#------------------------------------------------#
+
+"""-------------------------------------------------------------------------------------------------------
+Description: CRC-8 Maxim/Dallas of data
+     Inputs: data (bytearray) - escaped payload
+    Outputs: crc
+-------------------------------------------------------------------------------------------------------"""
+def crc8(data):
+    crc = 0x00
+    for c in data:
+        crc = CRC8_TABLE[crc ^ c]
+    return crc
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Escapes the control characters in a payload
+     Inputs: packet (bytearray) - unencoded payload
+    Outputs: Payload with every BEGIN, END and ESC sent as ESC and the character with bit 7 set
+-------------------------------------------------------------------------------------------------------"""
+def encodeCtrlChar(packet):
+    encoded = bytearray()
+    for c in packet:
+        if c in (BEGIN, END, ESC):
+            encoded += bytearray([ESC, c | 0x80])
+        else:
+            encoded.append(c)
+    return encoded
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Reverses encodeCtrlChar
+     Inputs: packet (bytearray) - escaped payload, checksum removed
+    Outputs: Decoded payload
+-------------------------------------------------------------------------------------------------------"""
+def decodeCtrlChar(packet):
+    decoded = bytearray()
+    escaped = False
+    for c in packet:
+        if escaped:
+            decoded.append(c & 0x7F)
+            escaped = False
+        elif c == ESC:
+            escaped = True
+        else:
+            decoded.append(c)
+    return decoded
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Frames a payload
+     Inputs: payload (bytearray) - unencoded payload
+    Outputs: BEGIN + escaped payload + checksum + END
+-------------------------------------------------------------------------------------------------------"""
+def encodeFrame(payload):
+    encoded = encodeCtrlChar(payload)
+    return bytearray([BEGIN]) + encoded + bytearray([crc8(encoded), END])
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Checks and unframes a received frame
+     Inputs: frame (bytearray) - bytes received between BEGIN and END: escaped payload and checksum
+    Outputs: Payload, None if the frame is truncated or the checksum does not match
+-------------------------------------------------------------------------------------------------------"""
+def decodeFrame(frame):
+    if len(frame) < 2 or crc8(frame[:-1]) != frame[-1]:
+        return None
+    return decodeCtrlChar(frame[:-1])
@@ -0,0 +1,182 @@
+#-----------------------------------------------------------#
+#
+# Program Description: Protocol v2 framing.  A frame is the payload length,
+#                      the payload and a CRC-16 of both, COBS encoded and
+#                      followed by a zero delimiter:
+#
+#                          COBS(length, payload, crc16 high, crc16 low) 0x00
+#
+#                      Overhead is a constant FRAME_OVERHEAD bytes whatever
+#                      the payload holds.  The second byte on the wire is the
+#                      length, so a receiver reads two bytes and then the rest
+#                      of the frame in one read instead of scanning for END
+#                      byte by byte.  The version is chosen at link bring-up
+#                      with VERSION_REQUEST, boards without v2 stay on v1.
+#                      On a shared RS-485 bus frames carry the unit address
+#                      ahead of the length, covered by the CRC:
+#
+#                          COBS(address, length, payload, crc16 high, crc16 low) 0x00
+# Last Edited: 10/19/2026
+#
+#-----------------------------------------------------------#
+
+#imports
+import struct
+
+#----------------Constants-----------------------#
+
+#Protocol versions, v1 is the BEGIN/ESC/END framing every board speaks
+PROTOCOL_V1 = 1
+PROTOCOL_V2 = 2
+
+"""
+Asks the board for a protocol version, sent in v1 framing
+Accepted values: highest version the host speaks
+Response: ACK, version the board switches to after this response.
+Boards without v2 NACK the unknown command and stay on v1
+"""
+VERSION_REQUEST = 0x0D
+
+#Ends every v2 frame, COBS encoding removes all other zero bytes
+DELIMITER = 0x00
+#Largest payload, keeps the frame to a single COBS block
+MAX_PAYLOAD = 250
+#Bytes added to every payload: length, crc16 (2), COBS code, delimiter
+FRAME_OVERHEAD = 5
+#Bytes read before the frame length is known: COBS code, length
+HEADER_BYTES = 2
+
+#Bus frames: overhead including the address, address every unit acts on without answering.  Units
+#answer with their own address
+BUS_FRAME_OVERHEAD = 6
+BROADCAST = 0xFF
+
+#CRC-16/CCITT (poly 0x1021, init 0xFFFF)
+CRC16_INIT = 0xFFFF
+CRC16_POLY = 0x1021
+CRC16_TABLE = []
+for _i in range(256):
+    _crc = _i << 8
+    for _bit in range(8):
+        _crc = ((_crc << 1) ^ CRC16_POLY) if _crc & 0x8000 else (_crc << 1)
+    CRC16_TABLE.append(_crc & 0xFFFF)
+#------------------------------------------------#
+
+"""-------------------------------------------------------------------------------------------------------
+Description: CRC-16/CCITT of data
+     Inputs: data (bytearray)
+    Outputs: crc
+-------------------------------------------------------------------------------------------------------"""
+def crc16(data):
+    crc = CRC16_INIT
+    for c in data:
+        crc = ((crc << 8) & 0xFFFF) ^ CRC16_TABLE[(crc >> 8) ^ c]
+    return crc
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Consistent overhead byte stuffing, removes every zero byte from data
+     Inputs: data (bytearray) - at most 254 bytes
+    Outputs: Encoded data, one byte longer
+-------------------------------------------------------------------------------------------------------"""
+def cobsEncode(data):
+    encoded = bytearray([0])
+    code = 0
+    for c in data:
+        if c == 0:
+            encoded[code] = len(encoded) - code
+            code = len(encoded)
+            encoded.append(0)
+        else:
+            encoded.append(c)
+    encoded[code] = len(encoded) - code
+    return encoded
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Reverses cobsEncode
+     Inputs: encoded (bytearray) - without the delimiter
+    Outputs: Decoded data, None if the encoding is invalid
+-------------------------------------------------------------------------------------------------------"""
+def cobsDecode(encoded):
+    decoded = bytearray()
+    i = 0
+    while i < len(encoded):
+        code = encoded[i]
+        if code == 0 or i + code > len(encoded):
+            return None
+        block = encoded[i + 1:i + code]
+        if DELIMITER in block:
+            return None
+        decoded += block
+        i += code
+        if i < len(encoded):
+            decoded.append(0)
+    return decoded
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Frames a payload
+     Inputs: payload (bytearray) - 1 to MAX_PAYLOAD bytes
+    Outputs: Frame including the delimiter
+-------------------------------------------------------------------------------------------------------"""
+def encodeFrame(payload):
+    if not 0 < len(payload) <= MAX_PAYLOAD:
+        raise ValueError('v2 payload must be 1-%d bytes' % MAX_PAYLOAD)
+    body = bytearray([len(payload)]) + payload
+    body += bytearray(struct.pack('>H', crc16(body)))
+    return cobsEncode(body) + bytearray([DELIMITER])
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Checks and unframes a received frame
+     Inputs: frame (bytearray) - received bytes up to and including the delimiter
+    Outputs: Payload, None if the frame is corrupt
+-------------------------------------------------------------------------------------------------------"""
+def decodeFrame(frame):
+    if len(frame) < FRAME_OVERHEAD + 1 or frame[-1] != DELIMITER:
+        return None
+    body = cobsDecode(frame[:-1])
+    if body is None or body[0] != len(body) - 3:
+        return None
+    if crc16(body[:-2]) != (body[-2] << 8 | body[-1]):
+        return None
+    return body[1:-2]
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Length of a whole frame from its first two bytes
+     Inputs: header (bytearray) - COBS code and length byte
+    Outputs: Frame length including the delimiter
+-------------------------------------------------------------------------------------------------------"""
+def frameLength(header):
+    return header[1] + FRAME_OVERHEAD
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Frames a payload for one unit on the bus
+     Inputs: address - unit address (1-254) or BROADCAST, payload (bytearray) - 1 to MAX_PAYLOAD bytes
+    Outputs: Frame including the delimiter
+-------------------------------------------------------------------------------------------------------"""
+def encodeBusFrame(address, payload):
+    if not 0 < len(payload) <= MAX_PAYLOAD:
+        raise ValueError('bus payload must be 1-%d bytes' % MAX_PAYLOAD)
+    body = bytearray([address, len(payload)]) + payload
+    body += bytearray(struct.pack('>H', crc16(body)))
+    return cobsEncode(body) + bytearray([DELIMITER])
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Checks and unframes a received bus frame
+     Inputs: frame (bytearray) - received bytes up to and including the delimiter
+    Outputs: (address, payload), None if the frame is corrupt
+-------------------------------------------------------------------------------------------------------"""
+def decodeBusFrame(frame):
+    if len(frame) < BUS_FRAME_OVERHEAD + 1 or frame[-1] != DELIMITER:
+        return None
+    body = cobsDecode(frame[:-1])
+    if body is None or len(body) < 5 or body[1] != len(body) - 4:
+        return None
+    if crc16(body[:-2]) != (body[-2] << 8 | body[-1]):
+        return None
+    return body[0], body[2:-2]
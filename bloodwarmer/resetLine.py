@@ -0,0 +1,127 @@
+#-----------------------------------------------------------#
+#
+# Program Description: Atmega reset lines.  arduinoComm pulses the reset
+#                      line and waits for the board to boot, or holds and
+#                      releases it from link recovery, through one of:
+#
+#                          gpioResetLine   - Pi GPIO pin wired to the reset pin
+#                          deviceResetLine - resets a simulatedDevice
+#                          noResetLine     - no reset wiring (board behind a
+#                                            serial server)
+#
+# Last Edited: 10/19/2026
+#
+#-----------------------------------------------------------#
+
+#imports
+import time
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    GPIO = None
+
+#----------------Constants-----------------------#
+
+#Pi GPIO pin (BCM) to reset Atmega
+ATMEGA_RESET_PIN = 25
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Reset line interface: hold and release drive the reset
+                    pin, pulse holds the Atmega in reset for a time, waitBoot
+                    gives it time to start its firmware.  waitTime is how long
+                    a pulse or boot really takes on the line, so callers that
+                    cannot block can wait it out themselves
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created reset line interface
+            -1.0.1: Added hold, release and waitTime for non-blocking resets
+----------------------------------------------------------------------------"""
+class resetLine(object):
+
+    def hold(self):
+        raise NotImplementedError
+
+    def release(self):
+        raise NotImplementedError
+
+    def waitTime(self, seconds):
+        return seconds
+
+    def pulse(self, width):
+        self.hold()
+        time.sleep(self.waitTime(width))
+        self.release()
+
+    def waitBoot(self, boot):
+        time.sleep(self.waitTime(boot))
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Reset pin driven from a Pi GPIO pin
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created
+----------------------------------------------------------------------------"""
+class gpioResetLine(resetLine):
+
+    def __init__(self, pin = ATMEGA_RESET_PIN):
+        if GPIO is None:
+            raise IOError('RPi.GPIO is not available for the reset line')
+        self.pin = pin
+        GPIO.setmode(GPIO.BCM)
+        GPIO.setup(pin, GPIO.OUT)
+
+    def hold(self):
+        GPIO.output(self.pin, GPIO.HIGH)
+
+    def release(self):
+        GPIO.output(self.pin, GPIO.LOW)
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Reset line of a simulatedDevice.  With realTime off the
+                    pulse and boot take no time
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created
+----------------------------------------------------------------------------"""
+class deviceResetLine(resetLine):
+
+    def __init__(self, device, realTime = True):
+        self.device = device
+        self._realTime = realTime
+
+    def hold(self):
+        pass
+
+    #The device starts over once it leaves reset
+    def release(self):
+        self.device.reset()
+
+    def waitTime(self, seconds):
+        return seconds if self._realTime else 0.0
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: No reset wiring (board behind a serial server): the board
+                    is not reset and there is no boot to wait for, recovery
+                    goes on with the version handshake
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created
+----------------------------------------------------------------------------"""
+class noResetLine(resetLine):
+
+    def hold(self):
+        pass
+
+    def release(self):
+        pass
+
+    def waitTime(self, seconds):
+        return 0.0
+
+#-----------------------------------------------------------------------#
@@ -0,0 +1,86 @@
+#----------------Constants-----------------------#
+
+#Smoothing gains for round trip time and its variation (RFC 6298)
+ALPHA = 0.125
+BETA = 0.25
+#Variation multiplier used for the timeout
+K = 4
+#Timer granularity (s), floor for the variation term
+GRANULARITY = 0.005
+
+#Timeout used before a command type has been measured (s)
+INITIAL_TIMEOUT = 0.1
+#Timeout clamps (s)
+MIN_TIMEOUT = 0.03
+MAX_TIMEOUT = 0.2
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Keeps a smoothed round trip time and round trip variation
+                    per command type and derives the response timeout from them
+                    the way TCP derives its retransmission timeout:
+                        timeout = srtt + max(GRANULARITY, K*rttvar)
+                    Timeouts double on each expiry until a new sample arrives
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created estimator, timeout backoff and snapshot
+----------------------------------------------------------------------------"""
+class rttEstimator(object):
+
+    def __init__(self):
+        self._srtt = {}
+        self._rttvar = {}
+        self._timeout = {}
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Current response timeout for a command type
+         Inputs: cmdType
+        Outputs: Timeout (s)
+    -------------------------------------------------------------------------------------------------------"""
+    def timeout(self, cmdType):
+        return self._timeout.get(cmdType, INITIAL_TIMEOUT)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Adds a round trip measurement, only samples from first attempts should be used
+         Inputs: cmdType, rtt - measured round trip time (s)
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def sample(self, cmdType, rtt):
+        if cmdType not in self._srtt:
+            srtt = rtt
+            rttvar = rtt/2.0
+        else:
+            srtt = self._srtt[cmdType]
+            rttvar = (1 - BETA)*self._rttvar[cmdType] + BETA*abs(srtt - rtt)
+            srtt = (1 - ALPHA)*srtt + ALPHA*rtt
+        self._srtt[cmdType] = srtt
+        self._rttvar[cmdType] = rttvar
+        self._timeout[cmdType] = self.clamp(srtt + max(GRANULARITY, K*rttvar))
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Doubles the timeout after it expired
+         Inputs: cmdType
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def backoff(self, cmdType):
+        self._timeout[cmdType] = self.clamp(self.timeout(cmdType)*2)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Estimator state for reporting
+         Inputs: None
+        Outputs: {cmdType: (srtt, rttvar, timeout)} in seconds
+    -------------------------------------------------------------------------------------------------------"""
+    def snapshot(self):
+        state = {}
+        for cmdType in self._timeout:
+            state[cmdType] = (self._srtt.get(cmdType, float('nan')), self._rttvar.get(cmdType, float('nan')),
+                              self._timeout[cmdType])
+        return state
+
+    #--------------------Private Functions----------------------#
+
+    def clamp(self, timeout):
+        return min(MAX_TIMEOUT, max(MIN_TIMEOUT, timeout))
+
+#-----------------------------------------------------------------------#
@@ -0,0 +1,167 @@
+#imports
+import time
+import threading
+from PyQt4 import QtCore
+try:
+    import RPi.GPIO as GPIO
+except ImportError:
+    GPIO = None
+
+#----------------Constants-----------------------#
+
+#Pi GPIO pin (BCM) wired to the door switch, None if the switch is only read by the AtMega
+DOOR_SWITCH_PIN = None
+#Pin level read while the door is open (switch pulls the line low when closed), GPIO.HIGH
+DOOR_OPEN_LEVEL = 1
+#Debounce time for the door switch edge callback
+DOOR_BOUNCE_MS = 20
+
+#Index of door switch in the status packet (1 = closed, 0 = open)
+DOOR_STATUS_INDEX = 7
+
+HEATER_DUTY_SET = 0x0B
+#Command sent on a safety trip
+HEATER_OFF = bytearray([HEATER_DUTY_SET, 0x00])
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Fast safety path for the door interlock.  Checks the door
+                    state the moment a status frame is received (before the
+                    frame is parsed into the model or the controller runs) and,
+                    where the switch is wired to the Pi, from a GPIO edge
+                    callback.  On door open while armed the heater is turned off
+                    ahead of any other command and the controller is notified
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created frame and GPIO door checks, heater off trip,
+                    reaction latency tracking
+            -1.0.1: Heater off relies on the comm link retry policy
+            -1.0.2: Trip latches until re-armed, heater commands sent while tripped
+                    are forced to off so queued control updates cannot undo a trip
+            -1.0.3: Trips from thermal protection, heater hold that forces heater
+                    commands off without disarming
+            -1.0.4: RPi.GPIO only needed when the door switch is wired to the Pi
+----------------------------------------------------------------------------"""
+class safetyMonitor(QtCore.QObject):
+
+    #Signal to notify controller that the safety path turned the heater off
+    doorOpened = QtCore.pyqtSignal()
+
+    def __init__(self, comm, doorPin = DOOR_SWITCH_PIN):
+        super(self.__class__, self).__init__()
+        self._comm = comm
+        self._doorPin = doorPin
+        self._armed = False
+        self._tripped = False
+        self._held = False
+        self._armLock = threading.Lock()
+        #Veto heater commands while tripped, checked inside the comm transaction lock
+        self._comm.cmdFilter = self.filterCmd
+        #Reaction statistics, from frame receipt/edge to heater off acknowledged
+        self.trips = 0
+        self.lastReactionLatency = None
+        self.worstReactionLatency = 0.0
+        #Configure edge callback if door switch is wired to the Pi
+        if self._doorPin is not None:
+            if GPIO is None:
+                raise IOError('RPi.GPIO is not available for the door switch')
+            GPIO.setup(self._doorPin, GPIO.IN, pull_up_down = GPIO.PUD_UP)
+            GPIO.add_event_detect(self._doorPin, GPIO.BOTH, callback = self.doorEdge, bouncetime = DOOR_BOUNCE_MS)
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Arms the interlock, called when the heater may be driven
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def arm(self):
+        with self._armLock:
+            self._armed = True
+            self._tripped = False
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Disarms the interlock, called when the system is stopped
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def disarm(self):
+        with self._armLock:
+            self._armed = False
+
+    @property
+    def armed(self):
+        return self._armed
+
+    @property
+    def tripped(self):
+        return self._tripped
+
+    @property
+    def edgeWired(self):
+        return self._doorPin is not None
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Forces heater commands to off while the interlock is tripped
+         Inputs: cmd - command about to be sent
+        Outputs: Command to send
+    -------------------------------------------------------------------------------------------------------"""
+    def filterCmd(self, cmd):
+        if (self._tripped or self._held) and cmd[0] == HEATER_DUTY_SET and cmd[1] != 0:
+            return HEATER_OFF
+        return cmd
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Checks a freshly received status packet for door open
+         Inputs: status - decoded status packet, rxTime - time the packet was received
+        Outputs: True if the interlock tripped
+    -------------------------------------------------------------------------------------------------------"""
+    def checkStatus(self, status, rxTime = None):
+        if self._armed and not status[DOOR_STATUS_INDEX]:
+            return self.trip(rxTime)
+        return False
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: GPIO edge callback, runs in the RPi.GPIO event thread
+         Inputs: channel - pin that changed
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def doorEdge(self, channel):
+        edgeTime = time.time()
+        if self._armed and GPIO.input(channel) == DOOR_OPEN_LEVEL:
+            self.trip(edgeTime)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Holds the heater off without tripping, heater commands are forced off until released
+         Inputs: held - hold (True) or release (False)
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def holdHeater(self, held):
+        wasHeld, self._held = self._held, held
+        if held and not wasHeld:
+            self._comm.sendCmd(HEATER_OFF)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Turns the heater off ahead of any queued command and notifies the controller
+         Inputs: eventTime - time the fault was detected, door - door trip (doorOpened is emitted) or a trip
+                 from another check that notifies the controller itself
+        Outputs: True if this call tripped the interlock (False if already tripped by the other path)
+    -------------------------------------------------------------------------------------------------------"""
+    def trip(self, eventTime = None, door = True):
+        with self._armLock:
+            if not self._armed:
+                return False
+            self._armed = False
+            self._tripped = True
+        if eventTime is None:
+            eventTime = time.time()
+        #Comm link retries until acknowledged or the retry budget is spent
+        self._comm.sendCmd(HEATER_OFF)
+        self.lastReactionLatency = time.time() - eventTime
+        if self.lastReactionLatency > self.worstReactionLatency:
+            self.worstReactionLatency = self.lastReactionLatency
+        self.trips += 1
+        if door:
+            self.doorOpened.emit()
+        return True
+
+#-----------------------------------------------------------------------#
@@ -0,0 +1,257 @@
+#imports
+import time
+
+#----------------Constants-----------------------#
+
+#Probes in status packet order, pairs of probes in the same bag
+PROBE_NAMES = ('Bag 1 probe 1', 'Bag 1 probe 2', 'Bag 2 probe 1', 'Bag 2 probe 2')
+PARTNER = (1, 0, 3, 2)
+PROBES = len(PROBE_NAMES)
+
+#Grades
+OK = 0
+WARNING = 1
+FAULT = 2
+GRADE_NAMES = ('OK', 'Warning', 'Fault')
+
+#Readings kept per probe for variance and slope
+WINDOW = 64
+#Valid reading range (C), a disconnected or shorted probe reads outside it
+MIN_VALID = 0.0
+MAX_VALID = 60.0
+#Standard deviation over the window for a noisy probe (C), warning and fault
+NOISE_WARN = 0.15
+NOISE_FAULT = 0.5
+#Smallest step in a probe reading (C), 1/16 C for a 12 bit temperature sensor
+PROBE_RESOLUTION = 0.0625
+#Time a probe may stay within half a resolution step of one reading before it counts as frozen (s).  A bag held
+#at the set temp can sit on one step for minutes, so frozen alone is only a warning
+STUCK_SECONDS = 120.0
+#Movement of the other probe in the bag (window mean, C) while a probe stays frozen that makes it a fault
+STUCK_PARTNER_MOVE = NOISE_FAULT
+#Rate of change over the window (C/s), warning and fault.  A bag warms well under 0.05 C/s
+SLOPE_WARN = 0.2
+SLOPE_FAULT = 1.0
+#Difference between the two probes in a bag (C), warning and fault
+DISAGREE_WARN = 0.5
+DISAGREE_FAULT = 2.0
+#Healthy readings in a row before a graded probe is cleared
+RECOVER_READINGS = 2*WINDOW
+#Leave faulted probes out of the bag temperature
+EXCLUDE_FAULTED = True
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Health of the four bag temperature probes.  Each probe
+                    keeps a ring of its last WINDOW readings with running sums
+                    (taken about the probe's first reading, so the variance
+                    stays exact at 37 C), giving its rolling variance and its
+                    slope across the window in constant time.  Every frame all
+                    four probes are updated and graded in one pass over flat
+                    per probe arrays:
+
+                        out of range               - fault
+                        frozen                     - no step in STUCK_SECONDS,
+                                                     warning.  Fault if the
+                                                     other probe in the bag
+                                                     moves past the noise
+                                                     limit meanwhile
+                        noisy, too steep           - warning or fault by size
+                        bag probes disagree        - warning.  Past
+                                                     DISAGREE_FAULT the probe
+                                                     that is also unhealthy
+                                                     alone faults, or if both
+                                                     look healthy the one
+                                                     further from the other
+                                                     bag
+
+                    A grade only rises at once, it falls back after
+                    RECOVER_READINGS healthy readings.  Faulted probes are left
+                    out of the bag temperature, the system faults once a bag
+                    has no usable probe left
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created rolling variance, slope and disagreement checks,
+                    graded probe state and probe exclusion
+            -1.0.1: Frozen is a flat reading for STUCK_SECONDS rather than a
+                    low variance, a noisier partner alone no longer faults it
+----------------------------------------------------------------------------"""
+class sensorHealth(object):
+
+    def __init__(self, exclude = EXCLUDE_FAULTED):
+        self._exclude = exclude
+        self.reset()
+
+    #--------------------Interface Functions--------------------#
+
+    def reset(self):
+        self._ring = [[0.0]*WINDOW for i in range(PROBES)]
+        self._times = [0.0]*WINDOW
+        self._head = 0
+        self._count = 0
+        self._shift = None
+        self._sum = [0.0]*PROBES
+        self._sumSq = [0.0]*PROBES
+        self._healthy = [0]*PROBES
+        self.grades = [OK]*PROBES
+        self.reasons = ['']*PROBES
+        self.usable = [True]*PROBES
+        self.variance = [0.0]*PROBES
+        self.slope = [0.0]*PROBES
+        #Reading each probe has held within half a step, since when, and the partner's mean at the time
+        self._flatTemp = [None]*PROBES
+        self._flatSince = [0.0]*PROBES
+        self._flatPartner = [None]*PROBES
+        #Grade changes of the last check: (probe, grade, reason)
+        self.changes = []
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Updates and grades all four probes with a new frame
+         Inputs: probeTemps - calibrated probe temperatures (C) in PROBE_NAMES order, rxTime - frame time (s)
+        Outputs: Overall grade: FAULT if a bag has no usable probe left, WARNING if any probe is graded
+    -------------------------------------------------------------------------------------------------------"""
+    def check(self, probeTemps, rxTime = None):
+        rxTime = time.time() if rxTime is None else rxTime
+        if self._shift is None:
+            self._shift = list(probeTemps)
+        head = self._head
+        full = self._count == WINDOW
+        oldTime = self._times[head] if full else self._times[0]
+        self._times[head] = rxTime
+        span = rxTime - oldTime
+        count = self._count + (0 if full else 1)
+        ring = self._ring
+        shift = self._shift
+        total = self._sum
+        totalSq = self._sumSq
+        variance = self.variance
+        slope = self.slope
+        flatTemp = self._flatTemp
+        flatSince = self._flatSince
+        flatPartner = self._flatPartner
+        found = [OK]*PROBES
+        why = ['']*PROBES
+        for i in range(PROBES):
+            temp = probeTemps[i]
+            if not MIN_VALID <= temp <= MAX_VALID:
+                #Out of range readings stay out of the window, the last valid ones are kept
+                found[i] = FAULT
+                why[i] = 'reading %.1f C out of range' % temp
+                continue
+            if flatTemp[i] is None or abs(temp - flatTemp[i]) >= PROBE_RESOLUTION/2:
+                flatTemp[i] = temp
+                flatSince[i] = rxTime
+                flatPartner[i] = None
+            value = temp - shift[i]
+            probeRing = ring[i]
+            if full:
+                old = probeRing[head]
+                total[i] -= old
+                totalSq[i] -= old*old
+            else:
+                old = probeRing[0]
+            probeRing[head] = value
+            total[i] += value
+            totalSq[i] += value*value
+            mean = total[i]/count
+            variance[i] = max(0.0, totalSq[i]/count - mean*mean)
+            slope[i] = (value - old)/span if span > 0 else 0.0
+            if not full:
+                continue
+            if variance[i] >= NOISE_FAULT*NOISE_FAULT:
+                found[i], why[i] = FAULT, 'noisy, %.2f C deviation' % variance[i]**0.5
+            elif abs(slope[i]) >= SLOPE_FAULT:
+                found[i], why[i] = FAULT, 'changing %.2f C/s' % slope[i]
+            elif variance[i] >= NOISE_WARN*NOISE_WARN:
+                found[i], why[i] = WARNING, 'noisy, %.2f C deviation' % variance[i]**0.5
+            elif abs(slope[i]) >= SLOPE_WARN:
+                found[i], why[i] = WARNING, 'changing %.2f C/s' % slope[i]
+            elif rxTime - flatSince[i] >= STUCK_SECONDS:
+                found[i], why[i] = WARNING, 'reading frozen'
+        #Pair checks once every probe is graded alone.  A frozen probe faults once its partner has really moved
+        for i in range(PROBES):
+            partner = PARTNER[i]
+            if found[i] == FAULT or found[partner] == FAULT:
+                continue
+            partnerMean = total[partner]/count + shift[partner]
+            if flatPartner[i] is None:
+                flatPartner[i] = partnerMean
+            elif why[i] == 'reading frozen' and abs(partnerMean - flatPartner[i]) > STUCK_PARTNER_MOVE:
+                moved = partnerMean - flatPartner[i]
+                found[i], why[i] = FAULT, 'reading frozen while %s moved %.1f C' % (PROBE_NAMES[partner], moved)
+        for i in (0, 2):
+            partner = i + 1
+            if found[i] == FAULT or found[partner] == FAULT:
+                continue
+            difference = abs(probeTemps[i] - probeTemps[partner])
+            if difference < DISAGREE_WARN:
+                continue
+            reason = '%.1f C from %s'
+            #A faulted probe still off from its partner stays faulted, the difference is explained by it
+            if self.grades[i] == FAULT or self.grades[partner] == FAULT:
+                for probe in (i, partner):
+                    if self.grades[probe] == FAULT:
+                        found[probe], why[probe] = FAULT, reason % (difference, PROBE_NAMES[PARTNER[probe]])
+                continue
+            if difference >= DISAGREE_FAULT:
+                if found[i] != found[partner]:
+                    bad = i if found[i] > found[partner] else partner
+                else:
+                    #Both look healthy alone, the bags warm together in one chamber
+                    other = probeTemps[2 - i:4 - i]
+                    reference = sum(other)/2
+                    bad = i if abs(probeTemps[i] - reference) > abs(probeTemps[partner] - reference) else partner
+                found[bad], why[bad] = FAULT, reason % (difference, PROBE_NAMES[PARTNER[bad]])
+                continue
+            for probe in (i, partner):
+                if found[probe] == OK:
+                    found[probe], why[probe] = WARNING, reason % (difference, PROBE_NAMES[PARTNER[probe]])
+        self._head = (head + 1) % WINDOW
+        self._count = count
+        return self.grade(found, why)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Temperature of a bag from its usable probes
+         Inputs: probeTemps - calibrated probe temperatures (C), bag - 0 or 1
+        Outputs: Bag temperature (C), None if neither probe is usable
+    -------------------------------------------------------------------------------------------------------"""
+    def bagTemp(self, probeTemps, bag):
+        first = 2*bag
+        usable = [probeTemps[i] for i in (first, first + 1) if self.usable[i]]
+        if not usable:
+            return None
+        return sum(usable)/len(usable)
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Applies the grades found this frame: rises at once, falls after RECOVER_READINGS healthy
+                 readings, records the changes
+         Inputs: found - grade per probe this frame, why - reasons
+        Outputs: Overall grade
+    -------------------------------------------------------------------------------------------------------"""
+    def grade(self, found, why):
+        self.changes = []
+        for i in range(PROBES):
+            if found[i] >= self.grades[i]:
+                self._healthy[i] = 0
+                if found[i] > self.grades[i]:
+                    self.changes.append((i, found[i], why[i]))
+                self.grades[i] = found[i]
+                if found[i] != OK:
+                    self.reasons[i] = why[i]
+                continue
+            self._healthy[i] += 1
+            if self._healthy[i] >= RECOVER_READINGS:
+                self._healthy[i] = 0
+                self.grades[i] = found[i]
+                self.reasons[i] = why[i]
+                self.changes.append((i, found[i], why[i] or 'recovered'))
+        self.usable = [not (self._exclude and grade == FAULT) for grade in self.grades]
+        #Without exclusion any faulted probe corrupts its bag
+        if not self._exclude and FAULT in self.grades:
+            return FAULT
+        if not (self.usable[0] or self.usable[1]) or not (self.usable[2] or self.usable[3]):
+            return FAULT
+        return WARNING if max(self.grades) > OK else OK
+
+#-----------------------------------------------------------------------#
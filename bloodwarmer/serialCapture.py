@@ -0,0 +1,227 @@
+#imports
+import os
+import time
+import mmap
+import struct
+import ctypes
+import ctypes.util
+
+#----------------Constants-----------------------#
+
+#Capture ring file and its data size (bytes)
+CAPTURE_FILE = '/home/pi/Downloads/serial.cap'
+CAPTURE_SIZE = 1 << 20
+
+#Ring header: magic, version, data capacity, write offset, oldest record offset, records written,
+#wall time and monotonic time when the capture started
+HEADER_FORMAT = '<4sHIIIQdd'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+MAGIC = b'BWSC'
+CAPTURE_VERSION = 1
+
+#Record: monotonic time, direction, length, followed by the raw bytes
+RECORD_FORMAT = '<dBH'
+RECORD_HEADER = struct.calcsize(RECORD_FORMAT)
+
+#Record directions
+TX = 0
+RX = 1
+#Marks the end of the used part of the ring, the next record is at the start
+WRAP = 0xFF
+
+CLOCK_MONOTONIC = 1
+#------------------------------------------------#
+
+class timespec(ctypes.Structure):
+    _fields_ = [('tv_sec', ctypes.c_long), ('tv_nsec', ctypes.c_long)]
+
+try:
+    _clockGettime = ctypes.CDLL(ctypes.util.find_library('rt') or ctypes.util.find_library('c'),
+                                use_errno = True).clock_gettime
+except (OSError, AttributeError):
+    _clockGettime = None
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Monotonic clock, python 2 has no time.monotonic
+     Inputs: None
+    Outputs: Seconds from an arbitrary fixed point, falls back to wall time if clock_gettime is missing
+-------------------------------------------------------------------------------------------------------"""
+def monotonic():
+    if _clockGettime is None:
+        return time.time()
+    t = timespec()
+    _clockGettime(CLOCK_MONOTONIC, ctypes.byref(t))
+    return t.tv_sec + t.tv_nsec*1e-9
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Ring file of raw serial traffic.  Each record holds one
+                    write or one response worth of bytes with a monotonic time
+                    stamp, appended with a single copy into a memory mapped
+                    file.  When the ring is full the oldest records are dropped
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created ring file writer, capturing port wrapper and reader
+----------------------------------------------------------------------------"""
+class serialCapture(object):
+
+    def __init__(self, path = CAPTURE_FILE, size = CAPTURE_SIZE):
+        self._capacity = size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.ftruncate(fd, HEADER_SIZE + size)
+            self._map = mmap.mmap(fd, HEADER_SIZE + size)
+        finally:
+            os.close(fd)
+        self._head = 0
+        self._tail = 0
+        self.records = 0
+        self._startWall = time.time()
+        self._startMono = monotonic()
+        self.writeHeader()
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Appends a record, dropping the oldest records if needed
+         Inputs: direction - TX or RX, data - raw bytes, stamp - monotonic time, now if not given
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def record(self, direction, data, stamp = None):
+        if stamp is None:
+            stamp = monotonic()
+        length = RECORD_HEADER + len(data)
+        if length + RECORD_HEADER > self._capacity:
+            return
+        if self._head + length + RECORD_HEADER > self._capacity:
+            #Wrap, records after the marker can't be reached any more
+            self.reclaim(self._head, RECORD_HEADER)
+            struct.pack_into(RECORD_FORMAT, self._map, HEADER_SIZE + self._head, 0, WRAP, 0)
+            if self._tail > self._head:
+                self._tail = 0
+            self._head = 0
+        self.reclaim(self._head, length)
+        offset = HEADER_SIZE + self._head
+        struct.pack_into(RECORD_FORMAT, self._map, offset, stamp, direction, len(data))
+        self._map[offset + RECORD_HEADER:offset + length] = bytes(data)
+        self._head += length
+        self.records += 1
+        self.writeHeader()
+
+    def close(self):
+        self._map.flush()
+        self._map.close()
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Moves the oldest record offset past the region about to be overwritten
+         Inputs: start, length - region in the ring
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def reclaim(self, start, length):
+        if self.records == 0:
+            return
+        while start <= self._tail < start + length:
+            stamp, direction, size = struct.unpack_from(RECORD_FORMAT, self._map, HEADER_SIZE + self._tail)
+            if direction == WRAP:
+                self._tail = 0
+                if start == 0:
+                    continue
+                break
+            self._tail += RECORD_HEADER + size
+
+    def writeHeader(self):
+        struct.pack_into(HEADER_FORMAT, self._map, 0, MAGIC, CAPTURE_VERSION, self._capacity, self._head,
+                         self._tail, self.records, self._startWall, self._startMono)
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Serial port wrapper that copies traffic into a capture.
+                    Writes are recorded as they are sent, bytes read are
+                    collected and recorded as one RX record when the next
+                    transaction starts.  Only installed while capturing, the
+                    comm link pays nothing when capture is off
+----------------------------------------------------------------------------"""
+class capturePort(object):
+
+    def __init__(self, port, capture):
+        self.__dict__['port'] = port
+        self.__dict__['capture'] = capture
+        self.__dict__['_rx'] = bytearray()
+        self.__dict__['_rxTime'] = None
+
+    #--------------------Interface Functions--------------------#
+
+    def write(self, data):
+        self.flushCapture()
+        self.capture.record(TX, data)
+        return self.port.write(data)
+
+    def read(self, size = 1):
+        data = self.port.read(size)
+        if data:
+            self._rx.extend(data)
+            self.__dict__['_rxTime'] = monotonic()
+        return data
+
+    def flushInput(self):
+        #Bytes the link is about to throw away (late responses, noise) are captured too
+        waiting = self.port.inWaiting()
+        if waiting:
+            self._rx.extend(self.port.read(waiting))
+            if self._rxTime is None:
+                self.__dict__['_rxTime'] = monotonic()
+        self.flushCapture()
+        return self.port.flushInput()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Records the bytes read since the last write as one RX record, stamped with the last byte
+                 the link read
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def flushCapture(self):
+        if self._rx:
+            self.capture.record(RX, self._rx, self._rxTime)
+            del self._rx[:]
+        self.__dict__['_rxTime'] = None
+
+    def __getattr__(self, name):
+        return getattr(self.port, name)
+
+    def __setattr__(self, name, value):
+        setattr(self.port, name, value)
+
+#-----------------------------------------------------------------------#
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Reads a capture ring file, oldest record first
+     Inputs: path
+    Outputs: (wall time of capture start, monotonic time of capture start, list of (stamp, direction, bytes))
+-------------------------------------------------------------------------------------------------------"""
+def readCapture(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    magic, version, capacity, head, tail, records, startWall, startMono = struct.unpack_from(HEADER_FORMAT, data, 0)
+    if magic != MAGIC or version != CAPTURE_VERSION:
+        raise ValueError('%s is not a serial capture' % path)
+    result = []
+    pos = tail
+    while records and len(result) < records:
+        if pos + RECORD_HEADER > capacity:
+            pos = 0
+            continue
+        stamp, direction, size = struct.unpack_from(RECORD_FORMAT, data, HEADER_SIZE + pos)
+        if direction == WRAP:
+            pos = 0
+        else:
+            start = HEADER_SIZE + pos + RECORD_HEADER
+            result.append((stamp, direction, bytearray(data[start:start + size])))
+            pos += RECORD_HEADER + size
+        if pos == head:
+            break
+    return startWall, startMono, result
@@ -0,0 +1,256 @@
+#imports
+import time
+import sqlite3
+import threading
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+#----------------Constants-----------------------#
+
+#Session database, kept next to the gui files on the sd card
+SESSION_DB = '/home/pi/Documents/BloodWarmer/sessions.db'
+
+#Minimum time between stored samples of a session (s)
+SAMPLE_INTERVAL = 1.0
+#Writer commits once this many rows are waiting or BATCH_INTERVAL has passed (s)
+BATCH_SIZE = 200
+BATCH_INTERVAL = 1.0
+#Rows waiting for the writer before new rows are dropped
+MAX_QUEUE = 10000
+
+#Event kinds
+STATE_CHANGE = 0
+DOOR_FAULT = 1
+SENSOR_FAULT = 2
+RESUMED = 3
+THERMAL_FAULT = 4
+ALARM = 5
+
+#Session outcomes
+OPEN = 0
+STOPPED = 1
+COMPLETE = 2
+
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS sessions (id INTEGER PRIMARY KEY, startTime REAL NOT NULL, endTime REAL, '
+    'setTemp REAL, setpointTime REAL, incubationTime REAL, outcome INTEGER NOT NULL DEFAULT 0)',
+    'CREATE TABLE IF NOT EXISTS samples (sessionId INTEGER NOT NULL, time REAL NOT NULL, bagTemp REAL, '
+    'bag1Temp REAL, bag2Temp REAL, heaterDuty INTEGER, state INTEGER)',
+    'CREATE TABLE IF NOT EXISTS events (sessionId INTEGER NOT NULL, time REAL NOT NULL, kind INTEGER NOT NULL, '
+    'detail TEXT)',
+    'CREATE INDEX IF NOT EXISTS sessionsByStart ON sessions (startTime)',
+    'CREATE INDEX IF NOT EXISTS samplesBySession ON samples (sessionId, time)',
+    'CREATE INDEX IF NOT EXISTS samplesByTime ON samples (time)',
+    'CREATE INDEX IF NOT EXISTS eventsBySession ON events (sessionId, time)',
+    'CREATE INDEX IF NOT EXISTS eventsByTime ON events (time)',
+]
+
+#Writer operations
+INSERT_SESSION = 'INSERT OR REPLACE INTO sessions (id, startTime, setTemp, outcome) VALUES (?, ?, ?, 0)'
+INSERT_SAMPLE = 'INSERT INTO samples VALUES (?, ?, ?, ?, ?, ?, ?)'
+INSERT_EVENT = 'INSERT INTO events VALUES (?, ?, ?, ?)'
+UPDATE_SETPOINT = 'UPDATE sessions SET setpointTime = ? - startTime WHERE id = ? AND setpointTime IS NULL'
+UPDATE_END = 'UPDATE sessions SET endTime = ?, incubationTime = ?, outcome = ? WHERE id = ?'
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Incubation history in a local sqlite database.  Each run is
+                    a session with its samples (decimated to SAMPLE_INTERVAL)
+                    and events (state changes, door and sensor faults).  The
+                    control thread only queues rows, a writer thread owns the
+                    connection and commits them in batches.  The database runs
+                    in WAL mode so queries from other threads or processes read
+                    while the writer commits, sessions and samples are indexed
+                    by time and session so queries don't scan the tables
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created schema, batched background writer and queries
+            -1.0.1: Added thermal fault and alarm events
+----------------------------------------------------------------------------"""
+class sessionStore(object):
+
+    def __init__(self, path = SESSION_DB, sampleInterval = SAMPLE_INTERVAL):
+        self._path = path
+        self._sampleInterval = sampleInterval
+        self._lastSample = {}
+        self._queue = queue.Queue(MAX_QUEUE)
+        self._writer = threading.Thread(target = self.writeLoop)
+        self._writer.daemon = True
+        self._writer.start()
+        #Statistics
+        self.rowsQueued = 0
+        self.rowsWritten = 0
+        self.rowsDropped = 0
+        self.commits = 0
+        self.writeErrors = 0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Starts a session, the id is the start time in ms so no database round trip is needed
+         Inputs: setTemp (C)
+        Outputs: Session id
+    -------------------------------------------------------------------------------------------------------"""
+    def startSession(self, setTemp):
+        now = time.time()
+        sessionId = int(now*1000)
+        self.queue(INSERT_SESSION, (sessionId, now, setTemp))
+        return sessionId
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Records a sample, dropped if the last sample of the session is less than the sample
+                 interval old
+         Inputs: sessionId, bagTemp, bag1Temp, bag2Temp (C), heaterDuty (0-255), state (controller state)
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def sample(self, sessionId, bagTemp, bag1Temp, bag2Temp, heaterDuty, state):
+        now = time.time()
+        if now - self._lastSample.get(sessionId, 0) < self._sampleInterval:
+            return
+        self._lastSample[sessionId] = now
+        self.queue(INSERT_SAMPLE, (sessionId, now, bagTemp, bag1Temp, bag2Temp, heaterDuty, state))
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Records an event
+         Inputs: sessionId, kind - STATE_CHANGE, DOOR_FAULT, SENSOR_FAULT, RESUMED, THERMAL_FAULT or ALARM,
+                 detail - text
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def event(self, sessionId, kind, detail = ''):
+        self.queue(INSERT_EVENT, (sessionId, time.time(), kind, detail))
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Records the time the session first reached setpoint
+         Inputs: sessionId
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def setpointReached(self, sessionId):
+        self.queue(UPDATE_SETPOINT, (time.time(), sessionId))
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Closes a session
+         Inputs: sessionId, outcome - STOPPED or COMPLETE, incubationTime (s)
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def endSession(self, sessionId, outcome, incubationTime):
+        self._lastSample.pop(sessionId, None)
+        self.queue(UPDATE_END, (time.time(), incubationTime, outcome, sessionId))
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Waits until everything queued so far is committed, used before shutdown
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def flush(self):
+        #Marker row makes the writer commit without waiting for the batch interval
+        self._queue.put((None, None))
+        self._queue.join()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Sessions that started in a time range and took longer than minSetpointTime to reach setpoint
+         Inputs: minSetpointTime (s), since, until (epoch s)
+        Outputs: List of (id, startTime, setTemp, setpointTime, incubationTime, outcome)
+    -------------------------------------------------------------------------------------------------------"""
+    def slowSessions(self, minSetpointTime, since, until = None):
+        if until is None:
+            until = time.time()
+        return self.read('SELECT id, startTime, setTemp, setpointTime, incubationTime, outcome FROM sessions '
+                         'WHERE startTime >= ? AND startTime < ? AND setpointTime > ? ORDER BY startTime',
+                         (since, until, minSetpointTime)).fetchall()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Sessions that started in a time range
+         Inputs: since, until (epoch s)
+        Outputs: List of (id, startTime, endTime, setTemp, setpointTime, incubationTime, outcome)
+    -------------------------------------------------------------------------------------------------------"""
+    def sessions(self, since, until = None):
+        if until is None:
+            until = time.time()
+        return self.read('SELECT id, startTime, endTime, setTemp, setpointTime, incubationTime, outcome '
+                         'FROM sessions WHERE startTime >= ? AND startTime < ? ORDER BY startTime',
+                         (since, until)).fetchall()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Samples of a session, read lazily from the database
+         Inputs: sessionId
+        Outputs: Iterator of (time, bagTemp, bag1Temp, bag2Temp, heaterDuty, state)
+    -------------------------------------------------------------------------------------------------------"""
+    def samples(self, sessionId):
+        return self.read('SELECT time, bagTemp, bag1Temp, bag2Temp, heaterDuty, state FROM samples '
+                         'WHERE sessionId = ? ORDER BY time', (sessionId,))
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Events of a session
+         Inputs: sessionId
+        Outputs: List of (time, kind, detail)
+    -------------------------------------------------------------------------------------------------------"""
+    def events(self, sessionId):
+        return self.read('SELECT time, kind, detail FROM events WHERE sessionId = ? ORDER BY time',
+                         (sessionId,)).fetchall()
+
+    #--------------------Private Functions----------------------#
+
+    def queue(self, statement, row):
+        try:
+            self._queue.put_nowait((statement, row))
+        except queue.Full:
+            self.rowsDropped += 1
+            return
+        self.rowsQueued += 1
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Runs a query on a connection of its own, WAL lets it read while the writer commits
+         Inputs: query, parameters
+        Outputs: Cursor
+    -------------------------------------------------------------------------------------------------------"""
+    def read(self, query, parameters):
+        return sqlite3.connect(self._path).execute(query, parameters)
+
+    def connect(self):
+        db = sqlite3.connect(self._path)
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            db.execute(statement)
+        db.commit()
+        return db
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Writer thread, commits queued rows in batches, consecutive rows of the same statement are
+                 inserted with one executemany
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def writeLoop(self):
+        db = None
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + BATCH_INTERVAL
+            while len(batch) < BATCH_SIZE and batch[-1][0] is not None:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout = timeout))
+                except queue.Empty:
+                    break
+            try:
+                if db is None:
+                    db = self.connect()
+                with db:
+                    start = 0
+                    for i in range(1, len(batch) + 1):
+                        if i == len(batch) or batch[i][0] != batch[start][0]:
+                            if batch[start][0] is not None:
+                                db.executemany(batch[start][0], [row for statement, row in batch[start:i]])
+                            start = i
+                self.commits += 1
+                self.rowsWritten += sum(1 for statement, row in batch if statement is not None)
+            except sqlite3.Error:
+                self.writeErrors += 1
+                db = None
+            for i in range(len(batch)):
+                self._queue.task_done()
+
+#-----------------------------------------------------------------------#
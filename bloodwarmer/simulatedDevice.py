@@ -0,0 +1,656 @@
+#imports
+import os
+import pty
+import time
+import errno
+import fcntl
+import select
+import struct
+import random
+import threading
+import protocolV1
+import protocolV2
+import statusDelta
+from protocolV1 import BEGIN, END
+from protocolV2 import PROTOCOL_V1, PROTOCOL_V2, VERSION_REQUEST, DELIMITER, BROADCAST
+
+#----------------Constants-----------------------#
+
+#Communication control characters
+ACK = 0x06 #Acknowledge packet
+NACK = 0x15 #No acknowledge packet
+
+#--------------------Commands--------------------#
+STATUS_REQUEST = 0x07 #Returns status of all hardware
+MOTOR_DUTY_SET = 0x08
+FAN_DUTY_SET = 0x09
+FAN_POWER_SET = 0x0A
+HEATER_DUTY_SET = 0x0B
+FREQ_SET = 0x0C
+#Starts (value = period in ms) or stops (0) the status stream
+SUBSCRIBE = 0x0E
+#First byte of a streamed status packet
+STREAM_STATUS = 0x11
+#Selects full (0) or compact stream frames (value = keyframe interval)
+STATUS_ENCODING = 0x0F
+#First byte of a compact stream frame: sequence number, key id, statusDelta fields
+STREAM_DELTA = 0x12
+DELTA_HEADER = 3
+#------------------------------------------------#
+
+#-----------Serial port config values------------#
+BAUD_RATE = 19200
+#Bits on the wire per byte (start + 8 data + stop)
+BITS_PER_BYTE = 10
+#RS-485 bus: time a unit takes to turn its transceiver around and start answering (s)
+TURNAROUND = 0.0005
+
+#--------------Thermal model---------------------#
+#Room temperature the bags start at and cool towards
+AMBIENT_TEMP_C = 22.0
+#Heating rate at full heater duty (C/s)
+HEATER_RATE = 0.05
+#Newtonian loss coefficient towards ambient (1/s)
+LOSS_RATE = 0.0005
+#Probe offsets so each probe reads slightly differently
+PROBE_OFFSETS = (0.1, 0.2, 0.1, 0.2)
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Software model of the AtMega firmware used to exercise the
+                    host without hardware.  Decodes framed commands, applies
+                    them to a simple thermal model and answers with a framed
+                    status packet exactly like the board does
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created device model, command handling, thermal model and
+                    serial port stand-in, added door event timestamps so
+                    safety reaction latency can be measured
+            -1.0.1: Added reset and link glitch fault injection
+            -1.0.2: Added byte error injection on responses
+            -1.0.3: Added protocol v2 framing and version request
+            -1.0.4: Added status streaming, the port delivers stream frames at
+                    their wire time sharing the line with responses
+            -1.0.5: Added compact stream frames, a stream frame is skipped when the
+                    line is still busy as the firmware does
+            -1.0.6: Added ptyDeviceServer, many devices behind pseudo terminals
+                    served from a child process
+            -1.0.7: Added the RS-485 bus: addressed commands, simulatedBusPort
+                    with many devices on one line and a pty bus server
+            -1.0.8: v1 framing taken from protocolV1
+----------------------------------------------------------------------------"""
+class simulatedDevice(object):
+    'Software stand-in for the AtMega board'
+
+    def __init__(self, timeScale = 1.0, ambientTempC = AMBIENT_TEMP_C, maxProtocol = PROTOCOL_V2, canStream = True,
+                 canCompact = True):
+        self._lock = threading.RLock()
+        #Framing in use, boots on v1.  maxProtocol = PROTOCOL_V1 models firmware without v2
+        self.protocol = PROTOCOL_V1
+        self.maxProtocol = maxProtocol
+        #Status stream period (ms, 0 off) and sequence number.  canStream = False models firmware without it
+        self.canStream = canStream
+        self.streamPeriod = 0
+        self.streamSeq = 0
+        #Compact stream frames: keyframe interval (0 full frames only), keyframe, key id and frames since it
+        self.canCompact = canCompact
+        self.keyframeInterval = 0
+        self._keyframe = None
+        self._keyId = 0
+        self._sinceKeyframe = 0
+        #Stream frames and bytes sent
+        self.streamFrames = 0
+        self.streamBytes = 0
+        self._timeScale = timeScale
+        self._lastModelTime = time.time()
+        #Inputs
+        self.upSwitch = 0
+        self.downSwitch = 0
+        self.selectSwitch = 0
+        self.backSwitch = 0
+        self.pressureSwitch1 = 1
+        self.pressureSwitch2 = 1
+        self.doorSwitch = 1
+        #Probe temperatures: bag 1 probe 1/2, bag 2 probe 1/2
+        self.probeTempC = [ambientTempC + offset for offset in PROBE_OFFSETS]
+        self._ambientTempC = ambientTempC
+        #Outputs
+        self.motorDutyState = 0
+        self.fanPowerState = 0
+        self.fanDutyState = 0
+        self.heaterDutyState = 0
+        self.pwmFrequency = 0
+        #Door event bookkeeping for latency measurements
+        self.doorOpenTime = None
+        self.heaterOffTime = None
+        #Frame counters
+        self.framesReceived = 0
+        self.framesRejected = 0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Returns outputs to their power on defaults, as the reset pin does
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def reset(self):
+        with self._lock:
+            self.protocol = PROTOCOL_V1
+            self.streamPeriod = 0
+            self.keyframeInterval = 0
+            self._keyframe = None
+            self._keyId = 0
+            self.motorDutyState = 0
+            self.fanPowerState = 0
+            self.fanDutyState = 0
+            self.heaterDutyState = 0
+            self.pwmFrequency = 0
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Opens the lid, timestamping the event so reaction time can be measured
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def openDoor(self):
+        with self._lock:
+            self.doorSwitch = 0
+            self.doorOpenTime = time.time()
+            self.heaterOffTime = None
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Closes the lid
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def closeDoor(self):
+        with self._lock:
+            self.doorSwitch = 1
+            self.doorOpenTime = None
+            self.heaterOffTime = None
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Time from the door opening to the heater being commanded off
+         Inputs: None
+        Outputs: Latency in seconds, None if the heater has not been turned off since the door opened
+    -------------------------------------------------------------------------------------------------------"""
+    def doorReactionLatency(self):
+        with self._lock:
+            if self.doorOpenTime is None or self.heaterOffTime is None:
+                return None
+            return self.heaterOffTime - self.doorOpenTime
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Handles one received frame the way the firmware does
+         Inputs: frame (bytearray) - bytes received between BEGIN and END (v1) or up to and including the
+                 delimiter (v2)
+        Outputs: Framed response (bytearray)
+    -------------------------------------------------------------------------------------------------------"""
+    def handleFrame(self, frame):
+        with self._lock:
+            self.framesReceived += 1
+            if self.protocol == PROTOCOL_V2:
+                cmd = protocolV2.decodeFrame(frame)
+                encode = protocolV2.encodeFrame
+            else:
+                cmd = protocolV1.decodeFrame(frame)
+                encode = protocolV1.encodeFrame
+            if cmd is None or len(cmd) < 2:
+                self.framesRejected += 1
+                return encode(bytearray([NACK]))
+            #Firmware without v2 does not know the version request and NACKs it
+            if cmd[0] == VERSION_REQUEST and self.maxProtocol > PROTOCOL_V1:
+                #Answered in the framing the request came in, the new framing applies from the next frame
+                self.protocol = max(PROTOCOL_V1, min(cmd[1], self.maxProtocol))
+                return encode(bytearray([ACK, self.protocol]))
+            if not self.applyCmd(cmd[0], cmd[1]):
+                self.framesRejected += 1
+                return encode(bytearray([NACK]))
+            return encode(self.statusPacket())
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Handles a command received in a bus frame addressed to this unit
+         Inputs: cmd (bytearray) - unframed command
+        Outputs: Unframed response (bytearray)
+    -------------------------------------------------------------------------------------------------------"""
+    def handleBusCommand(self, cmd):
+        with self._lock:
+            self.framesReceived += 1
+            if len(cmd) < 2 or not self.applyCmd(cmd[0], cmd[1]):
+                self.framesRejected += 1
+                return bytearray([NACK])
+            return self.statusPacket()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Applies a decoded command to the outputs
+         Inputs: cmdType, cmdValue
+        Outputs: True if the command is known
+    -------------------------------------------------------------------------------------------------------"""
+    def applyCmd(self, cmdType, cmdValue):
+        self.stepModel()
+        if cmdType == STATUS_REQUEST:
+            pass
+        elif cmdType == MOTOR_DUTY_SET:
+            self.motorDutyState = cmdValue
+        elif cmdType == FAN_DUTY_SET:
+            self.fanDutyState = cmdValue
+        elif cmdType == FAN_POWER_SET:
+            self.fanPowerState = cmdValue
+        elif cmdType == HEATER_DUTY_SET:
+            self.heaterDutyState = cmdValue
+            if cmdValue == 0 and self.doorOpenTime is not None and self.heaterOffTime is None:
+                self.heaterOffTime = time.time()
+        elif cmdType == FREQ_SET:
+            self.pwmFrequency = cmdValue
+        elif cmdType == SUBSCRIBE and self.canStream:
+            self.streamPeriod = cmdValue
+        elif cmdType == STATUS_ENCODING and self.canCompact:
+            self.keyframeInterval = cmdValue
+            self._keyframe = None
+        else:
+            return False
+        return True
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Builds the 29 byte status packet
+         Inputs: None
+        Outputs: Unframed status packet (bytearray)
+    -------------------------------------------------------------------------------------------------------"""
+    def statusPacket(self):
+        status = bytearray([ACK, self.upSwitch, self.downSwitch, self.selectSwitch, self.backSwitch,
+                            self.pressureSwitch1, self.pressureSwitch2, self.doorSwitch])
+        for temp in self.probeTempC:
+            status += bytearray(struct.pack("<f", temp))
+        status += bytearray([self.motorDutyState, self.fanPowerState, self.fanDutyState,
+                             self.heaterDutyState, self.pwmFrequency])
+        return status
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Builds the next framed stream packet: the status packet starting with STREAM_STATUS
+                 followed by the sequence number.  With compact frames keyframes add the key id, frames in
+                 between are deltas against the keyframe unless the delta would be no smaller
+         Inputs: None
+        Outputs: Framed stream packet (bytearray)
+    -------------------------------------------------------------------------------------------------------"""
+    def streamFrame(self):
+        with self._lock:
+            self.stepModel()
+            status = self.statusPacket()
+            status[0] = STREAM_STATUS
+            packet = status + bytearray([self.streamSeq])
+            if self.keyframeInterval:
+                delta = None
+                if self._keyframe is not None and self._sinceKeyframe < self.keyframeInterval:
+                    delta = statusDelta.encodeDelta(self._keyframe, status)
+                if delta is not None and DELTA_HEADER + len(delta) < len(packet) + 1:
+                    packet = bytearray([STREAM_DELTA, self.streamSeq, self._keyId]) + delta
+                    self._sinceKeyframe += 1
+                else:
+                    self._keyId = (self._keyId + 1) & 0xFF
+                    self._keyframe = status
+                    self._sinceKeyframe = 0
+                    packet.append(self._keyId)
+            self.streamSeq = (self.streamSeq + 1) & 0xFF
+            if self.protocol == PROTOCOL_V2:
+                frame = protocolV2.encodeFrame(packet)
+            else:
+                frame = protocolV1.encodeFrame(packet)
+            self.streamFrames += 1
+            self.streamBytes += len(frame)
+            return frame
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Advances the thermal model to the current time
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def stepModel(self):
+        now = time.time()
+        dt = (now - self._lastModelTime)*self._timeScale
+        self._lastModelTime = now
+        heat = HEATER_RATE*self.heaterDutyState/255.0
+        for i in range(len(self.probeTempC)):
+            loss = LOSS_RATE*(self.probeTempC[i] - self._ambientTempC)
+            self.probeTempC[i] += (heat - loss)*dt
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Stand-in for serial.Serial that is wired to a simulatedDevice.
+                    Optionally sleeps for the wire time of each frame so timing
+                    measurements match the real link
+----------------------------------------------------------------------------"""
+class simulatedPort(object):
+    'pyserial compatible port connected to a simulatedDevice'
+
+    def __init__(self, device, baudRate = BAUD_RATE, realTime = True, byteErrorRate = 0.0):
+        self.device = device
+        #Probability that a response byte has a bit flipped (electrical noise)
+        self.byteErrorRate = byteErrorRate
+        self.baudrate = baudRate
+        self.timeout = None
+        self._realTime = realTime
+        self._rxBuffer = bytearray()
+        self._frame = bytearray()
+        self._inFrame = False
+        self._open = True
+        self._glitched = False
+        #Stream frames on their way: (time fully received, bytes), due time of the next stream frame and
+        #time the device's transmit line is free
+        self._pending = []
+        self._streamNext = None
+        self._txFreeAt = 0.0
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Simulates a USB/UART glitch, all traffic is lost until the port is reopened
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def glitch(self):
+        self._glitched = True
+
+    def open(self):
+        self._open = True
+        self._glitched = False
+        self._rxBuffer = bytearray()
+        self._pending = []
+
+    def close(self):
+        self._open = False
+
+    def isOpen(self):
+        return self._open
+
+    def flushInput(self):
+        self._rxBuffer = bytearray()
+
+    def flushOutput(self):
+        pass
+
+    def inWaiting(self):
+        self.pump()
+        return len(self._rxBuffer)
+
+    def write(self, data):
+        data = bytearray(data)
+        self.wireDelay(len(data))
+        self.pump()
+        if self._glitched or not self._open:
+            return len(data)
+        #Scan for frames the same way the firmware does
+        for c in data:
+            if self.device.protocol == PROTOCOL_V2:
+                self._frame.append(c)
+                if c == DELIMITER:
+                    #Lone delimiters only resynchronize
+                    if len(self._frame) > 1:
+                        self.respond(self._frame)
+                    self._frame = bytearray()
+            elif c == BEGIN:
+                self._frame = bytearray()
+                self._inFrame = True
+            elif self._inFrame and c == END:
+                self._inFrame = False
+                self.respond(self._frame)
+                self._frame = bytearray()
+            elif self._inFrame:
+                self._frame.append(c)
+        return len(data)
+
+    def respond(self, frame):
+        resp = self.device.handleFrame(frame)
+        #A stream frame already on the line goes out first
+        if self._realTime:
+            time.sleep(max(0.0, self._txFreeAt - time.time()))
+        self.wireDelay(len(resp))
+        self._txFreeAt = time.time()
+        self.pump()
+        if self.byteErrorRate:
+            resp = self.addNoise(resp)
+        self._rxBuffer += resp
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Queues the stream frames that have fallen due and moves fully received ones to the receive
+                 buffer
+         Inputs: None
+        Outputs: Time the next byte will arrive, None if nothing is on its way
+    -------------------------------------------------------------------------------------------------------"""
+    def pump(self):
+        now = time.time()
+        period = self.device.streamPeriod/1000.0
+        if not period or self._glitched or not self._open:
+            self._streamNext = None
+        elif self._streamNext is None:
+            self._streamNext = now + period
+        while self._streamNext is not None and self._streamNext <= now:
+            #The firmware skips a sample while its transmitter is still busy
+            if self._txFreeAt <= self._streamNext or not self._realTime:
+                frame = self.device.streamFrame()
+                start = self._streamNext
+                if self._realTime:
+                    self._txFreeAt = start + len(frame)*BITS_PER_BYTE/float(self.baudrate)
+                self._pending.append((self._txFreeAt if self._realTime else start, frame))
+            self._streamNext += period
+        while self._pending and self._pending[0][0] <= now:
+            frame = self._pending.pop(0)[1]
+            if self.byteErrorRate:
+                frame = self.addNoise(frame)
+            self._rxBuffer += frame
+        if self._pending:
+            return self._pending[0][0]
+        return self._streamNext
+
+    def read(self, size = 1):
+        self.pump()
+        #Nothing yet, wait for the next stream frame or the timeout like pyserial
+        if not self._rxBuffer:
+            if self.timeout:
+                arrival = self.pump()
+                wait = self.timeout if arrival is None else min(self.timeout, arrival - time.time())
+                time.sleep(max(0.0, wait))
+                self.pump()
+            if not self._rxBuffer:
+                return bytes()
+        data = self._rxBuffer[:size]
+        del self._rxBuffer[:size]
+        return bytes(data)
+
+    def addNoise(self, data):
+        for i in range(len(data)):
+            if random.random() < self.byteErrorRate:
+                data[i] ^= 1 << random.randint(0, 7)
+        return data
+
+    def wireDelay(self, numBytes):
+        if self._realTime:
+            time.sleep(numBytes*BITS_PER_BYTE/float(self.baudrate))
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Half-duplex RS-485 bus with several simulatedDevices on it,
+                    same interface as simulatedPort.  Every unit sees every
+                    frame, only the addressed one answers, after its turnaround
+                    time.  Broadcasts are applied by every unit and answered by
+                    none.  Units listed in dead never answer
+----------------------------------------------------------------------------"""
+class simulatedBusPort(object):
+    'pyserial compatible port on a bus of simulatedDevices'
+
+    def __init__(self, devices, baudRate = BAUD_RATE, realTime = True, dead = ()):
+        #devices - {address: simulatedDevice}
+        self.devices = devices
+        self.dead = set(dead)
+        self.baudrate = baudRate
+        self.timeout = None
+        self._realTime = realTime
+        self._rxBuffer = bytearray()
+        self._frame = bytearray()
+        #Frames no unit could decode
+        self.framesCorrupt = 0
+
+    def open(self):
+        self._rxBuffer = bytearray()
+
+    def close(self):
+        pass
+
+    def isOpen(self):
+        return True
+
+    def flushInput(self):
+        self._rxBuffer = bytearray()
+
+    def flushOutput(self):
+        pass
+
+    def inWaiting(self):
+        return len(self._rxBuffer)
+
+    def write(self, data):
+        data = bytearray(data)
+        self.wireDelay(len(data))
+        for c in data:
+            self._frame.append(c)
+            if c == DELIMITER:
+                if len(self._frame) > 1:
+                    self.respond(self._frame)
+                self._frame = bytearray()
+        return len(data)
+
+    def respond(self, frame):
+        decoded = protocolV2.decodeBusFrame(frame)
+        if decoded is None:
+            self.framesCorrupt += 1
+            return
+        address, cmd = decoded
+        if address == BROADCAST:
+            for device in self.devices.values():
+                device.handleBusCommand(cmd)
+            return
+        if address not in self.devices or address in self.dead:
+            return
+        resp = protocolV2.encodeBusFrame(address, self.devices[address].handleBusCommand(cmd))
+        if self._realTime:
+            time.sleep(TURNAROUND)
+        self.wireDelay(len(resp))
+        self._rxBuffer += resp
+
+    def read(self, size = 1):
+        data = self._rxBuffer[:size]
+        del self._rxBuffer[:size]
+        return bytes(data)
+
+    def wireDelay(self, numBytes):
+        if self._realTime:
+            time.sleep(numBytes*BITS_PER_BYTE/float(self.baudrate))
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Serves many simulatedDevices, each behind its own pseudo
+                    terminal, from a child process so the host under test gets
+                    real file descriptors to poll and the simulation does not
+                    share its process.  Wire time is not modelled, the pty
+                    passes bytes as soon as they are written.  forBus puts the
+                    devices on one simulated RS-485 bus behind a single pty,
+                    with wire time modelled
+----------------------------------------------------------------------------"""
+class ptyDeviceServer(object):
+    'Simulated devices on pseudo terminals'
+
+    def __init__(self, count, stalled = (), **deviceArgs):
+        #Devices listed in stalled never answer (dead link)
+        self._stalled = set(stalled)
+        self.devices = []
+        self.slaves = []
+        self._ports = []
+        self._masters = []
+        self._pid = None
+        for i in range(count):
+            device = simulatedDevice(**deviceArgs)
+            self.devices.append(device)
+            self.addPort(simulatedPort(device, realTime = False))
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Server for units on one RS-485 bus, addresses 1 to count
+         Inputs: count, dead - addresses that never answer, baudRate, deviceArgs - simulatedDevice arguments
+        Outputs: ptyDeviceServer with a single pty, the bus port is available as bus
+    -------------------------------------------------------------------------------------------------------"""
+    @classmethod
+    def forBus(cls, count, dead = (), baudRate = BAUD_RATE, **deviceArgs):
+        server = cls(0)
+        server.devices = [simulatedDevice(**deviceArgs) for i in range(count)]
+        server.bus = simulatedBusPort(dict((i + 1, device) for i, device in enumerate(server.devices)),
+                                      baudRate, realTime = True, dead = dead)
+        server.addPort(server.bus)
+        return server
+
+    def addPort(self, port):
+        master, slave = pty.openpty()
+        fcntl.fcntl(master, fcntl.F_SETFL, fcntl.fcntl(master, fcntl.F_GETFL) | os.O_NONBLOCK)
+        self._ports.append(port)
+        self._masters.append(master)
+        self.slaves.append(slave)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Starts serving in a child process
+         Inputs: None
+        Outputs: Slave file descriptors for the host, one per device
+    -------------------------------------------------------------------------------------------------------"""
+    def start(self):
+        self._pid = os.fork()
+        if self._pid == 0:
+            try:
+                for slave in self.slaves:
+                    os.close(slave)
+                self.serve()
+            finally:
+                os._exit(0)
+        for master in self._masters:
+            os.close(master)
+        return self.slaves
+
+    def stop(self):
+        if self._pid is not None:
+            os.kill(self._pid, 15)
+            os.waitpid(self._pid, 0)
+            self._pid = None
+        for slave in self.slaves:
+            os.close(slave)
+        self.slaves = []
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Serve loop: commands in from each pty, responses and stream frames out
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def serve(self):
+        poller = select.poll()
+        byFd = {}
+        for i, master in enumerate(self._masters):
+            poller.register(master, select.POLLIN)
+            byFd[master] = i
+        while True:
+            for fd, event in poller.poll(1):
+                try:
+                    data = os.read(fd, 4096)
+                except OSError as e:
+                    if e.errno == errno.EAGAIN:
+                        continue
+                    #Host side closed
+                    return
+                if byFd[fd] not in self._stalled:
+                    self._ports[byFd[fd]].write(data)
+            for i, port in enumerate(self._ports):
+                waiting = port.inWaiting()
+                if waiting and i not in self._stalled:
+                    try:
+                        os.write(self._masters[i], port.read(waiting))
+                    except OSError as e:
+                        if e.errno != errno.EAGAIN:
+                            return
+
+#-----------------------------------------------------------------------#
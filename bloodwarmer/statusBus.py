@@ -0,0 +1,151 @@
+#imports
+import os
+import mmap
+import time
+import struct
+import collections
+
+#----------------Constants-----------------------#
+
+#Memory mapped file the latest hardware status is published into
+STATUS_BUS_FILE = '/dev/shm/bloodwarmerStatus'
+
+#Region layout: header followed by one status frame
+#Header: magic, layout version, frame size, sequence number (odd while a write is in progress)
+HEADER_FORMAT = '<4sHHI'
+MAGIC = b'BWSB'
+LAYOUT_VERSION = 1
+SEQ_OFFSET = 8
+FRAME_OFFSET = struct.calcsize(HEADER_FORMAT)
+
+#Status frame, field order matches STATUS_FIELDS
+FRAME_FORMAT = '<dI7B4f3f5B'
+FRAME_SIZE = struct.calcsize(FRAME_FORMAT)
+REGION_SIZE = FRAME_OFFSET + FRAME_SIZE
+STATUS_FIELDS = ['rxTime', 'frameCount',
+                 'upSwitch', 'downSwitch', 'selectSwitch', 'backSwitch',
+                 'pressureSwitch1', 'pressureSwitch2', 'doorSwitch',
+                 'bag1Probe1TempC', 'bag1Probe2TempC', 'bag2Probe1TempC', 'bag2Probe2TempC',
+                 'bag1TempC', 'bag2TempC', 'bagTempAvg',
+                 'motorDutyState', 'fanPowerState', 'fanDutyState', 'heaterDutyState', 'pwmFrequency']
+
+#Times a reader retries when it races the writer before giving up
+MAX_READ_RETRIES = 100
+#------------------------------------------------#
+
+#Snapshot returned to readers, seq identifies the frame
+statusFrame = collections.namedtuple('statusFrame', ['seq'] + STATUS_FIELDS)
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Publishes the latest hardware status into a memory mapped
+                    file using a seqlock: the sequence number is made odd, the
+                    frame is written in place, then the sequence number is made
+                    even again.  Single writer (hardwareState), any number of
+                    readers in other processes, nobody ever blocks
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created region layout, seqlock writer and reader
+----------------------------------------------------------------------------"""
+class statusBusWriter(object):
+
+    def __init__(self, path = STATUS_BUS_FILE):
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, REGION_SIZE)
+            self._map = mmap.mmap(fd, REGION_SIZE, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+        finally:
+            os.close(fd)
+        self._seq = 0
+        self._frameCount = 0
+        struct.pack_into(HEADER_FORMAT, self._map, 0, MAGIC, LAYOUT_VERSION, FRAME_SIZE, self._seq)
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Publishes a status frame
+         Inputs: values - frame fields after rxTime and frameCount, in STATUS_FIELDS order
+                 rxTime - time the status packet was received
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def publish(self, values, rxTime = None):
+        if rxTime is None:
+            rxTime = time.time()
+        self._frameCount += 1
+        self._seq += 1
+        struct.pack_into('<I', self._map, SEQ_OFFSET, self._seq)
+        struct.pack_into(FRAME_FORMAT, self._map, FRAME_OFFSET, rxTime, self._frameCount, *values)
+        self._seq += 1
+        struct.pack_into('<I', self._map, SEQ_OFFSET, self._seq)
+
+    def close(self):
+        self._map.close()
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Reads the latest status frame published by statusBusWriter.
+                    Reads are plain memory accesses into the mapped region, no
+                    system call per read.  A read is retried if it overlapped a
+                    write
+----------------------------------------------------------------------------"""
+class statusBusReader(object):
+
+    def __init__(self, path = STATUS_BUS_FILE):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            self._map = mmap.mmap(fd, REGION_SIZE, mmap.MAP_SHARED, mmap.PROT_READ)
+        finally:
+            os.close(fd)
+        magic, version, frameSize, seq = struct.unpack_from(HEADER_FORMAT, self._map, 0)
+        if magic != MAGIC or version != LAYOUT_VERSION or frameSize != FRAME_SIZE:
+            self._map.close()
+            raise ValueError('%s is not a version %d status bus' % (path, LAYOUT_VERSION))
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Sequence number of the latest frame, cheap check for a new frame
+         Inputs: None
+        Outputs: Sequence number
+    -------------------------------------------------------------------------------------------------------"""
+    def seq(self):
+        return struct.unpack_from('<I', self._map, SEQ_OFFSET)[0]
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Consistent copy of the latest frame
+         Inputs: None
+        Outputs: statusFrame, None if nothing has been published yet or the writer stalled mid-write
+    -------------------------------------------------------------------------------------------------------"""
+    def read(self):
+        for i in range(MAX_READ_RETRIES):
+            before = struct.unpack_from('<I', self._map, SEQ_OFFSET)[0]
+            if before & 1:
+                continue
+            values = struct.unpack_from(FRAME_FORMAT, self._map, FRAME_OFFSET)
+            after = struct.unpack_from('<I', self._map, SEQ_OFFSET)[0]
+            if before == after:
+                if before == 0:
+                    return None
+                return statusFrame(before, *values)
+        return None
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Waits for a frame newer than lastSeq
+         Inputs: lastSeq - sequence number of the last frame seen, timeout (s), pollInterval (s)
+        Outputs: statusFrame, None on timeout
+    -------------------------------------------------------------------------------------------------------"""
+    def waitNext(self, lastSeq, timeout = 1.0, pollInterval = 0.005):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.seq() != lastSeq:
+                frame = self.read()
+                if frame is not None and frame.seq != lastSeq:
+                    return frame
+            time.sleep(pollInterval)
+        return None
+
+    def close(self):
+        self._map.close()
+
+#-----------------------------------------------------------------------#
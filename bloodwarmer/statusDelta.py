@@ -0,0 +1,70 @@
+#-----------------------------------------------------------#
+#
+# Program Description: Compact status encoding for streamed status frames.
+#                      Between ticks only the probe temperatures usually
+#                      change, so after a keyframe (the full status packet)
+#                      the Atmega sends a bitmap of the fields that differ
+#                      from the keyframe followed by those fields only:
+#
+#                          bitmap high, bitmap low, changed fields...
+#
+#                      Deltas are taken against the last keyframe rather than
+#                      the previous frame, so a lost delta costs one sample
+#                      and a lost keyframe is noticed from its key id.  The
+#                      host rebuilds full status packets so parseStatus does
+#                      not change
+# Last Edited: 10/19/2026
+#
+#-----------------------------------------------------------#
+
+#imports
+import struct
+
+#----------------Constants-----------------------#
+
+#Status packet fields after the first byte: (index, size).  Switches, four
+#float probe temperatures, output states
+FIELDS = ((1, 1), (2, 1), (3, 1), (4, 1), (5, 1), (6, 1), (7, 1),
+          (8, 4), (12, 4), (16, 4), (20, 4),
+          (24, 1), (25, 1), (26, 1), (27, 1), (28, 1))
+#Bytes of the status packet covered by FIELDS, including the first byte
+STATUS_BYTES = 29
+BITMAP_BYTES = 2
+#------------------------------------------------#
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Fields of status that differ from the keyframe
+     Inputs: keyframe, status (bytearray) - status packets, first STATUS_BYTES bytes are compared
+    Outputs: Bitmap followed by the changed fields (bytearray)
+-------------------------------------------------------------------------------------------------------"""
+def encodeDelta(keyframe, status):
+    bitmap = 0
+    fields = bytearray()
+    for bit, (index, size) in enumerate(FIELDS):
+        if status[index:index + size] != keyframe[index:index + size]:
+            bitmap |= 1 << bit
+            fields += status[index:index + size]
+    return bytearray(struct.pack('>H', bitmap)) + fields
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Rebuilds a status packet from its keyframe and a delta
+     Inputs: keyframe (bytearray) - full status packet, delta (bytearray) - as built by encodeDelta
+    Outputs: Status packet of STATUS_BYTES bytes (first byte from the keyframe), None if the delta length
+             does not match its bitmap
+-------------------------------------------------------------------------------------------------------"""
+def decodeDelta(keyframe, delta):
+    if len(delta) < BITMAP_BYTES or len(keyframe) < STATUS_BYTES:
+        return None
+    bitmap, = struct.unpack('>H', bytes(delta[:BITMAP_BYTES]))
+    status = bytearray(keyframe[:STATUS_BYTES])
+    pos = BITMAP_BYTES
+    for bit, (index, size) in enumerate(FIELDS):
+        if bitmap & (1 << bit):
+            if pos + size > len(delta):
+                return None
+            status[index:index + size] = delta[pos:pos + size]
+            pos += size
+    if pos != len(delta):
+        return None
+    return status
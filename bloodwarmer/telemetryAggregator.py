@@ -0,0 +1,473 @@
+#imports
+import os
+import json
+import time
+import errno
+import array
+import base64
+import socket
+import select
+import struct
+
+#----------------Constants-----------------------#
+
+#Directory holding one subdirectory per warmer
+AGGREGATOR_DIR = '/var/lib/bloodwarmer/telemetry'
+
+#Fields stored per sample, in column order
+FIELDS = ('bagTempAvg', 'bag1TempC', 'bag2TempC', 'heaterDutyState', 'state')
+#Rollup levels: (name, bucket width s), each built from the one before it
+LEVELS = (('1s', 1), ('1m', 60), ('1h', 3600))
+RAW = 'raw'
+#Column files hold native doubles, one per row
+TYPECODE = 'd'
+ITEM_SIZE = array.array(TYPECODE).itemsize
+#Rows buffered per unit before they are appended to the column files
+FLUSH_ROWS = 4096
+#Most points a query returns, the finest level that fits is used
+MAX_POINTS = 2000
+
+#Stream collector: time between reconnect attempts to a warmer (s), connect timeout (s)
+RECONNECT_INTERVAL = 5.0
+CONNECT_TIMEOUT = 2.0
+RECV_SIZE = 65536
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Central time-series store for telemetry from many
+                    warmers.  Each unit has append-only column files (one file
+                    per column, fixed size rows) for the raw samples and for
+                    rollups at 1 s, 1 min and 1 h holding count, min, max and
+                    mean of every field.  Samples of the open second are
+                    buffered as one array per column and reduced with min/max/
+                    sum over the whole array when the second closes (C loops,
+                    no per sample Python arithmetic), coarser buckets are
+                    merged from the finer rows.  Queries binary search the time
+                    column on disk and read only the rows in range from the
+                    coarsest level that still gives the requested resolution,
+                    so months of history answer from a few thousand rows
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created column store, rollups, range queries
+----------------------------------------------------------------------------"""
+class telemetryAggregator(object):
+
+    def __init__(self, path = AGGREGATOR_DIR):
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self._units = {}
+        #Statistics
+        self.samples = 0
+        self.lateSamples = 0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Adds one sample.  Samples older than the unit's last sample are dropped (counted in
+                 lateSamples) so every column stays sorted by time
+         Inputs: unit - warmer name, sampleTime (s since epoch), values - FIELDS in order
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def ingest(self, unit, sampleTime, values):
+        series = self._units.get(unit)
+        if series is None:
+            series = self.openUnit(unit)
+        if sampleTime < series['lastTime']:
+            self.lateSamples += 1
+            return
+        series['lastTime'] = sampleTime
+        if sampleTime >= series['buckets'][0]['start'] + 1:
+            self.closeSecond(series, sampleTime)
+        raw = series['pending'][RAW]
+        raw['time'].append(sampleTime)
+        second = series['second']
+        for field, value in zip(FIELDS, values):
+            raw[field].append(value)
+            second[field].append(value)
+        self.samples += 1
+        series['pendingRows'] += 1
+        if series['pendingRows'] >= FLUSH_ROWS:
+            self.flushUnit(series)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Ingests a recorded telemetry stream: one JSON snapshot per line as sent by telemetryServer
+         Inputs: unit, path
+        Outputs: Number of samples ingested
+    -------------------------------------------------------------------------------------------------------"""
+    def ingestFile(self, unit, path):
+        count = 0
+        with open(path) as f:
+            for line in f:
+                sample = sampleFromSnapshot(line)
+                if sample is not None:
+                    self.ingest(unit, *sample)
+                    count += 1
+        return count
+
+    def units(self):
+        return sorted(name for name in os.listdir(self.path) if os.path.isdir(os.path.join(self.path, name)))
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Appends every unit's buffered rows to its column files
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def flush(self):
+        for series in self._units.values():
+            self.flushUnit(series)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Min, max and mean of a field over a time range, from the finest rollup that returns at most
+                 maxPoints points (or the level asked for).  Buckets still open are not included
+         Inputs: unit, field, start, end (s since epoch), maxPoints, level - rollup name, None to choose
+        Outputs: (level, times, mins, maxs, means), times are bucket starts
+    -------------------------------------------------------------------------------------------------------"""
+    def query(self, unit, field, start, end, maxPoints = MAX_POINTS, level = None):
+        if level is None:
+            level = LEVELS[-1][0]
+            for name, width in LEVELS:
+                if (end - start)/float(width) <= maxPoints:
+                    level = name
+                    break
+        if unit in self._units:
+            self.flushUnit(self._units[unit])
+        columns = self.readRange(unit, level, start, end, ('time', field + '.min', field + '.max', field + '.mean'))
+        return (level,) + tuple(columns)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Raw samples of a unit over a time range
+         Inputs: unit, start, end, fields
+        Outputs: List of arrays: time followed by fields
+    -------------------------------------------------------------------------------------------------------"""
+    def raw(self, unit, start, end, fields = FIELDS):
+        if unit in self._units:
+            self.flushUnit(self._units[unit])
+        return self.readRange(unit, RAW, start, end, ('time',) + tuple(fields))
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Sets up a unit for writing, rows left over from an interrupted flush are cut so every column
+                 of a level has the same length
+         Inputs: unit
+        Outputs: Unit series state
+    -------------------------------------------------------------------------------------------------------"""
+    def openUnit(self, unit):
+        unitPath = os.path.join(self.path, unit)
+        series = {'path': unitPath, 'pending': {}, 'pendingRows': 0, 'buckets': [], 'lastTime': 0.0,
+                  'second': dict((field, array.array(TYPECODE)) for field in FIELDS)}
+        for level in (RAW,) + tuple(name for name, width in LEVELS):
+            levelPath = os.path.join(unitPath, level)
+            if not os.path.isdir(levelPath):
+                os.makedirs(levelPath)
+            names = columnNames(level)
+            rows = min(self.rows(unit, level, name) for name in names)
+            for name in names:
+                with open(os.path.join(levelPath, name), 'ab') as f:
+                    f.truncate(rows*ITEM_SIZE)
+            series['pending'][level] = dict((name, array.array(TYPECODE)) for name in names)
+        series['lastTime'] = self.lastTime(unit, RAW) or 0.0
+        #Open buckets continue after the last stored row of each level, rows of the finer level stored
+        #after it are merged back in
+        for index, (name, width) in enumerate(LEVELS):
+            last = self.lastTime(unit, name)
+            bucket = newBucket(last + width if last is not None else 0.0, width)
+            finer = LEVELS[index - 1][0] if index else RAW
+            columns = self.readRange(unit, finer, bucket['start'], float('inf'), columnNames(finer))
+            if index == 0:
+                if len(columns[0]):
+                    bucket['start'] = float(int(columns[0][0]))
+                for field, values in zip(FIELDS, columns[1:]):
+                    series['second'][field].extend(values)
+            else:
+                for row in zip(*columns):
+                    mergeRow(bucket, row)
+            series['buckets'].append(bucket)
+        self._units[unit] = series
+        return series
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Closes the open second: its buffered samples are reduced column by column into a 1 s row,
+                 the row is merged into the open minute, the minute into the open hour when they close
+         Inputs: series, sampleTime - time of the sample that starts a new second
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def closeSecond(self, series, sampleTime):
+        second = series['second']
+        bucket = series['buckets'][0]
+        count = len(second[FIELDS[0]])
+        if count:
+            row = [bucket['start'], count]
+            for field in FIELDS:
+                values = second[field]
+                row += [min(values), max(values), sum(values)/count]
+                del values[:]
+            self.addRow(series, 0, row)
+        bucket['start'] = float(int(sampleTime))
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Appends a closed row to a level and merges it into the next coarser open bucket
+         Inputs: series, index - level index, row - time, count, then min, max, mean per field
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def addRow(self, series, index, row):
+        pending = series['pending'][LEVELS[index][0]]
+        for name, value in zip(columnNames(LEVELS[index][0]), row):
+            pending[name].append(value)
+        if index + 1 == len(LEVELS):
+            return
+        coarse = series['buckets'][index + 1]
+        if coarse['count'] and row[0] >= coarse['start'] + coarse['width']:
+            self.closeBucket(series, index + 1)
+        mergeRow(series['buckets'][index + 1], row)
+
+    def closeBucket(self, series, index):
+        bucket = series['buckets'][index]
+        row = [bucket['start'], bucket['count']]
+        for i in range(len(FIELDS)):
+            row += [bucket['min'][i], bucket['max'][i], bucket['sum'][i]/bucket['count']]
+        series['buckets'][index] = newBucket(bucket['start'] + bucket['width'], bucket['width'])
+        self.addRow(series, index, row)
+
+    def flushUnit(self, series):
+        for level, columns in series['pending'].items():
+            if not len(columns['time']):
+                continue
+            levelPath = os.path.join(series['path'], level)
+            for name, values in columns.items():
+                with open(os.path.join(levelPath, name), 'ab') as f:
+                    values.tofile(f)
+                del values[:]
+        series['pendingRows'] = 0
+
+    def rows(self, unit, level, name):
+        try:
+            return os.path.getsize(os.path.join(self.path, unit, level, name))//ITEM_SIZE
+        except OSError:
+            return 0
+
+    def lastTime(self, unit, level):
+        rows = self.rows(unit, level, 'time')
+        if not rows:
+            return None
+        with open(os.path.join(self.path, unit, level, 'time'), 'rb') as f:
+            return readRows(f, rows - 1, 1)[0]
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Reads the rows of a level with start <= time < end, the time column is binary searched on
+                 disk so only the rows in range are read
+         Inputs: unit, level, start, end, names - columns to read
+        Outputs: List of arrays, one per column
+    -------------------------------------------------------------------------------------------------------"""
+    def readRange(self, unit, level, start, end, names):
+        levelPath = os.path.join(self.path, unit, level)
+        rows = min(self.rows(unit, level, name) for name in set(names) | set(['time']))
+        if not rows:
+            return [array.array(TYPECODE) for name in names]
+        with open(os.path.join(levelPath, 'time'), 'rb') as f:
+            first = searchTime(f, rows, start)
+            last = searchTime(f, rows, end)
+        columns = []
+        for name in names:
+            with open(os.path.join(levelPath, name), 'rb') as f:
+                columns.append(readRows(f, first, last - first))
+        return columns
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Collects the live streams of many warmers into a
+                    telemetryAggregator: one WebSocket connection per
+                    warmer's telemetryServer, all served from one select loop.
+                    A warmer that drops off is reconnected every
+                    RECONNECT_INTERVAL
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created
+----------------------------------------------------------------------------"""
+class streamCollector(object):
+
+    def __init__(self, aggregator):
+        self.aggregator = aggregator
+        self._warmers = []
+        self._running = False
+        #Statistics
+        self.messages = 0
+        self.reconnects = 0
+
+    #--------------------Interface Functions--------------------#
+
+    def addWarmer(self, unit, host, port):
+        self._warmers.append({'unit': unit, 'address': (host, port), 'sock': None, 'rx': bytearray(),
+                              'retryAt': 0.0})
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Collects until stop() or for duration seconds, buffered rows are flushed at the end
+         Inputs: duration - seconds, None runs until stop()
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def run(self, duration = None):
+        end = None if duration is None else time.time() + duration
+        self._running = True
+        while self._running and (end is None or time.time() < end):
+            now = time.time()
+            for warmer in self._warmers:
+                if warmer['sock'] is None and now >= warmer['retryAt']:
+                    self.connect(warmer, now)
+            bySock = dict((warmer['sock'], warmer) for warmer in self._warmers if warmer['sock'] is not None)
+            timeout = 1.0 if end is None else max(0.0, min(1.0, end - now))
+            if not bySock:
+                time.sleep(timeout)
+                continue
+            try:
+                readable, writable, failed = select.select(list(bySock), [], [], timeout)
+            except select.error as e:
+                if e.args[0] != errno.EINTR:
+                    raise
+                continue
+            for sock in readable:
+                self.receive(bySock[sock])
+        self.aggregator.flush()
+
+    def stop(self):
+        self._running = False
+
+    #--------------------Private Functions----------------------#
+
+    def connect(self, warmer, now):
+        warmer['retryAt'] = now + RECONNECT_INTERVAL
+        try:
+            sock = socket.create_connection(warmer['address'], CONNECT_TIMEOUT)
+            key = base64.b64encode(os.urandom(16)).decode('ascii')
+            sock.sendall(('GET /stream HTTP/1.1\r\nHost: %s\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                          'Sec-WebSocket-Key: %s\r\nSec-WebSocket-Version: 13\r\n\r\n' %
+                          (warmer['address'][0], key)).encode('ascii'))
+            response = b''
+            while b'\r\n\r\n' not in response:
+                data = sock.recv(1)
+                if not data:
+                    raise socket.error('connection closed during handshake')
+                response += data
+        except (socket.error, socket.timeout):
+            return
+        if not response.startswith(b'HTTP/1.1 101'):
+            sock.close()
+            return
+        sock.setblocking(0)
+        warmer['sock'] = sock
+        warmer['rx'] = bytearray()
+        self.reconnects += 1
+
+    def receive(self, warmer):
+        try:
+            data = warmer['sock'].recv(RECV_SIZE)
+        except socket.error as e:
+            if e.args[0] in (errno.EAGAIN, errno.EINTR):
+                return
+            data = b''
+        if not data:
+            warmer['sock'].close()
+            warmer['sock'] = None
+            return
+        rx = warmer['rx']
+        rx += data
+        #Server frames are unmasked
+        while len(rx) >= 2:
+            length = rx[1] & 0x7F
+            pos = 2
+            if length == 126:
+                if len(rx) < 4:
+                    break
+                length, = struct.unpack('>H', bytes(rx[2:4]))
+                pos = 4
+            elif length == 127:
+                if len(rx) < 10:
+                    break
+                length, = struct.unpack('>Q', bytes(rx[2:10]))
+                pos = 10
+            if len(rx) < pos + length:
+                break
+            opcode = rx[0] & 0x0F
+            payload = bytes(rx[pos:pos + length])
+            del rx[:pos + length]
+            if opcode != 0x1:
+                continue
+            self.messages += 1
+            sample = sampleFromSnapshot(payload)
+            if sample is not None:
+                self.aggregator.ingest(warmer['unit'], *sample)
+
+#-----------------------------------------------------------------------#
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Sample from a telemetryServer snapshot
+     Inputs: text - JSON snapshot
+    Outputs: (sampleTime, values in FIELDS order), None if the snapshot has no status
+-------------------------------------------------------------------------------------------------------"""
+def sampleFromSnapshot(text):
+    try:
+        snapshot = json.loads(text)
+    except ValueError:
+        return None
+    status = snapshot.get('status')
+    if not status:
+        return None
+    values = [float(status.get(field, snapshot.get(field, 0.0))) for field in FIELDS]
+    return status.get('rxTime', snapshot.get('time')), values
+
+
+def columnNames(level):
+    if level == RAW:
+        return ('time',) + FIELDS
+    names = ['time', 'count']
+    for field in FIELDS:
+        names += [field + '.min', field + '.max', field + '.mean']
+    return tuple(names)
+
+
+def newBucket(start, width):
+    count = len(FIELDS)
+    return {'start': start, 'width': width, 'count': 0,
+            'min': [float('inf')]*count, 'max': [float('-inf')]*count, 'sum': [0.0]*count}
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Merges a closed row of the finer level into an open bucket
+     Inputs: bucket, row - time, count, then min, max, mean per field
+    Outputs: None
+-------------------------------------------------------------------------------------------------------"""
+def mergeRow(bucket, row):
+    if not bucket['count']:
+        bucket['start'] = row[0] - row[0] % bucket['width']
+    count = row[1]
+    bucket['count'] += count
+    for i in range(len(FIELDS)):
+        low, high, mean = row[2 + 3*i:5 + 3*i]
+        bucket['min'][i] = min(bucket['min'][i], low)
+        bucket['max'][i] = max(bucket['max'][i], high)
+        bucket['sum'][i] += mean*count
+
+
+def readRows(f, first, count):
+    values = array.array(TYPECODE)
+    if count > 0:
+        f.seek(first*ITEM_SIZE)
+        values.fromfile(f, count)
+    return values
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Binary search of a time column file
+     Inputs: f - open time column, rows, t
+    Outputs: Index of the first row with time >= t
+-------------------------------------------------------------------------------------------------------"""
+def searchTime(f, rows, t):
+    low, high = 0, rows
+    while low < high:
+        middle = (low + high)//2
+        if readRows(f, middle, 1)[0] < t:
+            low = middle + 1
+        else:
+            high = middle
+    return low
@@ -0,0 +1,348 @@
+#imports
+import time
+import json
+import errno
+import base64
+import socket
+import select
+import struct
+import hashlib
+import threading
+from statusBus import statusBusReader, STATUS_BUS_FILE, STATUS_FIELDS
+
+#----------------Constants-----------------------#
+
+#Address and TCP port the telemetry server listens on
+TELEMETRY_HOST = '0.0.0.0'
+TELEMETRY_PORT = 8080
+#Live stream rate (updates/s), status is downsampled from the control rate to this
+STREAM_RATE = 4.0
+#Largest HTTP request header accepted (bytes)
+MAX_REQUEST = 4096
+#Bytes queued for a client before it is dropped as too slow
+MAX_CLIENT_BACKLOG = 65536
+#Most bytes received per read
+RECV_SIZE = 4096
+
+#System states, as signalled by controller.systemUpdate
+STATE_NAMES = ('Idle', 'Heating', 'Incubating', 'Complete')
+#Snapshot keys of the controller state, in publishState order
+STATE_KEYS = ('state', 'setTemp', 'heatTime', 'incTime', 'incRemaining', 'warmEta', 'completionEta', 'etaMargin')
+
+#WebSocket handshake key suffix and opcodes (RFC 6455)
+WS_GUID = '258EAFA5-E914-47DA-95CA-C5AB0DC11B85'
+WS_TEXT = 0x1
+WS_CLOSE = 0x8
+WS_PING = 0x9
+WS_PONG = 0xA
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Local telemetry server for central monitoring.  Serves
+                    the latest snapshot (hardware status, system state,
+                    incubation time, time to set temp and completion, active
+                    alarms) as JSON:
+
+                        GET /snapshot - one snapshot over HTTP
+                        GET /stream   - WebSocket, a snapshot every
+                                        1/STREAM_RATE s while it changes
+
+                    Hardware status is read from the status bus, the
+                    controller only hands over its state with publishState
+                    (one reference assignment), so the control loop never
+                    waits on a client.  The server runs one select loop in its
+                    own thread.  Each update is serialized and framed once,
+                    the same bytes are queued to every client, clients that
+                    fall behind are dropped
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created HTTP snapshot and WebSocket stream
+            -1.0.1: Added time to set temp and completion estimates
+            -1.0.2: Added active alarms
+----------------------------------------------------------------------------"""
+class telemetryServer(object):
+
+    def __init__(self, host = TELEMETRY_HOST, port = TELEMETRY_PORT, statusPath = STATUS_BUS_FILE,
+                 rate = STREAM_RATE):
+        self._statusPath = statusPath
+        self._period = 1.0/rate
+        self._reader = None
+        #Controller state: STATE_KEYS values, replaced as a whole
+        self._state = None
+        #Names of the raised alarm rules
+        self._alarms = ()
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((host, port))
+        self._listener.listen(16)
+        self._listener.setblocking(0)
+        self.address = self._listener.getsockname()
+        #Connections by socket: received bytes, bytes to send, WebSocket after the upgrade
+        self._clients = {}
+        #Latest snapshot: JSON body and WebSocket frame, built once per update
+        self._snapshot = None
+        self._wsFrame = None
+        self._lastKey = None
+        self._thread = None
+        self._running = False
+        #Statistics
+        self.updates = 0
+        self.messagesSent = 0
+        self.httpRequests = 0
+        self.droppedClients = 0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Hands over the controller state, called from the control loop, never blocks
+         Inputs: state - 0 = Idle, 1 = Heating, 2 = Incubating, 3 = Complete, setTemp (C), heatTime,
+                 incTime, incRemaining (s), warmEta, completionEta, etaMargin - estimated time to set temp
+                 and to completion and their margin (s), None if not known
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def publishState(self, state, setTemp, heatTime, incTime, incRemaining, warmEta = None, completionEta = None,
+                     etaMargin = None):
+        self._state = (state, setTemp, heatTime, incTime, incRemaining, warmEta, completionEta, etaMargin)
+
+    def publishAlarms(self, alarms):
+        self._alarms = tuple(alarms)
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target = self.serve, name = 'telemetryServer')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for sock in list(self._clients):
+            self.drop(sock)
+        self._listener.close()
+
+    @property
+    def clients(self):
+        return sum(1 for client in self._clients.values() if client['ws'])
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Server loop: connections, requests and a stream update every period
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def serve(self):
+        nextUpdate = time.time()
+        while self._running:
+            now = time.time()
+            if now >= nextUpdate:
+                self.update()
+                nextUpdate = max(nextUpdate + self._period, now)
+            readers = [self._listener] + list(self._clients)
+            writers = [sock for sock, client in self._clients.items() if client['tx']]
+            try:
+                readable, writable, failed = select.select(readers, writers, [], max(0.0, nextUpdate - time.time()))
+            except select.error as e:
+                if e.args[0] != errno.EINTR:
+                    raise
+                continue
+            for sock in readable:
+                if sock is self._listener:
+                    self.accept()
+                elif sock in self._clients:
+                    self.receive(sock)
+            for sock in writable:
+                if sock in self._clients:
+                    self.flush(sock)
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Builds the snapshot if the status or state changed and queues it to every stream client
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def update(self):
+        status = self.readStatus()
+        state = self._state
+        alarms = self._alarms
+        key = (status.seq if status is not None else None, state, alarms)
+        if key == self._lastKey:
+            return
+        self._lastKey = key
+        snapshot = {'time': time.time()}
+        if status is not None:
+            snapshot['status'] = dict(zip(STATUS_FIELDS, status[1:]))
+        if state is not None:
+            snapshot.update(zip(STATE_KEYS, state))
+            snapshot['stateName'] = STATE_NAMES[state[0]]
+        snapshot['alarms'] = list(alarms)
+        self._snapshot = json.dumps(snapshot)
+        self._wsFrame = wsFrame(WS_TEXT, self._snapshot)
+        self.updates += 1
+        for sock, client in list(self._clients.items()):
+            if client['ws']:
+                self.queue(sock, self._wsFrame)
+                self.messagesSent += 1
+
+    def readStatus(self):
+        if self._reader is None:
+            try:
+                self._reader = statusBusReader(self._statusPath)
+            except (IOError, OSError, ValueError):
+                return None
+        return self._reader.read()
+
+    def accept(self):
+        try:
+            sock, address = self._listener.accept()
+        except socket.error as e:
+            if e.args[0] in (errno.EAGAIN, errno.EINTR, errno.ECONNABORTED):
+                return
+            raise
+        sock.setblocking(0)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._clients[sock] = {'rx': bytearray(), 'tx': bytearray(), 'ws': False}
+
+    def receive(self, sock):
+        client = self._clients[sock]
+        try:
+            data = sock.recv(RECV_SIZE)
+        except socket.error as e:
+            if e.args[0] in (errno.EAGAIN, errno.EINTR):
+                return
+            self.drop(sock)
+            return
+        if not data:
+            self.drop(sock)
+            return
+        client['rx'] += data
+        if client['ws']:
+            self.handleWsFrames(sock, client)
+        elif b'\r\n\r\n' in client['rx']:
+            self.handleRequest(sock, client)
+        elif len(client['rx']) > MAX_REQUEST:
+            self.drop(sock)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Answers an HTTP request: snapshot, WebSocket upgrade or not found
+         Inputs: sock, client
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def handleRequest(self, sock, client):
+        header = bytes(client['rx']).split(b'\r\n\r\n', 1)[0].decode('latin-1')
+        del client['rx'][:]
+        lines = header.split('\r\n')
+        request = lines[0].split()
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        self.httpRequests += 1
+        path = request[1].split('?')[0] if len(request) >= 2 else ''
+        if request[:1] != ['GET']:
+            self.respond(sock, '405 Method Not Allowed', 'text/plain', 'GET only')
+        elif path == '/stream' and headers.get('upgrade', '').lower() == 'websocket' and 'sec-websocket-key' in headers:
+            accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + WS_GUID).encode('ascii')).digest())
+            self.queue(sock, ('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n'
+                              'Sec-WebSocket-Accept: %s\r\n\r\n' % accept.decode('ascii')).encode('ascii'))
+            client['ws'] = True
+            #New clients start from the latest snapshot
+            if self._wsFrame is not None:
+                self.queue(sock, self._wsFrame)
+                self.messagesSent += 1
+        elif path in ('/', '/snapshot'):
+            self.respond(sock, '200 OK', 'application/json', self._snapshot or '{}')
+        else:
+            self.respond(sock, '404 Not Found', 'text/plain', 'not found')
+
+    def respond(self, sock, status, contentType, body):
+        body = body.encode('utf-8') if not isinstance(body, bytes) else body
+        #Closed once the response is sent
+        self._clients[sock]['close'] = True
+        self.queue(sock, ('HTTP/1.1 %s\r\nContent-Type: %s\r\nContent-Length: %d\r\nAccess-Control-Allow-Origin: *\r\n'
+                          'Connection: close\r\n\r\n' % (status, contentType, len(body))).encode('ascii') + body)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Handles frames from a WebSocket client: pings are answered, a close closes, data is ignored
+         Inputs: sock, client
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def handleWsFrames(self, sock, client):
+        rx = client['rx']
+        while len(rx) >= 2:
+            opcode = rx[0] & 0x0F
+            length = rx[1] & 0x7F
+            pos = 2
+            if length == 126:
+                if len(rx) < 4:
+                    return
+                length, = struct.unpack('>H', bytes(rx[2:4]))
+                pos = 4
+            elif length == 127:
+                if len(rx) < 10:
+                    return
+                length, = struct.unpack('>Q', bytes(rx[2:10]))
+                pos = 10
+            #Client frames are always masked
+            mask = rx[pos:pos + 4] if rx[1] & 0x80 else bytearray(4)
+            pos += 4 if rx[1] & 0x80 else 0
+            if len(rx) < pos + length:
+                if length > MAX_REQUEST:
+                    self.drop(sock)
+                return
+            payload = bytearray(c ^ mask[i % 4] for i, c in enumerate(rx[pos:pos + length]))
+            del rx[:pos + length]
+            if opcode == WS_CLOSE:
+                client['close'] = True
+                self.queue(sock, wsFrame(WS_CLOSE, bytes(payload[:2])))
+                return
+            if opcode == WS_PING:
+                self.queue(sock, wsFrame(WS_PONG, bytes(payload)))
+
+    def queue(self, sock, data):
+        client = self._clients[sock]
+        if len(client['tx']) + len(data) > MAX_CLIENT_BACKLOG:
+            self.droppedClients += 1
+            self.drop(sock)
+            return
+        client['tx'] += data
+        self.flush(sock)
+
+    def flush(self, sock):
+        client = self._clients[sock]
+        try:
+            sent = sock.send(client['tx'])
+        except socket.error as e:
+            if e.args[0] in (errno.EAGAIN, errno.EINTR):
+                return
+            self.drop(sock)
+            return
+        del client['tx'][:sent]
+        if not client['tx'] and client.get('close'):
+            self.drop(sock)
+
+    def drop(self, sock):
+        self._clients.pop(sock, None)
+        try:
+            sock.close()
+        except socket.error:
+            pass
+
+#-----------------------------------------------------------------------#
+
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Builds an unmasked server to client WebSocket frame
+     Inputs: opcode, payload (str/bytes)
+    Outputs: Frame (bytes)
+-------------------------------------------------------------------------------------------------------"""
+def wsFrame(opcode, payload):
+    if not isinstance(payload, bytes):
+        payload = payload.encode('utf-8')
+    if len(payload) < 126:
+        header = struct.pack('>BB', 0x80 | opcode, len(payload))
+    elif len(payload) < 65536:
+        header = struct.pack('>BBH', 0x80 | opcode, 126, len(payload))
+    else:
+        header = struct.pack('>BBQ', 0x80 | opcode, 127, len(payload))
+    return header + payload
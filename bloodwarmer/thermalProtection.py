@@ -0,0 +1,137 @@
+#imports
+import math
+import time
+from PyQt4 import QtCore
+
+#----------------Constants-----------------------#
+
+#Highest probe temperature allowed (C), blood is damaged above about 42 C
+MAX_PROBE_TEMP = 42.0
+#Fastest bag temperature rise allowed (C/s), normal warming stays under 0.05 C/s
+MAX_RISE_RATE = 0.15
+#Time constant of the rise rate filter (s)
+RATE_FILTER = 2.0
+#Frame gap after which the rise rate starts over (s)
+MAX_GAP = 2.0
+#Heat still to come once the heater is off: the bag keeps rising at its current rate for about this long (s)
+THERMAL_LAG = 30.0
+#Predicted bag temperature above the set temp that holds the heater off (C), and the drop that releases it
+OVERSHOOT_LIMIT = 1.0
+OVERSHOOT_RELEASE = 0.3
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Over temperature protection, checked on every parsed
+                    status frame before the controller sees it:
+
+                        any probe above MAX_PROBE_TEMP - trip, faulted
+                                                         probes included
+                        bag rising faster than
+                        MAX_RISE_RATE (runaway)        - trip
+                        bag predicted to pass the set
+                        temp by OVERSHOOT_LIMIT once
+                        the lag has played out         - heater held off
+
+                    Trips go through the safety monitor like a door trip: the
+                    heater off command is sent from the frame check itself and
+                    heater commands stay forced off until the system is started
+                    again.  A hold forces heater commands off the same way but
+                    is released once the prediction falls back.  The rise rate
+                    is the bag temperature slope, exponentially filtered, so a
+                    frame costs a few multiplies and compares
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created absolute limit, rate of rise and predicted overshoot
+                    checks
+----------------------------------------------------------------------------"""
+class thermalProtection(QtCore.QObject):
+
+    #Latched trip: reason
+    tripped = QtCore.pyqtSignal(str)
+    #Heater held off for a predicted overshoot (True) or released (False)
+    overshootHold = QtCore.pyqtSignal(bool)
+
+    def __init__(self, safety):
+        super(self.__class__, self).__init__()
+        self._safety = safety
+        #Set temp the overshoot is predicted against, kept by the controller
+        self.setTemp = None
+        self.reset()
+        #Statistics
+        self.checks = 0
+        self.trips = 0
+        self.holds = 0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Clears a trip and the rise rate, called when the system is started
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def reset(self):
+        self.tripReason = None
+        self.rate = 0.0
+        self._last = None
+        self._usable = None
+        if getattr(self, 'held', False):
+            self._safety.holdHeater(False)
+        self.held = False
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Checks a parsed status frame
+         Inputs: probeTemps - calibrated probe temperatures (C), every one checked against the limit,
+                 usable - probes counted in the bag temperature, bagTemp - bag temperature (C),
+                 rxTime - time the frame was received
+        Outputs: True if the heater is forced off
+    -------------------------------------------------------------------------------------------------------"""
+    def check(self, probeTemps, usable, bagTemp, rxTime = None):
+        rxTime = time.time() if rxTime is None else rxTime
+        self.checks += 1
+        #Absolute limit on every reading, a probe that really overheats reads out of range or too steep and is
+        #faulted by the sensor health before its bag temperature shows it.  Invalid low readings never reach it
+        hottest = max(probeTemps)
+        if hottest > MAX_PROBE_TEMP:
+            return self.trip(rxTime, 'Probe at %.1f C, limit %.1f C' % (hottest, MAX_PROBE_TEMP))
+        #Rise rate, started over after a gap or when a probe is dropped from or added to the bag temperature
+        usable = tuple(usable)
+        last = self._last
+        self._last = (rxTime, bagTemp)
+        if last is None or usable != self._usable or not 0 < rxTime - last[0] <= MAX_GAP:
+            self._usable = usable
+            self.rate = 0.0
+            return self.tripReason is not None or self.held
+        dt = rxTime - last[0]
+        weight = 1.0 - math.exp(-dt/RATE_FILTER)
+        self.rate += weight*((bagTemp - last[1])/dt - self.rate)
+        if self.rate > MAX_RISE_RATE:
+            return self.trip(rxTime, 'Bag rising %.2f C/s, limit %.2f C/s' % (self.rate, MAX_RISE_RATE))
+        #Predicted overshoot, held with hysteresis
+        if self.setTemp is not None:
+            predicted = bagTemp + max(0.0, self.rate)*THERMAL_LAG - self.setTemp
+            if not self.held and predicted > OVERSHOOT_LIMIT:
+                self.held = True
+                self.holds += 1
+                self._safety.holdHeater(True)
+                self.overshootHold.emit(True)
+            elif self.held and predicted < OVERSHOOT_LIMIT - OVERSHOOT_RELEASE:
+                self.held = False
+                self._safety.holdHeater(False)
+                self.overshootHold.emit(False)
+        return self.tripReason is not None or self.held
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Latches a trip, the safety monitor turns the heater off straight away
+         Inputs: eventTime - time the frame was received, reason - text
+        Outputs: True
+    -------------------------------------------------------------------------------------------------------"""
+    def trip(self, eventTime, reason):
+        if self.tripReason is None:
+            self.tripReason = reason
+            self.trips += 1
+            self._safety.trip(eventTime, door = False)
+            self.tripped.emit(reason)
+        return True
+
+#-----------------------------------------------------------------------#
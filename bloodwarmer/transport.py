@@ -0,0 +1,365 @@
+#-----------------------------------------------------------#
+#
+# Program Description: Byte transports the Atmega link runs over.  Every
+#                      transport has the part of the pyserial interface
+#                      arduinoComm uses (timeout, open, close, isOpen,
+#                      flushInput, flushOutput, inWaiting, read, write):
+#
+#                          serialTransport   - local UART (/dev/serial0)
+#                          tcpTransport      - TCP socket to a serial server
+#                                              (ser2net raw mode) in front of
+#                                              the UART
+#                          loopbackTransport - in process, bound to a
+#                                              simulatedDevice: no kernel I/O,
+#                                              no threads and no wire time
+#
+#                      openTransport picks one from a port name
+# Last Edited: 10/19/2026
+#
+#-----------------------------------------------------------#
+
+#imports
+import time
+import errno
+import socket
+import select
+import serial
+from protocolV2 import PROTOCOL_V2, DELIMITER
+
+#----------------Constants-----------------------#
+
+BEGIN = 0x02 #Start transmission
+END = 0x03 #End transmission
+
+#Port names starting with this are TCP serial servers: tcp://host:port
+TCP_PREFIX = 'tcp://'
+#Time allowed to connect to a serial server (s)
+CONNECT_TIMEOUT = 2.0
+#Most bytes taken off the socket per receive
+RECV_SIZE = 4096
+#Search patterns for the loopback frame scan
+DELIMITER_BYTE = bytearray([DELIMITER])
+BEGIN_BYTE = bytearray([BEGIN])
+END_BYTE = bytearray([END])
+#------------------------------------------------#
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Opens the transport for a port name
+     Inputs: port - device path or tcp://host:port, baudRate - UART speed (serial ports only, a serial
+             server has its own line settings)
+    Outputs: Open transport
+-------------------------------------------------------------------------------------------------------"""
+def openTransport(port, baudRate):
+    if port.startswith(TCP_PREFIX):
+        host, tcpPort = port[len(TCP_PREFIX):].rsplit(':', 1)
+        return tcpTransport(host, int(tcpPort))
+    return serialTransport(port, baudRate)
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Interface every transport implements, the subset of
+                    serial.Serial used by arduinoComm.  read waits up to
+                    timeout for size bytes like pyserial, inWaiting never
+                    blocks.  Errors are raised as IOError/OSError so the
+                    link supervisor sees them
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created transport interface
+----------------------------------------------------------------------------"""
+class transport(object):
+
+    #Read timeout (s), None blocks
+    timeout = None
+
+    def open(self):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+    def isOpen(self):
+        raise NotImplementedError
+
+    def flushInput(self):
+        raise NotImplementedError
+
+    def flushOutput(self):
+        pass
+
+    def inWaiting(self):
+        raise NotImplementedError
+
+    def read(self, size = 1):
+        raise NotImplementedError
+
+    def write(self, data):
+        raise NotImplementedError
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Local UART through pyserial
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created
+----------------------------------------------------------------------------"""
+class serialTransport(transport):
+
+    def __init__(self, port, baudRate):
+        self._ser = serial.Serial(port = port, baudrate = baudRate, bytesize = 8, parity = 'N', stopbits = 1)
+
+    @property
+    def timeout(self):
+        return self._ser.timeout
+
+    @timeout.setter
+    def timeout(self, timeout):
+        self._ser.timeout = timeout
+
+    def open(self):
+        self._ser.open()
+
+    def close(self):
+        self._ser.close()
+
+    def isOpen(self):
+        return self._ser.isOpen()
+
+    def flushInput(self):
+        self._ser.flushInput()
+
+    def flushOutput(self):
+        self._ser.flushOutput()
+
+    def inWaiting(self):
+        return self._ser.inWaiting()
+
+    def read(self, size = 1):
+        return self._ser.read(size)
+
+    def write(self, data):
+        return self._ser.write(data)
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Raw TCP connection to a serial server (ser2net raw mode)
+                    that passes bytes to and from the Atmega UART.  Nagle is
+                    off so each command leaves in one segment straight away.
+                    A closed connection is raised as an IOError, reopen
+                    connects again
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created
+----------------------------------------------------------------------------"""
+class tcpTransport(transport):
+
+    def __init__(self, host, port):
+        self.address = (host, port)
+        self.timeout = None
+        self._sock = None
+        self._rx = bytearray()
+        self.open()
+
+    def open(self):
+        if self._sock is not None:
+            return
+        sock = socket.create_connection(self.address, CONNECT_TIMEOUT)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setblocking(0)
+        self._sock = sock
+        self._rx = bytearray()
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def isOpen(self):
+        return self._sock is not None
+
+    def flushInput(self):
+        self.receive()
+        self._rx = bytearray()
+
+    def inWaiting(self):
+        self.receive()
+        return len(self._rx)
+
+    def read(self, size = 1):
+        self.receive()
+        if len(self._rx) < size and self.timeout != 0:
+            deadline = None if self.timeout is None else time.time() + self.timeout
+            while len(self._rx) < size:
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    break
+                if self.wait(remaining):
+                    self.receive()
+        data = self._rx[:size]
+        del self._rx[:size]
+        return bytes(data)
+
+    def write(self, data):
+        self.checkOpen()
+        data = bytes(data)
+        sent = 0
+        while sent < len(data):
+            try:
+                sent += self._sock.send(data[sent:])
+            except socket.error as e:
+                if e.args[0] not in (errno.EAGAIN, errno.EINTR):
+                    raise
+                select.select([], [self._sock], [], CONNECT_TIMEOUT)
+        return len(data)
+
+    #--------------------Private Functions----------------------#
+
+    def checkOpen(self):
+        if self._sock is None:
+            raise IOError('serial server connection closed')
+
+    def wait(self, timeout):
+        try:
+            readable, writable, failed = select.select([self._sock], [], [], timeout)
+        except select.error as e:
+            if e.args[0] != errno.EINTR:
+                raise
+            return False
+        return len(readable) > 0
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Moves whatever the socket holds to the receive buffer without blocking
+         Inputs: None
+        Outputs: Number of bytes received
+    -------------------------------------------------------------------------------------------------------"""
+    def receive(self):
+        self.checkOpen()
+        received = 0
+        while True:
+            try:
+                data = self._sock.recv(RECV_SIZE)
+            except socket.error as e:
+                if e.args[0] in (errno.EAGAIN, errno.EINTR):
+                    return received
+                raise
+            if not data:
+                #Server went away, reopen connects again
+                self.close()
+                raise IOError('serial server closed the connection')
+            self._rx += data
+            received += len(data)
+
+#-----------------------------------------------------------------------#
+
+
+"""----------------------------------------------------------------------------
+ Class Description: In process link to a simulatedDevice.  Commands are cut
+                    out of the written bytes with find instead of a byte loop
+                    and handed straight to the device, responses wait in one
+                    buffer read from an offset so reads don't shift it.  Stream
+                    frames are taken from the device when they fall due.  With
+                    no kernel I/O and no wire time the link costs only the
+                    protocol and controller code, for benchmarks
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created
+----------------------------------------------------------------------------"""
+class loopbackTransport(transport):
+
+    def __init__(self, device):
+        self.device = device
+        self.timeout = None
+        self._open = True
+        self._tx = bytearray()
+        self._rx = bytearray()
+        self._rxPos = 0
+        self._streamNext = None
+
+    def open(self):
+        self._open = True
+        self.flushInput()
+
+    def close(self):
+        self._open = False
+
+    def isOpen(self):
+        return self._open
+
+    def flushInput(self):
+        self._rx = bytearray()
+        self._rxPos = 0
+
+    def inWaiting(self):
+        self.pump()
+        return len(self._rx) - self._rxPos
+
+    def read(self, size = 1):
+        self.pump()
+        if self._rxPos == len(self._rx):
+            #Nothing will arrive before the next stream frame
+            if self.timeout:
+                wait = self.timeout
+                if self._streamNext is not None:
+                    wait = min(wait, self._streamNext - time.time())
+                time.sleep(max(0.0, wait))
+                self.pump()
+            if self._rxPos == len(self._rx):
+                return bytes()
+        end = self._rxPos + size
+        data = bytes(self._rx[self._rxPos:end])
+        self._rxPos = min(end, len(self._rx))
+        if self._rxPos == len(self._rx):
+            self._rx = bytearray()
+            self._rxPos = 0
+        return data
+
+    def write(self, data):
+        if not self._open:
+            raise IOError('loopback closed')
+        self._tx += data
+        while True:
+            #The framing can change after each frame (version request)
+            if self.device.protocol == PROTOCOL_V2:
+                end = self._tx.find(DELIMITER_BYTE)
+                if end < 0:
+                    break
+                frame = self._tx[:end + 1]
+                del self._tx[:end + 1]
+                #Lone delimiters only resynchronize
+                if len(frame) > 1:
+                    self._rx += self.device.handleFrame(frame)
+            else:
+                start = self._tx.find(BEGIN_BYTE)
+                if start < 0:
+                    del self._tx[:]
+                    break
+                end = self._tx.find(END_BYTE, start)
+                if end < 0:
+                    del self._tx[:start]
+                    break
+                #A BEGIN inside the frame restarts it, as the firmware does
+                start = self._tx.rfind(BEGIN_BYTE, start, end)
+                frame = self._tx[start + 1:end]
+                del self._tx[:end + 1]
+                self._rx += self.device.handleFrame(frame)
+        return len(data)
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Takes the stream frames that have fallen due from the device
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def pump(self):
+        period = self.device.streamPeriod/1000.0
+        if not period or not self._open:
+            self._streamNext = None
+            return
+        now = time.time()
+        if self._streamNext is None:
+            self._streamNext = now + period
+        while self._streamNext <= now:
+            self._rx += self.device.streamFrame()
+            self._streamNext += period
+
+#-----------------------------------------------------------------------#
@@ -0,0 +1,295 @@
+#imports
+import time
+from array import array
+from PyQt4 import QtCore, QtGui
+
+#----------------Constants-----------------------#
+
+#Samples kept in the session ring buffer, 2 h at the fastest control period, longer when polled slower
+RING_SIZE = 1 << 18
+#Chart repaint rate (frames/s), samples arriving in between only mark the chart dirty
+FRAME_RATE = 2.0
+#Decimated points kept per series, the store is halved back to this when it doubles
+KEEP_POINTS = 1024
+#Points drawn per series at most, one per pixel column below this
+DRAW_POINTS = 400
+#Temperature axis padding (C) and smallest span shown
+AXIS_PAD = 0.5
+MIN_SPAN = 2.0
+#Series: (name, colour)
+SERIES = (('Bag 1', QtCore.Qt.darkCyan), ('Bag 2', QtCore.Qt.darkMagenta), ('Average', QtCore.Qt.black))
+
+#System states, as signalled by controller.systemUpdate
+STATE_NAMES = ('Idle', 'Heating', 'Incubating', 'Complete')
+IDLE = 0
+COMPLETE = 3
+#------------------------------------------------#
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Largest triangle three buckets downsampling: keeps the first and last points and, from each
+             bucket in between, the point forming the largest triangle with the point kept from the bucket
+             before and the average of the bucket after.  Peaks and steps survive, flat runs are thinned
+     Inputs: xs, ys - sequences of the same length, threshold - points to keep
+    Outputs: (xs, ys) - kept points as lists
+-------------------------------------------------------------------------------------------------------"""
+def lttb(xs, ys, threshold):
+    count = len(xs)
+    if threshold >= count or threshold < 3:
+        return list(xs), list(ys)
+    outX = [xs[0]]
+    outY = [ys[0]]
+    every = (count - 2)/float(threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        #Average of the next bucket
+        start = int((i + 1)*every) + 1
+        end = min(int((i + 2)*every) + 1, count)
+        span = end - start
+        avgX = sum(xs[start:end])/span
+        avgY = sum(ys[start:end])/span
+        #Point of this bucket with the largest triangle
+        ax = xs[a]
+        ay = ys[a]
+        dx = ax - avgX
+        dy = avgY - ay
+        best = -1.0
+        pick = start
+        for j in range(int(i*every) + 1, start):
+            area = abs(dx*(ys[j] - ay) + dy*(xs[j] - ax))
+            if area > best:
+                best = area
+                pick = j
+        outX.append(xs[pick])
+        outY.append(ys[pick])
+        a = pick
+    outX.append(xs[count - 1])
+    outY.append(ys[count - 1])
+    return outX, outY
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Live temperature trend of the session: bag 1, bag 2 and
+                    average temperature against time, with the set temp and
+                    state changes overlaid.  Samples go into a ring buffer for
+                    the whole session and, per series, into a decimated store:
+                    samples are gathered into buckets of stride samples, one
+                    point per bucket is kept, and when the store reaches
+                    2*KEEP_POINTS it is reduced to KEEP_POINTS with lttb and
+                    the stride doubles.  The chart is repainted at FRAME_RATE
+                    from at most 2*KEEP_POINTS points per series however long
+                    the session, so adding a sample and drawing a frame both
+                    cost the same at the end of a session as at the start
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created trend chart with decimated series, set temp and
+                    state change overlays
+            -1.0.1: Ring buffer allocated once instead of on every session start
+----------------------------------------------------------------------------"""
+class trendChart(QtGui.QWidget):
+
+    def __init__(self, parent = None):
+        QtGui.QWidget.__init__(self, parent)
+        self.setMinimumHeight(120)
+        self.setSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
+        self._setpoint = None
+        self._state = IDLE
+        #Session ring buffer, allocated once (about 8 MB) and reused by every session
+        self.ring = [array('d', [0.0])*RING_SIZE for column in range(len(SERIES) + 1)]
+        self.clear()
+        self._dirty = False
+        self._frameTimer = QtCore.QTimer(self)
+        self._frameTimer.timeout.connect(self.frame)
+        self._frameTimer.start(int(1000/FRAME_RATE))
+        #Statistics
+        self.frames = 0
+        self.drawTime = 0.0
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Starts a new session, empties the ring buffer (without reallocating it), series and markers
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def clear(self):
+        self.count = 0
+        self._head = 0
+        self._start = None
+        self._stride = 1
+        #Per series: kept (x, y) and the bucket being gathered
+        self._keptX = [array('d') for series in SERIES]
+        self._keptY = [array('d') for series in SERIES]
+        self._bucketX = [[] for series in SERIES]
+        self._bucketY = [[] for series in SERIES]
+        self._markers = []
+        self._dirty = True
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Adds one sample, only marks the chart dirty, it is drawn on the next frame
+         Inputs: bag1, bag2, avg - temperatures (C), now - sample time (s), the current time if None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    @QtCore.pyqtSlot(float, float, float)
+    def addSample(self, bag1, bag2, avg, now = None):
+        now = time.time() if now is None else now
+        if self._start is None:
+            self._start = now
+        t = now - self._start
+        values = (bag1, bag2, avg)
+        head = self._head
+        self.ring[0][head] = t
+        for i, value in enumerate(values):
+            self.ring[i + 1][head] = value
+            self.addPoint(i, t, value)
+        self._head = (head + 1) % RING_SIZE
+        self.count += 1
+        self._dirty = True
+
+    @QtCore.pyqtSlot(float)
+    def setSetpoint(self, setTemp):
+        self._setpoint = setTemp
+        self._dirty = True
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Marks a state change, a run started from idle or complete starts a new session
+         Inputs: state - 0 = Idle, 1 = Heating, 2 = Incubating, 3 = Complete
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    @QtCore.pyqtSlot(int)
+    def addMarker(self, state, now = None):
+        if state == self._state:
+            return
+        if self._state in (IDLE, COMPLETE) and state not in (IDLE, COMPLETE):
+            self.clear()
+        self._state = state
+        now = time.time() if now is None else now
+        if self._start is None:
+            self._start = now
+        self._markers.append((now - self._start, state))
+        self._dirty = True
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Samples in the ring buffer, oldest first
+         Inputs: None
+        Outputs: [times, bag1, bag2, avg] - lists
+    -------------------------------------------------------------------------------------------------------"""
+    def samples(self):
+        if self.count < RING_SIZE:
+            return [column[:self.count].tolist() for column in self.ring]
+        return [column[self._head:].tolist() + column[:self._head].tolist() for column in self.ring]
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Points drawn for a series: the kept points, the bucket being gathered and the latest sample,
+                 reduced to the chart width with lttb
+         Inputs: index - series, points - most points to return
+        Outputs: (xs, ys) - lists
+    -------------------------------------------------------------------------------------------------------"""
+    def series(self, index, points = DRAW_POINTS):
+        xs = self._keptX[index].tolist()
+        ys = self._keptY[index].tolist()
+        if self._bucketX[index]:
+            xs.append(self._bucketX[index][-1])
+            ys.append(self._bucketY[index][-1])
+        return lttb(xs, ys, points)
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Adds a sample to the bucket of a series.  A full bucket keeps the point furthest from the line
+                 between the last kept point and the bucket average, a full store is halved with lttb and the
+                 bucket stride doubles
+         Inputs: index - series, t - time (s), value
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def addPoint(self, index, t, value):
+        bucketX = self._bucketX[index]
+        bucketY = self._bucketY[index]
+        bucketX.append(t)
+        bucketY.append(value)
+        if len(bucketX) < self._stride:
+            return
+        keptX = self._keptX[index]
+        keptY = self._keptY[index]
+        pick = len(bucketX) - 1
+        if keptX and len(bucketX) > 1:
+            ax = keptX[-1]
+            ay = keptY[-1]
+            dx = ax - sum(bucketX)/len(bucketX)
+            dy = sum(bucketY)/len(bucketY) - ay
+            best = -1.0
+            for j in range(len(bucketX)):
+                area = abs(dx*(bucketY[j] - ay) + dy*(bucketX[j] - ax))
+                if area > best:
+                    best = area
+                    pick = j
+        keptX.append(bucketX[pick])
+        keptY.append(bucketY[pick])
+        del bucketX[:]
+        del bucketY[:]
+        if len(keptX) >= 2*KEEP_POINTS:
+            xs, ys = lttb(keptX, keptY, KEEP_POINTS)
+            self._keptX[index] = array('d', xs)
+            self._keptY[index] = array('d', ys)
+            #Series are added in order, the stride doubles once all of them are halved
+            if index == len(SERIES) - 1:
+                self._stride *= 2
+
+    @QtCore.pyqtSlot()
+    def frame(self):
+        if self._dirty and self.isVisible():
+            self._dirty = False
+            self.update()
+
+    def paintEvent(self, event):
+        begin = time.time()
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        rect = QtCore.QRectF(self.rect()).adjusted(40, 8, -8, -20)
+        painter.fillRect(self.rect(), QtCore.Qt.white)
+        points = max(3, min(DRAW_POINTS, int(rect.width())))
+        drawn = [self.series(i, points) for i in range(len(SERIES))]
+        #Axes from the drawn points, the set temp and the markers
+        values = [y for xs, ys in drawn for y in ys]
+        if self._setpoint is not None:
+            values.append(self._setpoint)
+        if not values:
+            painter.end()
+            return
+        low = min(values) - AXIS_PAD
+        high = max(values) + AXIS_PAD
+        if high - low < MIN_SPAN:
+            mid = (high + low)/2
+            low, high = mid - MIN_SPAN/2, mid + MIN_SPAN/2
+        end = max([xs[-1] for xs, ys in drawn if xs] + [t for t, state in self._markers] + [1.0])
+        scaleX = rect.width()/end
+        scaleY = rect.height()/(high - low)
+        toX = lambda t: rect.left() + t*scaleX
+        toY = lambda v: rect.bottom() - (v - low)*scaleY
+        #Frame and temperature labels
+        painter.setPen(QtCore.Qt.gray)
+        painter.drawRect(rect)
+        painter.drawText(QtCore.QRectF(0, rect.top() - 6, 36, 14), QtCore.Qt.AlignRight, '%.1f' % high)
+        painter.drawText(QtCore.QRectF(0, rect.bottom() - 8, 36, 14), QtCore.Qt.AlignRight, '%.1f' % low)
+        painter.drawText(QtCore.QRectF(rect.right() - 80, rect.bottom() + 4, 80, 14), QtCore.Qt.AlignRight,
+                         '%d:%02d' % (end // 60, end % 60))
+        #State change markers
+        for t, state in self._markers:
+            x = toX(t)
+            painter.setPen(QtGui.QPen(QtCore.Qt.darkGray, 1, QtCore.Qt.DotLine))
+            painter.drawLine(QtCore.QPointF(x, rect.top()), QtCore.QPointF(x, rect.bottom()))
+            painter.drawText(QtCore.QPointF(x + 2, rect.top() + 10), STATE_NAMES[state])
+        #Set temp
+        if self._setpoint is not None:
+            y = toY(self._setpoint)
+            painter.setPen(QtGui.QPen(QtCore.Qt.red, 1, QtCore.Qt.DashLine))
+            painter.drawLine(QtCore.QPointF(rect.left(), y), QtCore.QPointF(rect.right(), y))
+        #Series
+        for (name, colour), (xs, ys) in zip(SERIES, drawn):
+            if len(xs) < 2:
+                continue
+            painter.setPen(QtGui.QPen(colour, 2 if name == 'Average' else 1))
+            painter.drawPolyline(QtGui.QPolygonF([QtCore.QPointF(toX(x), toY(y)) for x, y in zip(xs, ys)]))
+        painter.end()
+        self.frames += 1
+        self.drawTime += time.time() - begin
+
+#-----------------------------------------------------------------------#
@@ -0,0 +1,146 @@
+#imports
+import struct
+from safetyMonitor import safetyMonitor, DOOR_SWITCH_PIN
+from sensorHealth import sensorHealth, FAULT
+from thermalProtection import thermalProtection
+
+#----------------Constants-----------------------#
+
+#Heater proportional constant: duty per degree below the set temperature
+#TODO test system to determine these heating constants
+KP_HEAT = 0xFF
+MAX_DUTY = 0xFF
+#Incubation starts once the bag is within this of the set temp (C)
+SETPOINT_BAND = 0.5
+#Time to incubate
+INCUBATION_TIME_SECONDS = 3600.0
+
+#Temp sensor calibration offsets, subtracted from the probe readings in status packet order
+PROBE_CAL = (-0.1, -0.2, -0.1, -0.2)
+#Readings in the running average of each bag temperature
+BAG_READINGS = 10
+#Bag temperatures further apart than this mean a bag is missing, the lower one is used (C)
+MISSING_BAG_DIFFERENCE = 1.0
+#------------------------------------------------#
+
+"""-------------------------------------------------------------------------------------------------------
+Description: Heater control law: duty proportional to the error below the set temperature
+     Inputs: setTemp, bagTemp (C), kp - duty per degree
+    Outputs: Heater duty (0-255)
+-------------------------------------------------------------------------------------------------------"""
+def heaterDuty(setTemp, bagTemp, kp = KP_HEAT):
+    return int(min(MAX_DUTY, max(0.0, setTemp - bagTemp)*kp))
+
+
+"""----------------------------------------------------------------------------
+ Class Description: Protections every heater runs behind, whichever host drives
+                    it.  A received status packet goes through checkStatus:
+
+                        door interlock (safetyMonitor)  - heater off on door
+                                                          open while armed
+                        calibration, probe grading
+                        (sensorHealth)                  - faulted probes left
+                                                          out of the bags
+                        running average bag
+                        temperatures
+                        thermal protection              - over temperature,
+                                                          runaway, overshoot
+
+                    The link it is given needs sendCmd(cmd) and a cmdFilter
+                    attribute applied to every command it sends: arduinoComm
+                    for the single unit controller, the fleet unit itself for
+                    units driven by the fleet host
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created from the hardwareState status checks so fleet units
+                    get the same protections, shared heater control law
+----------------------------------------------------------------------------"""
+class unitControl(object):
+
+    def __init__(self, comm, doorPin = DOOR_SWITCH_PIN):
+        #Door interlock fast path
+        self.safety = safetyMonitor(comm, doorPin)
+        #Stuck, drifting and noisy probe detection
+        self.health = sensorHealth()
+        #Over temperature and runaway protection, trips through the safety monitor
+        self.thermal = thermalProtection(self.safety)
+        #State of the last status packet
+        self.sensorState = 0
+        self.probeTemps = (0.0, 0.0, 0.0, 0.0)
+        self.bag1Temp = 0.0
+        self.bag2Temp = 0.0
+        self.bagTemp = 0.0
+        self._bag1Readings = []
+        self._bag2Readings = []
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Arms the protections, called when the heater may be driven: clears thermal trips and arms
+                 the door interlock
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def arm(self):
+        self.thermal.reset()
+        self.safety.arm()
+
+    def disarm(self):
+        self.safety.disarm()
+
+    @property
+    def setTemp(self):
+        return self.thermal.setTemp
+
+    @setTemp.setter
+    def setTemp(self, setTemp):
+        self.thermal.setTemp = setTemp
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Runs the protections on a received status packet
+         Inputs: status - complete status packet, rxTime - time it was received
+        Outputs: Overall probe grade, bag temperatures are left as they were on FAULT (a bag has no usable
+                 probe left)
+    -------------------------------------------------------------------------------------------------------"""
+    def checkStatus(self, status, rxTime = None):
+        #Door interlock runs before anything else touches the packet
+        self.safety.checkStatus(status, rxTime)
+        probes = struct.unpack('<4f', bytes(status[8:24]))
+        probeTemps = tuple(temp - cal for temp, cal in zip(probes, PROBE_CAL))
+        self.probeTemps = probeTemps
+        #Grade the probes
+        self.sensorState = self.health.check(probeTemps, rxTime)
+        if self.sensorState != FAULT:
+            #Running average of each bag from its usable probes
+            self.bag1Temp = self.average(self._bag1Readings, self.health.bagTemp(probeTemps, 0))
+            self.bag2Temp = self.average(self._bag2Readings, self.health.bagTemp(probeTemps, 1))
+            #Ensure both bags are in system ; if one is not included, take the lower temperature
+            if abs(self.bag1Temp - self.bag2Temp) > MISSING_BAG_DIFFERENCE:
+                self.bagTemp = min(self.bag1Temp, self.bag2Temp)
+            else:
+                self.bagTemp = (self.bag1Temp + self.bag2Temp)/2
+        #Over temperature protection runs on every packet, a faulted bag still has its readings checked
+        self.thermal.check(probeTemps, self.health.usable, self.bagTemp, rxTime)
+        return self.sensorState
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Heater duty for the last bag temperature
+         Inputs: setTemp (C), kp - duty per degree
+        Outputs: Heater duty (0-255)
+    -------------------------------------------------------------------------------------------------------"""
+    def heaterDuty(self, setTemp, kp = KP_HEAT):
+        return heaterDuty(setTemp, self.bagTemp, kp)
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Running average of the last BAG_READINGS readings
+         Inputs: readings - list of the last readings, newest first, newTemp - latest reading
+        Outputs: Average
+    -------------------------------------------------------------------------------------------------------"""
+    def average(self, readings, newTemp):
+        readings.insert(0, newTemp)
+        if len(readings) > BAG_READINGS:
+            readings.pop()
+        return sum(readings)/len(readings)
+
+#-----------------------------------------------------------------------#
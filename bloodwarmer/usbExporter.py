@@ -0,0 +1,207 @@
+#imports
+import os
+import csv
+import gzip
+import time
+import sqlite3
+import hashlib
+import threading
+
+#----------------Constants-----------------------#
+
+#Removable drives are mounted below this directory
+MEDIA_ROOT = '/media/pi'
+#Directory on the drive session files are exported to
+EXPORT_DIR = 'bloodwarmer'
+#Mount table, polled for drives being inserted or pulled
+MOUNT_TABLE = '/proc/mounts'
+#Time between mount table checks (s)
+MOUNT_POLL_INTERVAL = 2.0
+#Closed sessions this recent are exported to a drive that does not have them yet (days)
+EXPORT_DAYS = 30
+#Samples read from the session database per chunk, the worker yields between chunks
+EXPORT_CHUNK = 500
+
+#Session file format, same as the original save file
+csv.register_dialect(
+    'bloodWarmerDialect',
+    delimiter = '\t',
+    quotechar = '"',
+    doublequote = True,
+    skipinitialspace = True,
+    lineterminator = '\r\n',
+    quoting = csv.QUOTE_MINIMAL)
+#------------------------------------------------#
+
+"""----------------------------------------------------------------------------
+ Class Description: Exports incubation sessions to removable drives from a
+                    background worker.  Samples stay in the local session
+                    database until a drive is present, so nothing is lost
+                    while no stick is inserted.  The worker polls the mount
+                    table for drives appearing and disappearing.  Each closed
+                    session is written as a gzip compressed tab separated file
+                    plus a sha256 sidecar computed by reading the file back.
+                    Files are written under a temporary name and renamed, so a
+                    stick pulled mid-export never holds a truncated session
+                    file.  The control thread never touches the drive
+ Last Edited: 10/19/2026
+ Changelog: -1.0.0: Created mount detection, compressed checksummed session
+                    export and background worker
+----------------------------------------------------------------------------"""
+class usbExporter(object):
+
+    def __init__(self, sessions, mediaRoot = MEDIA_ROOT, pollInterval = MOUNT_POLL_INTERVAL, mountTable = MOUNT_TABLE):
+        self._sessions = sessions
+        self._mountTable = mountTable
+        self._mediaRoot = mediaRoot.rstrip('/') + '/'
+        self._pollInterval = pollInterval
+        self._enabled = False
+        self._drives = set()
+        self._failedDrives = set()
+        self._wake = threading.Event()
+        self._worker = threading.Thread(target = self.exportLoop)
+        self._worker.daemon = True
+        self._worker.start()
+        #Statistics
+        self.exported = 0
+        self.exportErrors = 0
+        self.lastExportTime = None
+
+    #--------------------Interface Functions--------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Turns exporting on, sessions are copied to any drive that is or becomes present
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def enable(self):
+        self._enabled = True
+        self._wake.set()
+
+    def disable(self):
+        self._enabled = False
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @property
+    def drives(self):
+        return sorted(self._drives)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Wakes the worker after a session was closed
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def sessionEnded(self):
+        self._wake.set()
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Removable drive mount points from the mount table
+         Inputs: None
+        Outputs: Set of mount points
+    -------------------------------------------------------------------------------------------------------"""
+    def mounts(self):
+        drives = set()
+        try:
+            with open(self._mountTable) as f:
+                for line in f:
+                    fields = line.split()
+                    if len(fields) < 2:
+                        continue
+                    mountPoint = fields[1].replace('\\040', ' ')
+                    if mountPoint.startswith(self._mediaRoot):
+                        drives.add(mountPoint)
+        except (IOError, OSError):
+            pass
+        return drives
+
+    #--------------------Private Functions----------------------#
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Worker thread: tracks drives and exports sessions missing from them
+         Inputs: None
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def exportLoop(self):
+        while True:
+            self._wake.wait(self._pollInterval)
+            self._wake.clear()
+            drives = self.mounts()
+            #A drive that failed is retried once it has been pulled and inserted again
+            self._failedDrives &= drives
+            self._drives = drives
+            if not self._enabled:
+                continue
+            for drive in drives - self._failedDrives:
+                try:
+                    self.exportPending(drive)
+                except (IOError, OSError):
+                    self.exportErrors += 1
+                    self._failedDrives.add(drive)
+                except sqlite3.Error:
+                    #Session database busy or not created yet, try again next poll
+                    self.exportErrors += 1
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Exports every recent closed session the drive does not have yet
+         Inputs: drive - mount point
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def exportPending(self, drive):
+        exportDir = os.path.join(drive, EXPORT_DIR)
+        if not os.path.isdir(exportDir):
+            os.mkdir(exportDir)
+        for session in self._sessions.sessions(time.time() - EXPORT_DAYS*86400):
+            sessionId, endTime = session[0], session[2]
+            if endTime is None:
+                continue
+            fileName = 'session_%d.tsv.gz' % sessionId
+            if os.path.exists(os.path.join(exportDir, fileName + '.sha256')):
+                continue
+            self.exportSession(exportDir, fileName, session)
+
+    """-------------------------------------------------------------------------------------------------------
+    Description: Writes one session file and its checksum sidecar
+         Inputs: exportDir, fileName, session - row from sessionStore.sessions
+        Outputs: None
+    -------------------------------------------------------------------------------------------------------"""
+    def exportSession(self, exportDir, fileName, session):
+        sessionId, startTime, endTime, setTemp, setpointTime, incubationTime, outcome = session
+        path = os.path.join(exportDir, fileName)
+        with open(path + '.tmp', 'wb') as raw:
+            gz = gzip.GzipFile(fileName[:-3], 'wb', 6, raw)
+            dataWriter = csv.writer(gz, dialect = 'bloodWarmerDialect')
+            dataWriter.writerow(('Session', time.asctime(time.localtime(startTime)), 'Set Temperature (C)',
+                                 '%.1f' % setTemp, 'Incubation Time (s)', '%.0f' % (incubationTime or 0)))
+            dataWriter.writerow(('Date/Time', 'Average Bag Temperature (C)', 'Bag 1 (C)', 'Bag 2 (C)',
+                                 'Heater Duty', 'State'))
+            rows = []
+            for sampleTime, bagTemp, bag1Temp, bag2Temp, heaterDuty, state in self._sessions.samples(sessionId):
+                rows.append((time.asctime(time.localtime(sampleTime)), '%.2f' % bagTemp, '%.2f' % bag1Temp,
+                             '%.2f' % bag2Temp, heaterDuty, state))
+                if len(rows) >= EXPORT_CHUNK:
+                    dataWriter.writerows(rows)
+                    rows = []
+                    #Let the control thread have the interpreter
+                    time.sleep(0)
+            dataWriter.writerows(rows)
+            gz.close()
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.rename(path + '.tmp', path)
+        #Checksum of what is actually on the drive
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(65536), b''):
+                digest.update(block)
+        with open(path + '.sha256.tmp', 'w') as f:
+            f.write('%s  %s\n' % (digest.hexdigest(), fileName))
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(path + '.sha256.tmp', path + '.sha256')
+        self.exported += 1
+        self.lastExportTime = time.time()
+
+#-----------------------------------------------------------------------#
@@ -47,6 +47,19 @@ class warningPopup(QtGui.QWidget, Ui_PopUpWindow):
         self.setWindowModality(QtCore.Qt.ApplicationModal)
         self.show()
 
+    """-------------------------------------------------------------------------------------------------------
+           Description: Asks whether an incubation interrupted by a crash or power loss should be resumed
+                Inputs: setTemp - saved set temp (C), incTime - saved incubation time (s)
+               Outputs: None
+           -------------------------------------------------------------------------------------------------------"""
+    @QtCore.pyqtSlot(float, float)
+    def setResume(self, setTemp, incTime):
+        self.title.setText("RESUME?")
+        minutes = int(incTime) / 60
+        self.warningMessage.setText(u"The system was interrupted at %.1f\u00b0C with %d:%02d incubated. "
+                                    u"Choose to either continue or restart the system." % (setTemp, minutes / 60, minutes % 60))
+        self.setWarning()
+
     @QtCore.pyqtSlot()
     def chooseResume(self):
         self.runSystem.emit(True, False)